@@ -0,0 +1,27 @@
+# config/cache.py
+"""
+Invalidation de cache par « version de namespace ».
+
+Chaque clé mise en cache embarque la version courante de son namespace ;
+invalider = changer la version (les anciennes entrées expirent d'elles-mêmes).
+Fonctionne avec n'importe quel backend, sans suppression par motif.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(namespace):
+    return f"{namespace}:version"
+
+
+def cache_version(namespace):
+    return cache.get_or_set(_version_key(namespace), time.time_ns, None)
+
+
+def bump_cache_version(namespace):
+    cache.set(_version_key(namespace), time.time_ns(), None)
+
+
+def versioned_key(namespace, *parts):
+    return ":".join([namespace, str(cache_version(namespace)), *map(str, parts)])
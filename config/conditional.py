@@ -0,0 +1,105 @@
+# config/conditional.py
+"""
+GET conditionnel (ETag / Last-Modified) pour les vues de lecture.
+
+L'empreinte d'une réponse est calculée par un seul agrégat SQL sur le
+queryset qui la produit : nombre de lignes + max(updated_at) (et des
+horodatages des relations imbriquées si la vue les déclare). Si le client
+présente un validateur encore valable, la vue répond 304 avant toute
+sérialisation.
+
+Last-Modified n'est envoyé que sur le détail d'un objet : sur une liste,
+max(updated_at) ne bouge pas quand une ligne est supprimée (seul le nombre
+de lignes de l'ETag le voit), un If-Modified-Since seul y rendrait un 304
+périmé. Les relations imbriquées d'un détail doivent avancer le
+`updated_at` du parent à l'écriture comme à la suppression (signaux).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+class _NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    À placer avant la classe de vue DRF.
+
+    - `conditional_timestamps` : lookups agrégés en Max (ex. "items__dish__updated_at") ;
+    - `conditional_actions` : actions de viewset concernées (les APIView : tout GET) ;
+    - `get_conditional_queryset()` : à surcharger pour les APIView sans `get_queryset`.
+    """
+    conditional_timestamps = ("updated_at",)
+    conditional_actions = ("list", "retrieve")
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self._conditional_detail():
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def _conditional_detail(self):
+        lookup_url_kwarg = getattr(self, "lookup_url_kwarg", None) or getattr(self, "lookup_field", None)
+        return bool(lookup_url_kwarg) and lookup_url_kwarg in self.kwargs
+
+    def _conditional_enabled(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return False
+        action = getattr(self, "action", None)
+        return action is None or action in self.conditional_actions
+
+    def conditional_validators(self, request):
+        """(etag, last_modified ou None hors détail) : une requête d'agrégat, aucune ligne chargée."""
+        aggregates = {"rows": Count("pk", distinct=True)}
+        for i, lookup in enumerate(self.conditional_timestamps):
+            aggregates[f"ts{i}"] = Max(lookup)
+        values = self.get_conditional_queryset().order_by().aggregate(**aggregates)
+
+        stamps = [values[f"ts{i}"] for i in range(len(self.conditional_timestamps))]
+        last_modified = max((ts for ts in stamps if ts), default=None)
+        user = request.user
+        fingerprint = "|".join([
+            request.get_full_path(),
+            request.META.get("HTTP_ACCEPT", ""),
+            str(user.pk) if user.is_authenticated else "-",
+            str(values["rows"]),
+            *(ts.isoformat() if ts else "-" for ts in stamps),
+        ])
+        etag = '"%s"' % hashlib.sha1(fingerprint.encode()).hexdigest()
+        if not self._conditional_detail():
+            return etag, None
+        return etag, last_modified and int(last_modified.timestamp())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._conditional = None
+        if not self._conditional_enabled(request):
+            return
+        etag, last_modified = self.conditional_validators(request)
+        self._conditional = (etag, last_modified)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            raise _NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, "_conditional", None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+            response["Cache-Control"] = "no-cache"
+            patch_vary_headers(response, ("Accept", "Authorization"))
+        return response
@@ -0,0 +1,60 @@
+# config/pagination.py
+"""
+Pagination par curseur pour toute l'API.
+
+Le curseur s'appuie sur l'ordre déjà défini par la vue, le queryset
+(`order_by`) ou le modèle (`Meta.ordering`) : -date, -opened_at, -created_at…
+ou une annotation du queryset (`-rank` de la recherche).
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class OrderingCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    ordering = ("-pk",)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = (
+            getattr(view, "ordering", None)
+            or queryset.query.order_by
+            or queryset.model._meta.ordering
+        )
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return self._cursor_ordering(queryset.model, ordering, queryset.query.annotations) or self.ordering
+
+    @staticmethod
+    def _cursor_ordering(model, ordering, annotations=()):
+        """
+        Ne garde l'ordre que s'il porte sur des champs locaux (les FK passent
+        par leur colonne `<fk>_id`) ou des annotations ; ajoute `pk` pour
+        départager les ex aequo.
+        """
+        result = []
+        for field in ordering:
+            if not isinstance(field, str) or "__" in field or field.lstrip("-") == "?":
+                return None
+            desc = field.startswith("-")
+            name = field.lstrip("-")
+            if name != "pk" and name not in annotations:
+                try:
+                    model_field = model._meta.get_field(name)
+                except Exception:
+                    return None
+                if model_field.is_relation and not model_field.concrete:
+                    return None
+                name = model_field.attname
+            result.append(f"-{name}" if desc else name)
+        if result and not any(f.lstrip("-") in ("pk", model._meta.pk.attname) for f in result):
+            result.append("-pk" if result[0].startswith("-") else "pk")
+        return tuple(result)
+
+
+def paginated_response(request, queryset, serializer_class, view=None, context=None):
+    """Pagination + sérialisation pour les APIView / vues fonction."""
+    paginator = OrderingCursorPagination()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = serializer_class(page, many=True, context={"request": request, **(context or {})})
+    return paginator.get_paginated_response(serializer.data)
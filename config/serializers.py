@@ -0,0 +1,22 @@
+# config/serializers.py
+from rest_framework.permissions import SAFE_METHODS
+
+
+class SparseFieldsetMixin:
+    """
+    `?fields=id,name,price` : ne sérialise que les champs demandés (lecture seule).
+    Les champs non demandés sont retirés avant la sérialisation : leurs
+    SerializerMethodField / relations ne sont donc jamais évalués.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        params = getattr(request, "query_params", request.GET)
+        wanted = {f.strip() for f in (params.get("fields") or "").split(",") if f.strip()}
+        if not wanted or not (wanted & set(self.fields)):
+            return
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
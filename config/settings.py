@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     # Apps projet
     "accounts",
@@ -123,6 +124,17 @@ if not DATABASES["default"]:
         }
     }
 
+# ────────────────────────────────────────────────────────────────────────────────
+# Cache (LocMem par défaut ; en prod multi-workers, pointer vers un cache partagé
+# — Redis ou DatabaseCache — pour que les invalidations soient vues par tous)
+# ────────────────────────────────────────────────────────────────────────────────
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default="vegnbio"),
+    }
+}
+
 # ────────────────────────────────────────────────────────────────────────────────
 # Auth / DRF / JWT
 # ────────────────────────────────────────────────────────────────────────────────
@@ -132,6 +144,9 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    # Curseur sur l'ordre existant (-date, -opened_at, -created_at…) ; ?page_size= (max 200)
+    "DEFAULT_PAGINATION_CLASS": "config.pagination.OrderingCursorPagination",
+    "PAGE_SIZE": 50,
 }
 
 SIMPLE_JWT = {
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+
+from config.serializers import SparseFieldsetMixin
 from .models import LoyaltyProgram, Membership, PointsTransaction
 
 class LoyaltyProgramSerializer(serializers.ModelSerializer):
@@ -14,7 +16,7 @@ class MembershipSerializer(serializers.ModelSerializer):
         read_only_fields = ["user", "joined_at", "points_balance"]
 
 
-class PointsTransactionSerializer(serializers.ModelSerializer):
+class PointsTransactionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = PointsTransaction
         fields = ["id", "kind", "points", "reason", "related_order_id", "created_at"]
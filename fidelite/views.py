@@ -3,6 +3,8 @@ from django.db import transaction
 from rest_framework import permissions, status, views
 from rest_framework.response import Response
 
+from config.pagination import paginated_response
+
 from .models import LoyaltyProgram, Membership, PointsTransaction
 
 
@@ -58,7 +60,7 @@ class TransactionsListView(views.APIView):
         membership, _ = get_or_create_membership(request.user)
         qs = membership.transactions.all()
         from .serializers import PointsTransactionSerializer
-        return Response(PointsTransactionSerializer(qs, many=True).data)
+        return paginated_response(request, qs, PointsTransactionSerializer, view=self)
 
 
 class SpendPointsView(views.APIView):
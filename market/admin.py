@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.utils import timezone
 from .models import SupplierOffer, OfferReview, OfferReport, OfferComment
 
 
@@ -22,19 +23,19 @@ class OfferReportInline(admin.TabularInline):
 
 @admin.action(description="Publish selected offers")
 def publish_offers(modeladmin, request, queryset):
-    queryset.update(status="PUBLISHED")
+    queryset.update(status="PUBLISHED", updated_at=timezone.now())
 
 @admin.action(description="Unlist selected offers")
 def unlist_offers(modeladmin, request, queryset):
-    queryset.update(status="UNLISTED")
+    queryset.update(status="UNLISTED", updated_at=timezone.now())
 
 @admin.action(description="Move selected offers to Draft")
 def draft_offers(modeladmin, request, queryset):
-    queryset.update(status="DRAFT")
+    queryset.update(status="DRAFT", updated_at=timezone.now())
 
 @admin.action(description="Flag selected offers")
 def flag_offers(modeladmin, request, queryset):
-    queryset.update(status="FLAGGED")
+    queryset.update(status="FLAGGED", updated_at=timezone.now())
 
 # ---------- ModelAdmins ----------
 
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:40
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    apps.get_model('market', 'SupplierOffer').objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0003_alter_supplieroffer_min_order_qty'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplieroffer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
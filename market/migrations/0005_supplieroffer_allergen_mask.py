@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:30
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_allergen_mask(apps, schema_editor):
+    Allergen = apps.get_model("menu", "Allergen")
+    SupplierOffer = apps.get_model("market", "SupplierOffer")
+    bits = dict(Allergen.objects.exclude(bit__isnull=True).values_list("pk", "bit"))
+    masks = defaultdict(int)
+    for offer_id, allergen_id in SupplierOffer.allergens.through.objects.values_list("supplieroffer_id", "allergen_id"):
+        if allergen_id in bits:
+            masks[offer_id] |= 1 << bits[allergen_id]
+    SupplierOffer.objects.bulk_update(
+        [SupplierOffer(pk=pk, allergen_mask=mask) for pk, mask in masks.items()], ["allergen_mask"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0004_supplieroffer_updated_at'),
+        ('menu', '0004_allergen_masks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplieroffer',
+            name='allergen_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_allergen_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# copie figée de menu.search à la date de la migration
+OFFER_VECTOR = (
+    SearchVector("product_name", weight="A", config="french")
+    + SearchVector("producer_name", weight="B", config="french")
+    + SearchVector("description", weight="C", config="french")
+    + SearchVector("region", weight="D", config="french")
+)
+
+
+def backfill_search(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        SupplierOffer = apps.get_model("market", "SupplierOffer")
+        SupplierOffer.objects.update(search_vector=OFFER_VECTOR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0005_supplieroffer_allergen_mask'),
+        ('menu', '0005_search'),  # extension pg_trgm
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplieroffer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='supplieroffer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='offer_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplieroffer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['product_name'], name='offer_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(backfill_search, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
@@ -27,6 +29,7 @@ class SupplierOffer(models.Model):
     region = models.CharField(max_length=120, default=REGION_IDF)
 
     allergens = models.ManyToManyField(Allergen, blank=True, related_name="supplier_offers")
+    allergen_mask = models.BigIntegerField(default=0, editable=False)
 
     unit = models.CharField(max_length=32, default="kg")  # kg, pièce, botte...
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
@@ -45,10 +48,17 @@ class SupplierOffer(models.Model):
     available_to   = models.DateField(null=True, blank=True)
 
     status = models.CharField(max_length=16, choices=STATUS, default="DRAFT")
+    # plein texte, tenu à jour par market.signals (voir menu.search)
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="offer_search_idx"),
+            GinIndex(fields=["product_name"], opclasses=["gin_trgm_ops"], name="offer_name_trgm_idx"),
+        ]
 
     def clean(self):
         # 1) région du produit doit être IDF
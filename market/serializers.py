@@ -3,11 +3,13 @@ from django.utils import timezone
 from datetime import timedelta
 from rest_framework import serializers
 
+from config.serializers import SparseFieldsetMixin
+
 from .models import SupplierOffer, OfferReview, OfferReport, OfferComment, REGIONS_ALLOWED
 from menu.models import Allergen
 
 
-class SupplierOfferSerializer(serializers.ModelSerializer):
+class SupplierOfferSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     supplier = serializers.HiddenField(default=serializers.CurrentUserDefault())
     supplier_id = serializers.IntegerField(source="supplier.id", read_only=True)
     allergens = serializers.PrimaryKeyRelatedField(queryset=Allergen.objects.all(), many=True, required=False)
@@ -83,7 +85,7 @@ class SupplierOfferSerializer(serializers.ModelSerializer):
         return data
 
 
-class OfferReviewSerializer(serializers.ModelSerializer):
+class OfferReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = serializers.HiddenField(default=serializers.CurrentUserDefault())
     class Meta:
         model = OfferReview
@@ -104,7 +106,7 @@ class OfferReportSerializer(serializers.ModelSerializer):
         read_only_fields = ["status","created_at"]
 
 
-class OfferCommentSerializer(serializers.ModelSerializer):
+class OfferCommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = serializers.HiddenField(default=serializers.CurrentUserDefault())
     class Meta:
         model = OfferComment
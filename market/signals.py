@@ -0,0 +1,47 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from menu.allergens import clear_allergen_bit, refresh_allergen_masks
+from menu.models import Allergen
+from menu.search import refresh_search_vectors
+from .models import OfferReview, SupplierOffer
+
+
+@receiver(m2m_changed, sender=SupplierOffer.allergens.through)
+def sync_offer_allergen_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._cleared_offer_ids = set(instance.supplier_offers.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        offer_ids = {instance.pk}
+    elif action == "post_clear":
+        offer_ids = instance.__dict__.pop("_cleared_offer_ids", set())
+    else:
+        offer_ids = pk_set
+    if offer_ids:
+        refresh_allergen_masks(SupplierOffer, offer_ids)
+
+
+@receiver(post_save, sender=Allergen)
+def fill_offer_allergen_masks(sender, instance, **kwargs):
+    if getattr(instance, "bit_assigned", False):
+        refresh_allergen_masks(SupplierOffer, set(instance.supplier_offers.values_list("pk", flat=True)))
+
+
+@receiver(post_delete, sender=Allergen)
+def clear_offer_allergen_masks(sender, instance, **kwargs):
+    clear_allergen_bit(SupplierOffer, instance.bit)
+
+
+@receiver(post_save, sender=SupplierOffer)
+def index_offer(sender, instance, **kwargs):
+    refresh_search_vectors(SupplierOffer, [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=OfferReview)
+def touch_reviewed_offer(sender, instance, **kwargs):
+    """Avis créé, modifié ou supprimé : l'offre (note moyenne sérialisée) change d'ETag / Last-Modified."""
+    SupplierOffer.objects.filter(pk=instance.offer_id).update(updated_at=timezone.now())
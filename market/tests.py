@@ -1,3 +1,43 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .models import OfferReview, SupplierOffer
+
+User = get_user_model()
+
+
+class OfferConditionalGetTests(TestCase):
+    def setUp(self):
+        supplier = User.objects.create_user("sup@x.fr", "pw", role="FOURNISSEUR")
+        self.offers = [
+            SupplierOffer.objects.create(supplier=supplier, product_name=f"Carotte {i}", price=2, status="PUBLISHED")
+            for i in range(2)
+        ]
+        self.client_user = User.objects.create_user("client@x.fr", "pw", role="RESTAURATEUR")
+
+    def test_list_sends_etag_only(self):
+        response = self.client.get("/api/market/offers/")
+        self.assertIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+        # une suppression change l'ETag ; If-Modified-Since seul ne donne jamais de 304
+        self.offers[1].delete()
+        self.assertEqual(self.client.get("/api/market/offers/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+        future = http_date((timezone.now() + timedelta(days=1)).timestamp())
+        self.assertEqual(self.client.get("/api/market/offers/", HTTP_IF_MODIFIED_SINCE=future).status_code, 200)
 
-# Create your tests here.
+    def test_review_change_moves_offer_last_modified(self):
+        offer = self.offers[0]
+        url = f"/api/market/offers/{offer.pk}/"
+        review = OfferReview.objects.create(offer=offer, author=self.client_user, rating=4)
+        before = self.client.get(url)
+        SupplierOffer.objects.filter(pk=offer.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        review.delete()
+        offer.refresh_from_db()
+        self.assertGreater(offer.updated_at, timezone.now() - timedelta(minutes=1))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=before["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["avg_rating"])
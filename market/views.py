@@ -2,7 +2,6 @@ from datetime import date
 from django.db import transaction
 from django.db.models import Q
 from django.utils.dateparse import parse_date
-from django.core.mail import send_mail
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
@@ -12,11 +11,16 @@ from rest_framework.response import Response
 from .models import SupplierOffer, OfferReview, OfferReport, OfferComment
 from .serializers import SupplierOfferSerializer, OfferReviewSerializer, OfferReportSerializer, OfferCommentSerializer
 from .permissions import IsSupplier, IsRestaurateur, IsAdminVegNBio
+from config.conditional import ConditionalGetMixin
+from menu.allergens import with_any_allergen, without_allergens
 from menu.models import Product
+from menu.search import search
+from restaurants.outbox import queue_email
 
-class SupplierOfferViewSet(viewsets.ModelViewSet):
+class SupplierOfferViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = SupplierOffer.objects.select_related("supplier").prefetch_related("allergens","reviews").all()
     serializer_class = SupplierOfferSerializer
+    # les avis avancent `updated_at` de l'offre (market.signals)
 
     def get_permissions(self):
         if self.action in ["create","update","partial_update","destroy","publish","unlist","draft"]:
@@ -38,16 +42,15 @@ class SupplierOfferViewSet(viewsets.ModelViewSet):
 
         # recherche / filtres
         if p.get("q"):
-            q = p["q"]
-            qs = qs.filter(Q(product_name__icontains=q) | Q(producer_name__icontains=q) | Q(description__icontains=q))
+            qs = search(qs, p["q"])
         if p.get("is_bio") in ["true","false"]:
             qs = qs.filter(is_bio=(p["is_bio"]=="true"))
         if p.get("region"):
             qs = qs.filter(region__iexact=p["region"])
         if p.get("allergen"):
-            qs = qs.filter(allergens__code__in=p["allergen"].split(",")).distinct()
+            qs = with_any_allergen(qs, p["allergen"].split(","))
         if p.get("exclude_allergens"):
-            qs = qs.exclude(allergens__code__in=p["exclude_allergens"].split(",")).distinct()
+            qs = without_allergens(qs, p["exclude_allergens"].split(","))
 
         # filtre disponibilité par date en conservant un queryset
         if p.get("available_on"):
@@ -82,7 +85,7 @@ class SupplierOfferViewSet(viewsets.ModelViewSet):
         if offer.supplier != request.user:
             return Response({"detail":"Interdit"}, status=403)
         offer.status = "UNLISTED"
-        offer.save(update_fields=["status"])
+        offer.save(update_fields=["status", "updated_at"])
         return Response({"status":"unlisted"})
 
     @action(detail=True, methods=["post"])
@@ -91,7 +94,7 @@ class SupplierOfferViewSet(viewsets.ModelViewSet):
         if offer.supplier != request.user:
             return Response({"detail":"Interdit"}, status=403)
         offer.status = "DRAFT"
-        offer.save(update_fields=["status"])
+        offer.save(update_fields=["status", "updated_at"])
         return Response({"status":"draft"})
 
     @action(detail=False, methods=["get"])
@@ -130,14 +133,13 @@ class SupplierOfferViewSet(viewsets.ModelViewSet):
 
         OfferReport.objects.create(offer=offer, reporter=request.user, reason=reason, details=details)
         offer.status = "FLAGGED"
-        offer.save(update_fields=["status"])
+        offer.save(update_fields=["status", "updated_at"])
 
-        send_mail(
+        queue_email(
             subject="Offre signalée",
-            message=f"Votre offre '{offer.product_name}' a été signalée pour: {reason}.",
-            from_email=None,  # DEFAULT_FROM_EMAIL
-            recipient_list=[offer.supplier.email],
-            fail_silently=True,
+            body=f"Votre offre '{offer.product_name}' a été signalée pour: {reason}.",
+            recipients=[offer.supplier.email],
+            category="offer_flagged",
         )
         return Response({"status": "flagged"}, status=201)
 
@@ -148,7 +150,7 @@ class SupplierOfferViewSet(viewsets.ModelViewSet):
         if new_status not in ["PUBLISHED", "UNLISTED", "DRAFT"]:
             return Response({"detail": "status invalide."}, status=400)
         offer.status = new_status
-        offer.save(update_fields=["status"])
+        offer.save(update_fields=["status", "updated_at"])
         return Response({"status": offer.status})
 
 
@@ -0,0 +1,178 @@
+"""
+Allergènes dénormalisés.
+
+- Union des allergènes d'un plat, matérialisée dans `Dish.allergens` :
+  allergènes des produits du plat + `extra_allergens`. Recalculée en lot
+  (deux lectures des tables de liaison, une réécriture) par les signaux m2m
+  de `menu.signals` ; les listes de plats n'ont plus qu'à précharger `allergens`.
+- Masques `allergen_mask` (Product, Dish, SupplierOffer) : un bit par
+  allergène (`Allergen.bit`). « Sans gluten ni noix » devient
+  `allergen_mask & :mask = 0`, sans jointure ni DISTINCT.
+- Cohérence végétarien / vegan d'un plat, vérifiée sur des produits déjà
+  chargés (masques), sans requête par produit.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Allergen, Dish, Product
+
+
+# ---- masques ----
+def allergen_bits():
+    """{allergen_id: bit}"""
+    return dict(Allergen.objects.exclude(bit__isnull=True).values_list("pk", "bit"))
+
+
+def mask_of(allergen_ids, bits):
+    mask = 0
+    for allergen_id in allergen_ids:
+        if bits.get(allergen_id) is not None:
+            mask |= 1 << bits[allergen_id]
+    return mask
+
+
+def code_masks(codes):
+    """
+    (masque des codes demandés, codes existants sans bit). Un allergène sans
+    bit (créé par bulk_create ou loaddata, qui contournent `Allergen.save`)
+    n'est pas dans les masques : les filtres passent alors par la jointure.
+    Les codes inconnus sont ignorés (aucune ligne ne peut les contenir).
+    """
+    mask, bitless = 0, []
+    for code, bit in Allergen.objects.filter(code__in=codes).values_list("code", "bit"):
+        if bit is None:
+            bitless.append(code)
+        else:
+            mask |= 1 << bit
+    return mask, bitless
+
+
+def without_allergens(queryset, codes):
+    """Lignes ne contenant aucun des allergènes `codes`."""
+    mask, bitless = code_masks(codes)
+    if mask:
+        queryset = queryset.alias(allergen_hits=F("allergen_mask").bitand(mask)).filter(allergen_hits=0)
+    if bitless:
+        queryset = queryset.exclude(allergens__code__in=bitless)
+    return queryset
+
+
+def with_any_allergen(queryset, codes):
+    """Lignes contenant au moins un des allergènes `codes`."""
+    mask, bitless = code_masks(codes)
+    if not (mask or bitless):
+        return queryset.none()
+    hits = Q()
+    if mask:
+        queryset = queryset.alias(allergen_hits=F("allergen_mask").bitand(mask))
+        hits |= ~Q(allergen_hits=0)
+    if bitless:
+        hits |= Q(pk__in=queryset.model.objects.filter(allergens__code__in=bitless).values("pk"))
+    return queryset.filter(hits)
+
+
+def refresh_allergen_masks(model, ids=None, bits=None):
+    """
+    Recalcule `allergen_mask` d'un modèle à m2m `allergens` (Product,
+    SupplierOffer) pour `ids` (tous si None) et avance leur `updated_at`.
+    """
+    field = model._meta.get_field("allergens")
+    through, column = field.remote_field.through, f"{field.m2m_field_name()}_id"
+    bits = allergen_bits() if bits is None else bits
+    objects = model.objects.all() if ids is None else model.objects.filter(pk__in=ids)
+    links = through.objects.all() if ids is None else through.objects.filter(**{f"{column}__in": ids})
+    allergen_ids = defaultdict(set)
+    for obj_id, allergen_id in links.values_list(column, "allergen_id"):
+        allergen_ids[obj_id].add(allergen_id)
+    now = timezone.now()
+    model.objects.bulk_update(
+        [model(pk=pk, allergen_mask=mask_of(allergen_ids[pk], bits), updated_at=now)
+         for pk in objects.values_list("pk", flat=True)],
+        ["allergen_mask", "updated_at"], batch_size=500,
+    )
+
+
+def clear_allergen_bit(model, bit):
+    """Retire un bit de tous les masques (allergène supprimé)."""
+    if bit is not None:
+        model.objects.filter(allergen_mask__gt=0).update(allergen_mask=F("allergen_mask").bitand(~(1 << bit)))
+
+
+# ---- régimes ----
+# allergènes d'origine animale : interdits dans un plat vegan
+NON_VEGAN_ALLERGENS = getattr(settings, "NON_VEGAN_ALLERGENS", ["LAIT", "OEUFS", "POISSONS", "CRUSTACES", "MOLLUSQUES"])
+
+
+def diet_errors(products, is_vegan, extra_allergens=(), non_vegan=None):
+    """
+    Messages d'erreur pour des produits / allergènes déjà chargés : tout produit
+    doit être végétarien ; un plat vegan n'a aucun allergène de NON_VEGAN_ALLERGENS.
+    `non_vegan` : `code_masks(NON_VEGAN_ALLERGENS)` précalculé (import en lot).
+    """
+    errors = []
+    meat = [p.name for p in products if not p.is_vegetarian]
+    if meat:
+        errors.append("Tous les produits doivent être végétariens (%s)." % ", ".join(meat))
+    if is_vegan:
+        mask, bitless = code_masks(NON_VEGAN_ALLERGENS) if non_vegan is None else non_vegan
+        flagged = set()
+        if bitless:
+            # allergènes sans bit : une requête sur la table de liaison
+            flagged = set(Product.allergens.through.objects.filter(
+                product_id__in=[p.pk for p in products], allergen__code__in=bitless,
+            ).values_list("product_id", flat=True))
+        animal = [p.name for p in products if p.allergen_mask & mask or p.pk in flagged]
+        animal += [a.code for a in extra_allergens if a.code in NON_VEGAN_ALLERGENS]
+        if animal:
+            errors.append("Un plat vegan ne peut pas contenir d'allergène d'origine animale (%s)." % ", ".join(animal))
+    return errors
+
+
+# ---- union matérialisée des plats ----
+def compute_dish_allergens(dish_ids):
+    """{dish_id: {allergen_id}} pour les plats demandés (sans rien écrire)."""
+    union = {dish_id: set() for dish_id in dish_ids}
+    product_allergens = defaultdict(set)
+    links = list(Dish.products.through.objects.filter(dish_id__in=union).values_list("dish_id", "product_id"))
+    for product_id, allergen_id in Product.allergens.through.objects.filter(
+            product_id__in={product_id for _, product_id in links}).values_list("product_id", "allergen_id"):
+        product_allergens[product_id].add(allergen_id)
+    for dish_id, product_id in links:
+        union[dish_id] |= product_allergens[product_id]
+    for dish_id, allergen_id in Dish.extra_allergens.through.objects.filter(
+            dish_id__in=union).values_list("dish_id", "allergen_id"):
+        union[dish_id].add(allergen_id)
+    return union
+
+
+def refresh_dish_allergens(dish_ids, bits=None):
+    """Réécrit l'union matérialisée et le masque des plats donnés, avance leur `updated_at`."""
+    dish_ids = set(dish_ids)
+    if not dish_ids:
+        return
+    union = compute_dish_allergens(dish_ids)
+    bits = allergen_bits() if bits is None else bits
+    through = Dish.allergens.through
+    now = timezone.now()
+    with transaction.atomic():
+        through.objects.filter(dish_id__in=dish_ids).delete()
+        through.objects.bulk_create(
+            [through(dish_id=dish_id, allergen_id=allergen_id)
+             for dish_id, allergen_ids in union.items() for allergen_id in allergen_ids],
+            batch_size=500,
+        )
+        Dish.objects.bulk_update(
+            [Dish(pk=dish_id, allergen_mask=mask_of(allergen_ids, bits), updated_at=now)
+             for dish_id, allergen_ids in union.items()],
+            ["allergen_mask", "updated_at"], batch_size=500,
+        )
+
+
+def dishes_with_products(product_ids):
+    return set(
+        Dish.products.through.objects.filter(product_id__in=product_ids).values_list("dish_id", flat=True)
+    )
@@ -0,0 +1,185 @@
+"""
+Import de plats en masse (CSV ou JSON).
+
+Les produits (IDs ou noms, sans casse) et les allergènes (codes) de tout le
+fichier sont résolus en une requête chacun ; les règles végétarien / vegan
+sont vérifiées sur ces objets en mémoire (`menu.allergens.diet_errors`).
+Si une ligne est invalide, rien n'est écrit. Sinon plats et liaisons m2m sont
+insérés par `bulk_create` (tables de liaison comprises), puis l'union des
+allergènes, les masques et l'index de recherche sont recalculés une fois
+pour le lot.
+"""
+import csv
+import io
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .allergens import NON_VEGAN_ALLERGENS, code_masks, diet_errors, refresh_dish_allergens
+from .models import Allergen, Dish, Product
+from .search import refresh_search_vectors
+from .signals import catalog_changed
+
+DISH_IMPORT_MAX = 5000
+DISH_IMPORT_BATCH = 500
+CSV_LIST_SEPARATOR = "|"
+CSV_EXTRA_FIELDS = "_extra_fields"  # ligne CSV plus longue que l'en-tête
+TRUE_VALUES = {"1", "true", "oui", "yes", "vrai"}
+
+
+def read_rows(request):
+    """Lignes à importer : JSON (`dishes` ou liste), fichier CSV ou corps text/csv."""
+    if request.content_type.startswith("text/csv"):
+        content = request.body
+    elif "file" in request.FILES:
+        content = request.FILES["file"].read()
+    else:
+        rows = request.data if isinstance(request.data, list) else request.data.get("dishes")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("'dishes' doit être une liste d'objets.")
+        return rows
+
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Le fichier CSV doit être encodé en UTF-8.")
+    # en-tête : name, description, price, is_vegan, is_active, products, extra_allergens
+    rows = []
+    for row in csv.DictReader(io.StringIO(text), restkey=CSV_EXTRA_FIELDS):
+        extra = row.pop(CSV_EXTRA_FIELDS, None)
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+        if extra:
+            row[CSV_EXTRA_FIELDS] = len(extra)
+        for key in ("products", "extra_allergens"):
+            row[key] = [x.strip() for x in row.get(key, "").split(CSV_LIST_SEPARATOR) if x.strip()]
+        rows.append(row)
+    return rows
+
+
+def _as_list(value):
+    if value in (None, ""):
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _as_bool(value, default):
+    if value in (None, ""):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _is_id(ref):
+    if isinstance(ref, bool):
+        return False
+    return isinstance(ref, int) or (str(ref).isascii() and str(ref).isdigit())
+
+
+def _lookups(rows):
+    """Produits ({id}, {nom en minuscules: [..]}) et allergènes {code} de tout le lot : 2 requêtes."""
+    ids, names, codes = set(), set(), set()
+    for row in rows:
+        for ref in _as_list(row.get("products")):
+            if _is_id(ref):
+                ids.add(int(ref))
+            else:
+                names.add(str(ref).strip().lower())
+        codes.update(str(code).strip().upper() for code in _as_list(row.get("extra_allergens")))
+    products_by_id, products_by_name = {}, {}
+    if ids or names:
+        products = Product.objects.alias(name_lower=Lower("name")).filter(
+            Q(pk__in=ids) | Q(name_lower__in=names))
+        for product in products:
+            products_by_id[product.pk] = product
+            products_by_name.setdefault(product.name.lower(), []).append(product)
+    allergens = {a.code.upper(): a for a in Allergen.objects.filter(code__in=codes)} if codes else {}
+    return products_by_id, products_by_name, allergens
+
+
+def _parse_row(row, products_by_id, products_by_name, allergens, non_vegan):
+    """(plat non enregistré, produits, allergènes, erreurs)"""
+    errors = []
+    if row.get(CSV_EXTRA_FIELDS):
+        errors.append(f"{row[CSV_EXTRA_FIELDS]} champ(s) de plus que l'en-tête.")
+    values = {}
+    for field, raw in (("name", str(row.get("name") or "").strip()),
+                       ("price", str(row.get("price") or "").replace(",", "."))):
+        try:
+            values[field] = Dish._meta.get_field(field).clean(raw, None)
+        except DjangoValidationError as exc:
+            values[field] = None
+            errors += [f"'{field}' : {message}" for message in exc.messages]
+    if values["price"] is not None and values["price"] < 0:
+        errors.append("'price' : doit être positif.")
+
+    products = []
+    for ref in _as_list(row.get("products")):
+        if _is_id(ref):
+            product = products_by_id.get(int(ref))
+            if product is None:
+                errors.append(f"Produit introuvable : {ref}.")
+            else:
+                products.append(product)
+            continue
+        matches = products_by_name.get(str(ref).strip().lower(), [])
+        if len(matches) != 1:
+            errors.append(f"Produit {'introuvable' if not matches else 'ambigu'} : {ref}.")
+        else:
+            products.append(matches[0])
+    extra = []
+    for code in _as_list(row.get("extra_allergens")):
+        allergen = allergens.get(str(code).strip().upper())
+        if allergen is None:
+            errors.append(f"Allergène inconnu : {code}.")
+        else:
+            extra.append(allergen)
+
+    is_vegan = _as_bool(row.get("is_vegan"), False)
+    errors += diet_errors(products, is_vegan, extra, non_vegan)
+    dish = Dish(
+        name=values["name"], description=str(row.get("description") or ""),
+        price=values["price"], is_vegan=is_vegan, is_active=_as_bool(row.get("is_active"), True),
+    )
+    # doublons d'une même ligne retirés (contrainte unique des tables de liaison)
+    return dish, list({p.pk: p for p in products}.values()), list({a.pk: a for a in extra}.values()), errors
+
+
+def import_dishes(rows, dry_run=False):
+    """
+    ({"created": n, "ids": [..]}, None) ou (None, [{"row": i, "errors": [..]}]) ;
+    `row` compte à partir de 1 (hors en-tête CSV).
+    """
+    products_by_id, products_by_name, allergens = _lookups(rows)
+    non_vegan = code_masks(NON_VEGAN_ALLERGENS)
+    parsed, failures = [], []
+    for i, row in enumerate(rows, start=1):
+        dish, products, extra, errors = _parse_row(row, products_by_id, products_by_name, allergens, non_vegan)
+        if errors:
+            failures.append({"row": i, "errors": errors})
+        parsed.append((dish, products, extra))
+    if failures:
+        return None, failures
+    if dry_run:
+        return {"created": 0, "valid": len(parsed), "ids": []}, None
+
+    with transaction.atomic():
+        dishes = Dish.objects.bulk_create([dish for dish, _, _ in parsed], batch_size=DISH_IMPORT_BATCH)
+        Dish.products.through.objects.bulk_create(
+            [Dish.products.through(dish_id=dish.pk, product_id=product.pk)
+             for dish, (_, products, _) in zip(dishes, parsed) for product in products],
+            batch_size=DISH_IMPORT_BATCH,
+        )
+        Dish.extra_allergens.through.objects.bulk_create(
+            [Dish.extra_allergens.through(dish_id=dish.pk, allergen_id=allergen.pk)
+             for dish, (_, _, extra) in zip(dishes, parsed) for allergen in extra],
+            batch_size=DISH_IMPORT_BATCH,
+        )
+        # bulk_create n'émet ni post_save ni m2m_changed : dérivés recalculés une fois
+        ids = [dish.pk for dish in dishes]
+        refresh_dish_allergens(ids)
+        refresh_search_vectors(Dish, ids)
+    catalog_changed.send(sender=Dish, restaurant_ids=None)
+    return {"created": len(ids), "ids": ids}, None
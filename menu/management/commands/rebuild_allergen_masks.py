@@ -0,0 +1,34 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from menu.allergens import allergen_bits, refresh_allergen_masks, refresh_dish_allergens
+from menu.models import Allergen, Dish
+
+CHUNK = 1000
+
+
+class Command(BaseCommand):
+    help = ("Attribue un bit aux allergènes qui n'en ont pas, puis recalcule l'union "
+            "des allergènes des plats et tous les masques allergen_mask (Product, Dish, SupplierOffer…).")
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            for allergen in Allergen.objects.filter(bit__isnull=True).order_by("pk"):
+                allergen.save(update_fields=["bit"])
+            bits = allergen_bits()
+
+            models = [
+                model for model in apps.get_models()
+                if model is not Dish and any(f.name == "allergen_mask" for f in model._meta.get_fields())
+            ]
+            for model in models:
+                refresh_allergen_masks(model, bits=bits)
+                self.stdout.write(f"{model._meta.label} : {model.objects.count()} masque(s) recalculé(s).")
+
+            dish_ids = list(Dish.objects.values_list("pk", flat=True))
+            for i in range(0, len(dish_ids), CHUNK):
+                refresh_dish_allergens(dish_ids[i:i + CHUNK], bits)
+            self.stdout.write(f"menu.Dish : {len(dish_ids)} union(s) et masque(s) recalculé(s).")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(bits)} allergène(s) indexé(s)."))
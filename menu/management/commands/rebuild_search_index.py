@@ -0,0 +1,18 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from menu.search import SEARCH_FIELDS, refresh_search_vectors
+
+
+class Command(BaseCommand):
+    help = ("Recalcule les colonnes de recherche plein texte (Dish.product_names, "
+            "search_vector de Dish, Product, SupplierOffer…).")
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            for label in SEARCH_FIELDS:
+                model = apps.get_model(label)
+                refresh_search_vectors(model)
+                self.stdout.write(f"{label} : {model.objects.count()} ligne(s) indexée(s).")
+        self.stdout.write(self.style.SUCCESS("Index de recherche reconstruit."))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_dish_allergens(apps, schema_editor):
+    Dish = apps.get_model("menu", "Dish")
+    Product = apps.get_model("menu", "Product")
+    union = defaultdict(set)
+    product_allergens = defaultdict(set)
+    for product_id, allergen_id in Product.allergens.through.objects.values_list("product_id", "allergen_id"):
+        product_allergens[product_id].add(allergen_id)
+    for dish_id, product_id in Dish.products.through.objects.values_list("dish_id", "product_id"):
+        union[dish_id] |= product_allergens[product_id]
+    for dish_id, allergen_id in Dish.extra_allergens.through.objects.values_list("dish_id", "allergen_id"):
+        union[dish_id].add(allergen_id)
+    through = Dish.allergens.through
+    through.objects.bulk_create(
+        [through(dish_id=dish_id, allergen_id=allergen_id)
+         for dish_id, allergen_ids in union.items() for allergen_id in allergen_ids],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='allergens',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='dishes', to='menu.allergen'),
+        ),
+        migrations.RunPython(backfill_dish_allergens, migrations.RunPython.noop),
+    ]
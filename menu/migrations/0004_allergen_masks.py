@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:30
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def _masks(links, bits):
+    masks = defaultdict(int)
+    for obj_id, allergen_id in links:
+        if allergen_id in bits:
+            masks[obj_id] |= 1 << bits[allergen_id]
+    return masks
+
+
+def backfill_allergen_masks(apps, schema_editor):
+    Allergen = apps.get_model("menu", "Allergen")
+    Product = apps.get_model("menu", "Product")
+    Dish = apps.get_model("menu", "Dish")
+    allergens = list(Allergen.objects.order_by("pk")[:63])
+    for bit, allergen in enumerate(allergens):
+        allergen.bit = bit
+    Allergen.objects.bulk_update(allergens, ["bit"])
+    bits = {allergen.pk: allergen.bit for allergen in allergens}
+
+    masks = _masks(Product.allergens.through.objects.values_list("product_id", "allergen_id"), bits)
+    Product.objects.bulk_update(
+        [Product(pk=pk, allergen_mask=mask) for pk, mask in masks.items()], ["allergen_mask"], batch_size=500)
+    masks = _masks(Dish.allergens.through.objects.values_list("dish_id", "allergen_id"), bits)
+    Dish.objects.bulk_update(
+        [Dish(pk=pk, allergen_mask=mask) for pk, mask in masks.items()], ["allergen_mask"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_dish_allergens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='allergen',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='allergen_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='allergen_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_allergen_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:10
+
+from collections import defaultdict
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+# copie figée de menu.search à la date de la migration
+DISH_VECTOR = (
+    SearchVector("name", weight="A", config="french")
+    + SearchVector("description", weight="B", config="french")
+    + SearchVector("product_names", weight="C", config="french")
+)
+PRODUCT_VECTOR = (
+    SearchVector("name", weight="A", config="french")
+    + SearchVector("producer_name", weight="B", config="french")
+    + SearchVector("region", weight="C", config="french")
+)
+
+
+def backfill_search(apps, schema_editor):
+    Dish = apps.get_model("menu", "Dish")
+    Product = apps.get_model("menu", "Product")
+    names = defaultdict(list)
+    for dish_id, name in Dish.products.through.objects.order_by("product__name").values_list(
+            "dish_id", "product__name"):
+        names[dish_id].append(name)
+    Dish.objects.bulk_update(
+        [Dish(pk=pk, product_names=" ".join(product_names)) for pk, product_names in names.items()],
+        ["product_names"], batch_size=500,
+    )
+    if schema_editor.connection.vendor == "postgresql":
+        Dish.objects.update(search_vector=DISH_VECTOR)
+        Product.objects.update(search_vector=PRODUCT_VECTOR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_allergen_masks'),
+    ]
+
+    operations = [
+        TrigramExtension(),  # sans effet hors PostgreSQL
+        migrations.AddField(
+            model_name='dish',
+            name='product_names',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='dish_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='dish_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(backfill_search, migrations.RunPython.noop),
+    ]
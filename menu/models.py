@@ -1,15 +1,53 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, transaction
 from django.core.exceptions import ValidationError
 from restaurants.models import Restaurant
 
 # --- Référentiel d’allergènes ---
+ALLERGEN_MAX_BITS = 63  # masques stockés en BigIntegerField signé
+ALLERGEN_BIT_RETRIES = 5
+
+
 class Allergen(models.Model):
     code = models.CharField(max_length=32, unique=True)  # ex: GLUTEN, SOJA, LAIT, ARACHIDES...
     label = models.CharField(max_length=100)
+    # position dans les masques `allergen_mask` (Product, Dish, SupplierOffer)
+    bit = models.PositiveSmallIntegerField(unique=True, null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["label"]
 
+    def save(self, *args, **kwargs):
+        # ligne existante sans bit (bulk_create, au-delà du 63e) : les masques des
+        # produits, plats et offres déjà liés sont recalculés par les signaux post_save
+        self.bit_assigned = False
+        if self.bit is not None:
+            return super().save(*args, **kwargs)
+        self.bit_assigned = not self._state.adding
+        # premier bit libre ; deux créations simultanées peuvent viser le même :
+        # la contrainte unique tranche, le perdant réessaie avec le suivant
+        for _ in range(ALLERGEN_BIT_RETRIES):
+            used = set(Allergen.objects.exclude(bit__isnull=True).values_list("bit", flat=True))
+            free = [b for b in range(ALLERGEN_MAX_BITS) if b not in used]
+            if not free:
+                raise ValidationError(f"{ALLERGEN_MAX_BITS} allergènes maximum.")
+            self.bit = free[0]
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken = Allergen.objects.filter(bit=self.bit).exclude(pk=self.pk).exists()
+                self.bit = None
+                if not taken:
+                    raise  # autre contrainte (code déjà pris)
+        raise ValidationError("Attribution du bit d'allergène impossible, réessayez.")
+
+    @property
+    def mask(self):
+        return 1 << self.bit if self.bit is not None else 0
+
     def __str__(self):
         return f"{self.label} ({self.code})"
 
@@ -23,9 +61,17 @@ class Product(models.Model):
     is_vegetarian = models.BooleanField(default=True)
 
     allergens = models.ManyToManyField(Allergen, blank=True, related_name="products")
+    allergen_mask = models.BigIntegerField(default=0, editable=False)
+    # plein texte, tenu à jour par menu.signals (voir menu.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="product_search_idx"),
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="product_name_trgm_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -41,9 +87,20 @@ class Dish(models.Model):
 
     products = models.ManyToManyField(Product, related_name="dishes", blank=True)
     extra_allergens = models.ManyToManyField(Allergen, blank=True, related_name="dishes_extra")
+    # union produits + extra, tenue à jour par menu.signals (voir menu.allergens)
+    allergens = models.ManyToManyField(Allergen, blank=True, editable=False, related_name="dishes")
+    allergen_mask = models.BigIntegerField(default=0, editable=False)
+    # plein texte (nom, description, noms des produits), tenu à jour par menu.signals (voir menu.search)
+    product_names = models.TextField(blank=True, default="", editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="dish_search_idx"),
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="dish_name_trgm_idx"),
+        ]
 
     def clean(self):
         if self.products.filter(is_vegetarian=False).exists():
@@ -53,9 +110,27 @@ class Dish(models.Model):
         return self.name
 
     def allergens_union_qs(self):
-        ids = set(self.products.values_list("allergens__id", flat=True)) - {None}
-        ids |= set(self.extra_allergens.values_list("id", flat=True))
-        return Allergen.objects.filter(id__in=ids)
+        """Union recalculée en base (une requête), indépendante de `allergens`."""
+        return Allergen.objects.filter(
+            models.Q(products__dishes=self) | models.Q(dishes_extra=self)
+        ).distinct()
+
+    def allergens_union(self):
+        """
+        Allergènes du plat, triés par libellé, sans requête si le cache de
+        prefetch les contient (`allergens`, ou `products__allergens` + `extra_allergens`).
+        """
+        cache = getattr(self, "_prefetched_objects_cache", {})
+        if "allergens" in cache:
+            found = list(cache["allergens"])
+        elif "products" in cache and "extra_allergens" in cache and all(
+                "allergens" in getattr(p, "_prefetched_objects_cache", {}) for p in cache["products"]):
+            union = {a.pk: a for p in cache["products"] for a in p.allergens.all()}
+            union.update((a.pk, a) for a in cache["extra_allergens"])
+            found = list(union.values())
+        else:
+            found = list(self.allergens.all())
+        return sorted(found, key=lambda a: a.label)
 
 
 # --- Disponibilité locale d’un plat (rupture / restau spécifique / date) ---
@@ -81,6 +156,7 @@ class Menu(models.Model):
     end_date = models.DateField()
     restaurants = models.ManyToManyField(Restaurant, related_name="menus")
     is_published = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-start_date", "title"]
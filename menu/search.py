@@ -0,0 +1,93 @@
+"""
+Recherche plein texte : plats, produits, offres fournisseurs.
+
+PostgreSQL : colonne `search_vector` (tsvector, configuration `french` :
+racinisation, mots vides) pondérée par champ, indexée GIN et tenue à jour par
+les signaux ; les fautes de frappe sont rattrapées par trigrammes sur le nom
+(`pg_trgm`, index GIN `gin_trgm_ops`). Score = ts_rank + similarité du nom.
+
+Autres bases (SQLite en test) : chaque mot doit apparaître dans un des champs
+(`icontains`) ; score = somme des poids des champs touchés, mêmes poids que
+ts_rank (A 1.0, B 0.4, C 0.2, D 0.1).
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+from .models import Dish
+
+SEARCH_CONFIG = "french"
+SEARCH_MIN_LENGTH = 2
+RANK_WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+# (champ, poids) par modèle ; le premier champ est le nom (trigrammes)
+SEARCH_FIELDS = {
+    "menu.Dish": (("name", "A"), ("description", "B"), ("product_names", "C")),
+    "menu.Product": (("name", "A"), ("producer_name", "B"), ("region", "C")),
+    "market.SupplierOffer": (("product_name", "A"), ("producer_name", "B"), ("description", "C"), ("region", "D")),
+}
+
+
+def _is_postgres(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def search_vector(fields):
+    """Expression tsvector pondérée : setweight(to_tsvector('french', champ), poids) || …"""
+    return reduce(
+        lambda vector, part: vector + part,
+        (SearchVector(field, weight=weight, config=SEARCH_CONFIG) for field, weight in fields),
+    )
+
+
+def refresh_product_names(dish_ids=None):
+    """Recopie les noms des produits dans `Dish.product_names` (tous les plats si None)."""
+    links = Dish.products.through.objects.all()
+    dishes = Dish.objects.all()
+    if dish_ids is not None:
+        links, dishes = links.filter(dish_id__in=dish_ids), dishes.filter(pk__in=dish_ids)
+    names = defaultdict(list)
+    for dish_id, name in links.order_by("product__name").values_list("dish_id", "product__name"):
+        names[dish_id].append(name)
+    Dish.objects.bulk_update(
+        [Dish(pk=pk, product_names=" ".join(names[pk])) for pk in dishes.values_list("pk", flat=True)],
+        ["product_names"], batch_size=500,
+    )
+
+
+def refresh_search_vectors(model, ids=None):
+    """Recalcule `search_vector` de `ids` (tous si None) ; sans effet hors PostgreSQL."""
+    if ids is not None and not ids:
+        return
+    if model is Dish:
+        refresh_product_names(ids)
+    queryset = model.objects.all() if ids is None else model.objects.filter(pk__in=ids)
+    if _is_postgres(queryset):
+        queryset.update(search_vector=search_vector(SEARCH_FIELDS[model._meta.label]))
+
+
+def search(queryset, q):
+    """Lignes correspondant à `q`, annotées `rank` et triées par pertinence décroissante."""
+    fields = SEARCH_FIELDS[queryset.model._meta.label]
+    name = fields[0][0]
+    if _is_postgres(queryset):
+        query = SearchQuery(q, config=SEARCH_CONFIG, search_type="websearch")
+        return (
+            queryset
+            .annotate(rank=SearchRank(F("search_vector"), query) + TrigramWordSimilarity(q, name))
+            .filter(Q(search_vector=query) | Q(**{f"{name}__trigram_word_similar": q}))
+            .order_by("-rank", "-pk")
+        )
+    rank = Value(0.0, output_field=FloatField())
+    for term in q.split():
+        queryset = queryset.filter(reduce(or_, (Q(**{f"{field}__icontains": term}) for field, _ in fields)))
+        for field, weight in fields:
+            rank = rank + Case(
+                When(**{f"{field}__icontains": term}, then=Value(RANK_WEIGHTS[weight])),
+                default=Value(0.0), output_field=FloatField(),
+            )
+    return queryset.annotate(rank=rank).order_by("-rank", "-pk")
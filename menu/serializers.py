@@ -1,16 +1,20 @@
+from django.db import transaction
 from rest_framework import serializers
+
+from config.serializers import SparseFieldsetMixin
 from restaurants.models import Restaurant
+from .allergens import diet_errors
 from .models import Allergen, Product, Dish, DishAvailability, Menu, MenuItem
 
 # --- Allergènes ---
-class AllergenSerializer(serializers.ModelSerializer):
+class AllergenSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Allergen
         fields = ["id", "code", "label"]
 
 
 # --- Produits ---
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     allergens = serializers.PrimaryKeyRelatedField(queryset=Allergen.objects.all(), many=True, required=False)
 
     class Meta:
@@ -19,7 +23,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
 
 # --- Plats ---
-class DishSerializer(serializers.ModelSerializer):
+class DishSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     products = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), many=True, required=False)
     extra_allergens = serializers.PrimaryKeyRelatedField(queryset=Allergen.objects.all(), many=True, required=False)
     allergens = serializers.SerializerMethodField()
@@ -30,18 +34,23 @@ class DishSerializer(serializers.ModelSerializer):
                   "products", "extra_allergens", "allergens"]
 
     def get_allergens(self, obj):
-        return list(obj.allergens_union_qs().values("id", "code", "label"))
+        return [{"id": a.id, "code": a.code, "label": a.label} for a in obj.allergens_union()]
 
     def validate(self, data):
-        prods = data.get("products", []) or getattr(self.instance, "products", None)
-        if prods:
-            if any([not p.is_vegetarian for p in prods]):
-                raise serializers.ValidationError("Tous les produits doivent être végétariens.")
+        # produits et allergènes du payload déjà chargés par les PrimaryKeyRelatedField
+        instance = self.instance
+        products = data["products"] if "products" in data else (
+            list(instance.products.all()) if instance else [])
+        extra = data["extra_allergens"] if "extra_allergens" in data else (
+            list(instance.extra_allergens.all()) if instance else [])
+        errors = diet_errors(products, data.get("is_vegan", getattr(instance, "is_vegan", False)), extra)
+        if errors:
+            raise serializers.ValidationError(errors)
         return data
 
 
 # --- Disponibilités ---
-class DishAvailabilitySerializer(serializers.ModelSerializer):
+class DishAvailabilitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = DishAvailability
         fields = ["id", "dish", "restaurant", "date", "is_available"]
@@ -57,7 +66,7 @@ class MenuItemSerializer(serializers.ModelSerializer):
         fields = ["id", "dish", "dish_id", "course_type"]
 
 
-class MenuSerializer(serializers.ModelSerializer):
+class MenuSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = MenuItemSerializer(many=True)
     restaurants = serializers.PrimaryKeyRelatedField(queryset=Restaurant.objects.all(), many=True)
 
@@ -70,25 +79,50 @@ class MenuSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("end_date doit être ≥ start_date")
         return data
 
+    @staticmethod
+    def _item_keys(items_data):
+        """Clés (dish_id, course_type) demandées, doublons retirés, ordre conservé."""
+        return list(dict.fromkeys((item["dish"].pk, item["course_type"]) for item in items_data))
+
+    @transaction.atomic
     def create(self, validated_data):
+        from .signals import catalog_changed
+
         items_data = validated_data.pop("items", [])
         restaurants = validated_data.pop("restaurants", [])
         menu = Menu.objects.create(**validated_data)
         menu.restaurants.set(restaurants)
-        for item in items_data:
-            MenuItem.objects.create(menu=menu, **item)
+        MenuItem.objects.bulk_create([
+            MenuItem(menu=menu, dish_id=dish_id, course_type=course_type)
+            for dish_id, course_type in self._item_keys(items_data)
+        ])
+        # bulk_create n'émet pas post_save
+        catalog_changed.send(sender=MenuItem, restaurant_ids=None)
         return menu
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         items_data = validated_data.pop("items", None)
         restaurants = validated_data.pop("restaurants", None)
         for k, v in validated_data.items():
             setattr(instance, k, v)
-        instance.save()
         if restaurants is not None:
             instance.restaurants.set(restaurants)
         if items_data is not None:
-            instance.items.all().delete()
-            for item in items_data:
-                MenuItem.objects.create(menu=instance, **item)
+            # diff sur (plat, type) : on ne touche qu'aux lignes ajoutées ou retirées
+            wanted = self._item_keys(items_data)
+            keep = set(wanted)
+            existing = {
+                (dish_id, course_type): pk
+                for pk, dish_id, course_type in instance.items.values_list("pk", "dish_id", "course_type")
+            }
+            removed = [pk for key, pk in existing.items() if key not in keep]
+            if removed:
+                MenuItem.objects.filter(pk__in=removed).delete()
+            MenuItem.objects.bulk_create([
+                MenuItem(menu=instance, dish_id=dish_id, course_type=course_type)
+                for dish_id, course_type in wanted if (dish_id, course_type) not in existing
+            ])
+        # en dernier : avance updated_at (ETag) et émet catalog_changed après l'écriture des items
+        instance.save()
         return instance
@@ -0,0 +1,149 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .allergens import (
+    allergen_bits, clear_allergen_bit, dishes_with_products, refresh_allergen_masks, refresh_dish_allergens,
+)
+from .models import Allergen, Product, Dish, DishAvailability, Menu, MenuItem
+from .search import refresh_search_vectors
+from .today import invalidate_menu_today
+
+# Émis à chaque écriture du catalogue (menus, plats, produits, allergènes,
+# disponibilités). `restaurant_ids` : restaurants concernés, None = tous.
+# Les écritures en masse (update, bulk_create…) doivent l'émettre elles-mêmes.
+catalog_changed = Signal()
+
+# Les plats sérialisent leurs produits et l'union des allergènes : toute
+# modification de ces relations recalcule `Dish.allergens`, les masques
+# `allergen_mask` et avance `updated_at` des plats (et produits) concernés,
+# pour que leurs ETag / Last-Modified changent aussi.
+
+M2M_POST_ACTIONS = {"post_add", "post_remove", "post_clear"}
+
+
+def touch(queryset):
+    queryset.update(updated_at=timezone.now())
+
+
+def _affected(sender, instance, reverse, pk_set):
+    """(plats, produits) concernés par un changement m2m ; pk_set None = clear."""
+    if sender is Product.allergens.through:
+        if not reverse:
+            product_ids = {instance.pk}
+        else:
+            product_ids = set(pk_set) if pk_set is not None else set(
+                instance.products.values_list("pk", flat=True))
+        return dishes_with_products(product_ids), product_ids
+    if not reverse:
+        return {instance.pk}, set()
+    if pk_set is not None:
+        return set(pk_set), set()
+    related = instance.dishes if sender is Dish.products.through else instance.dishes_extra
+    return set(related.values_list("pk", flat=True)), set()
+
+
+@receiver(m2m_changed, sender=Dish.products.through)
+@receiver(m2m_changed, sender=Dish.extra_allergens.through)
+@receiver(m2m_changed, sender=Product.allergens.through)
+def sync_dish_allergens(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # après le clear, les liaisons à relire n'existent plus
+        instance._m2m_cleared = _affected(sender, instance, reverse, None)
+        return
+    if action not in M2M_POST_ACTIONS:
+        return
+    if action == "post_clear":
+        dish_ids, product_ids = instance.__dict__.pop("_m2m_cleared", (set(), set()))
+    else:
+        dish_ids, product_ids = _affected(sender, instance, reverse, pk_set)
+    bits = allergen_bits()
+    if product_ids:
+        refresh_allergen_masks(Product, product_ids, bits)
+    refresh_dish_allergens(dish_ids, bits)
+    if sender is Dish.products.through:
+        refresh_search_vectors(Dish, dish_ids)
+    catalog_changed.send(sender=sender, restaurant_ids=None)
+
+
+@receiver(post_save, sender=Product)
+def touch_product_dishes(sender, instance, **kwargs):
+    touch(Dish.objects.filter(products=instance))
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_dishes(sender, instance, **kwargs):
+    # la suppression en cascade des liaisons n'émet pas m2m_changed
+    instance._dish_ids = dishes_with_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def refresh_product_dishes(sender, instance, **kwargs):
+    dish_ids = getattr(instance, "_dish_ids", ())
+    refresh_dish_allergens(dish_ids)
+    refresh_search_vectors(Dish, dish_ids)
+
+
+@receiver([post_save, pre_delete], sender=Allergen)
+def touch_allergen_users(sender, instance, **kwargs):
+    touch(Product.objects.filter(allergens=instance))
+    touch(Dish.objects.filter(allergens=instance))
+
+
+@receiver(post_save, sender=Allergen)
+def fill_allergen_masks(sender, instance, **kwargs):
+    """Bit attribué à un allergène déjà lié : masques recalculés (même transaction que save)."""
+    if not getattr(instance, "bit_assigned", False):
+        return
+    bits = allergen_bits()
+    refresh_allergen_masks(Product, set(instance.products.values_list("pk", flat=True)), bits)
+    refresh_dish_allergens(Dish.objects.filter(allergens=instance).values_list("pk", flat=True), bits)
+
+
+@receiver(post_delete, sender=Allergen)
+def clear_allergen_masks(sender, instance, **kwargs):
+    clear_allergen_bit(Product, instance.bit)
+    clear_allergen_bit(Dish, instance.bit)
+
+
+# ---- recherche plein texte (voir menu.search) ----
+@receiver(post_save, sender=Dish)
+def index_dish(sender, instance, **kwargs):
+    refresh_search_vectors(Dish, [instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    refresh_search_vectors(Product, [instance.pk])
+    # les plats indexent les noms de leurs produits
+    refresh_search_vectors(Dish, dishes_with_products([instance.pk]))
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def touch_menu(sender, instance, origin=None, **kwargs):
+    # plat retiré d'un menu : le max(updated_at) des plats ne bouge pas
+    if isinstance(origin, Menu):
+        return  # menu supprimé avec ses lignes
+    touch(Menu.objects.filter(pk=instance.menu_id))
+
+
+# ---- catalogue ----
+@receiver([post_save, post_delete], sender=Menu)
+@receiver([post_save, post_delete], sender=MenuItem)
+@receiver([post_save, post_delete], sender=Dish)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Allergen)
+@receiver(m2m_changed, sender=Menu.restaurants.through)
+def announce_catalog_change(sender, **kwargs):
+    if kwargs.get("action", "post").startswith("post"):
+        catalog_changed.send(sender=sender, restaurant_ids=None)
+
+
+@receiver([post_save, post_delete], sender=DishAvailability)
+def announce_availability_change(sender, instance, **kwargs):
+    catalog_changed.send(sender=sender, restaurant_ids=[instance.restaurant_id])
+
+
+@receiver(catalog_changed)
+def invalidate_menu_today_cache(sender, restaurant_ids=None, **kwargs):
+    invalidate_menu_today(restaurant_ids)
@@ -1,3 +1,124 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .allergens import diet_errors, with_any_allergen, without_allergens
+from .models import Allergen, Dish, Product
+from .search import search
+
+
+class BitlessAllergenTests(TestCase):
+    """Allergène sans bit (bulk_create / loaddata) : les filtres passent par la jointure."""
+
+    def setUp(self):
+        self.gluten = Allergen.objects.create(code="GLUTEN", label="Gluten")
+        Allergen.objects.bulk_create([Allergen(code="LAIT", label="Lait")])
+        self.lait = Allergen.objects.get(code="LAIT")
+        self.bread = Product.objects.create(name="Pain")
+        self.bread.allergens.add(self.gluten)
+        self.cheese = Product.objects.create(name="Fromage")
+        self.cheese.allergens.add(self.lait)
+        self.carrot = Product.objects.create(name="Carotte")
+
+    def test_bit_assigned_on_save(self):
+        self.assertIsNone(self.lait.bit)
+        self.assertIsNotNone(self.gluten.bit)
+
+    def test_without_allergens(self):
+        names = set(without_allergens(Product.objects.all(), ["GLUTEN", "LAIT"]).values_list("name", flat=True))
+        self.assertEqual(names, {"Carotte"})
+
+    def test_with_any_allergen(self):
+        names = set(with_any_allergen(Product.objects.all(), ["GLUTEN", "LAIT"]).values_list("name", flat=True))
+        self.assertEqual(names, {"Pain", "Fromage"})
+        self.assertFalse(with_any_allergen(Product.objects.all(), ["INCONNU"]).exists())
+
+    def test_bit_given_to_linked_allergen_refreshes_masks(self):
+        dish = Dish.objects.create(name="Gratin", price=10)
+        dish.products.add(self.cheese)
+        self.lait.label = "Lait de vache"
+        self.lait.save()
+        self.assertIsNotNone(self.lait.bit)
+        self.assertFalse(without_allergens(Product.objects.filter(pk=self.cheese.pk), ["LAIT"]).exists())
+        self.assertFalse(without_allergens(Dish.objects.filter(pk=dish.pk), ["LAIT"]).exists())
+
+    def test_vegan_check(self):
+        cheese = Product.objects.get(pk=self.cheese.pk)
+        self.assertTrue(diet_errors([cheese], is_vegan=True))
+
+
+class MenuTodayDateTests(TestCase):
+    def test_impossible_date(self):
+        response = self.client.get("/api/menu/today/", {"restaurant": 1, "date": "2025-13-45"})
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchFallbackTests(TestCase):
+    """Repli hors PostgreSQL : icontains par mot, score = somme des poids des champs touchés."""
+
+    def setUp(self):
+        self.in_description = Dish.objects.create(name="Bowl", description="Tofu fumé", price=10)
+        self.in_name = Dish.objects.create(name="Tofu grillé", description="Légumes", price=12)
+        self.in_both = Dish.objects.create(name="Tofu soyeux", description="Tofu et sésame", price=9)
+        self.tie = Dish.objects.create(name="Curry", description="Au tofu", price=11)
+        Dish.objects.create(name="Salade", description="Carottes", price=8)
+
+    def test_ranking_and_order(self):
+        results = list(search(Dish.objects.all(), "tofu"))
+        self.assertEqual(
+            [d.pk for d in results],
+            [self.in_both.pk, self.in_name.pk, self.tie.pk, self.in_description.pk],
+        )
+        self.assertEqual([round(d.rank, 2) for d in results], [1.4, 1.0, 0.4, 0.4])
+
+    def test_every_term_required(self):
+        results = search(Dish.objects.all(), "tofu sésame")
+        self.assertEqual([d.pk for d in results], [self.in_both.pk])
+
+
+class DishImportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("chef@x.fr", "pw", role="RESTAURATEUR")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.tofu = Product.objects.create(name="Tofu")
+
+    def post_csv(self, text):
+        return self.api.post("/api/menu/dishes/import/", text.encode(), content_type="text/csv")
+
+    def test_csv_row_longer_than_header(self):
+        response = self.post_csv("name,price\nCurry,12\nBowl,9,en trop,encore\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["rows"], [{"row": 2, "errors": ["2 champ(s) de plus que l'en-tête."]}])
+        self.assertFalse(Dish.objects.exists())
+
+    def test_csv_import(self):
+        response = self.post_csv("name,price,products\nCurry,12,tofu\n")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(list(Dish.objects.get().products.all()), [self.tofu])
+
+    def test_boolean_is_not_a_product_id(self):
+        response = self.api.post("/api/menu/dishes/import/", {"dishes": [
+            {"name": "Curry", "price": "12", "products": [True]},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["rows"][0]["errors"], ["Produit introuvable : True."])
+
+
+class DishBulkToggleTests(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(get_user_model().objects.create_user("chef@x.fr", "pw", role="RESTAURATEUR"))
+        self.dishes = [Dish.objects.create(name=f"P{i}", price=10) for i in range(3)]
+
+    def toggle(self, ids):
+        return self.api.post("/api/menu/dishes/bulk_toggle/", {"is_active": False, "ids": ids}, format="json")
+
+    def test_ids_must_be_a_list(self):
+        for ids in ("12", 5, [True]):
+            self.assertEqual(self.toggle(ids).status_code, 400, ids)
+        self.assertFalse(Dish.objects.filter(is_active=False).exists())
+
+    def test_toggle(self):
+        response = self.toggle([self.dishes[0].pk, self.dishes[2].pk])
+        self.assertEqual(response.json()["updated"], 2)
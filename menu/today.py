@@ -0,0 +1,80 @@
+"""
+Menu du jour d'un restaurant : menus publiés valides à la date, plats actifs
+et non marqués indisponibles (`DishAvailability.is_available=False`),
+regroupés par type de plat.
+
+Le rendu complet est mis en cache par (restaurant, date). Clé versionnée
+par deux namespaces : global (menus, plats, produits, allergènes) et par
+restaurant (disponibilités), avancés sur `menu.signals.catalog_changed`.
+"""
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from config.cache import bump_cache_version, cache_version, versioned_key
+from restaurants.models import Restaurant
+from .models import DishAvailability, Menu, MenuItem
+from .serializers import DishSerializer
+
+MENU_TODAY_CACHE = "menu-today"
+MENU_TODAY_TTL = 6 * 3600
+
+
+def menu_today_namespace(restaurant_id):
+    return f"{MENU_TODAY_CACHE}:{restaurant_id}"
+
+
+def invalidate_menu_today(restaurant_ids=None):
+    """`restaurant_ids` None : tous les restaurants."""
+    if restaurant_ids is None:
+        bump_cache_version(MENU_TODAY_CACHE)
+        return
+    for restaurant_id in set(restaurant_ids):
+        bump_cache_version(menu_today_namespace(restaurant_id))
+
+
+def build_menu_today(restaurant_id, date_):
+    unavailable = DishAvailability.objects.filter(
+        restaurant_id=restaurant_id, date=date_, is_available=False,
+    ).values("dish_id")
+    items = (
+        MenuItem.objects
+        .filter(dish__is_active=True)
+        .exclude(dish_id__in=unavailable)
+        .select_related("dish")
+        .prefetch_related("dish__products", "dish__extra_allergens", "dish__allergens")
+        .order_by("course_type", "dish__name")
+    )
+    menus = (
+        Menu.objects
+        .filter(is_published=True, restaurants=restaurant_id, start_date__lte=date_, end_date__gte=date_)
+        .prefetch_related(Prefetch("items", queryset=items))
+        .order_by("start_date", "title")
+    )
+    result = []
+    for menu in menus:
+        courses = {code: [] for code, _ in MenuItem.COURSE_CHOICES}
+        for item in menu.items.all():
+            courses[item.course_type].append(DishSerializer(item.dish).data)
+        result.append({
+            "id": menu.id,
+            "title": menu.title,
+            "description": menu.description,
+            "start_date": str(menu.start_date),
+            "end_date": str(menu.end_date),
+            "courses": courses,
+        })
+    return {"restaurant": restaurant_id, "date": str(date_), "menus": result}
+
+
+def menu_today(restaurant_id, date_):
+    """Payload mis en cache ; None si le restaurant n'existe pas (non mis en cache)."""
+    key = versioned_key(
+        menu_today_namespace(restaurant_id), cache_version(MENU_TODAY_CACHE), date_.isoformat(),
+    )
+    payload = cache.get(key)
+    if payload is None:
+        if not Restaurant.objects.filter(pk=restaurant_id).exists():
+            return None
+        payload = build_menu_today(restaurant_id, date_)
+        cache.set(key, payload, MENU_TODAY_TTL)
+    return payload
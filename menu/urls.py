@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AllergenViewSet, ProductViewSet, DishViewSet, DishAvailabilityViewSet, MenuViewSet
+from .views import (
+    AllergenViewSet, ProductViewSet, DishViewSet, DishAvailabilityViewSet, MenuViewSet, menu_today_view, search_view,
+)
 
 router = DefaultRouter()
 router.register(r'allergens', AllergenViewSet, basename='allergens')
@@ -9,4 +11,8 @@ router.register(r'dishes', DishViewSet, basename='dishes')
 router.register(r'dish-availability', DishAvailabilityViewSet, basename='dish-availability')
 router.register(r'menus', MenuViewSet, basename='menus')
 
-urlpatterns = [path('', include(router.urls))]
+urlpatterns = [
+    path('today/', menu_today_view, name='menu-today'),
+    path('search/', search_view, name='menu-search'),
+    path('', include(router.urls)),
+]
@@ -1,27 +1,74 @@
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
 from django.utils.dateparse import parse_date
-from django.db.models import Q
 
-from .models import Allergen, Product, Dish, DishAvailability, Menu
+from .allergens import with_any_allergen, without_allergens
+from .dish_import import DISH_IMPORT_MAX, import_dishes, read_rows
+from .models import Allergen, Product, Dish, DishAvailability, Menu, MenuItem
 from .serializers import (
     AllergenSerializer, ProductSerializer, DishSerializer,
     DishAvailabilitySerializer, MenuSerializer
 )
+from .search import SEARCH_MIN_LENGTH, search
+from .signals import catalog_changed
+from .today import menu_today
+from config.conditional import ConditionalGetMixin
+from config.pagination import paginated_response
+from market.models import SupplierOffer
+from market.serializers import SupplierOfferSerializer
+from restaurants.models import Restaurant
 from restaurants.permissions import IsRestaurateur
 
+AVAILABILITY_BULK_MAX = 10000
+AVAILABILITY_BULK_BATCH = 500
+AVAILABILITY_BULK_MAX_DAYS = 31
+
+
+def _parse_day(value):
+    """YYYY-MM-DD → date ; None si mal formée ou impossible (ex. 2025-13-45)."""
+    try:
+        return parse_date(str(value))
+    except ValueError:
+        return None
+
+
+def _availability_dates(data):
+    """(dates triées, erreur) depuis `dates` ou `date_from` / `date_to`."""
+    if data.get("dates"):
+        raw = data["dates"] if isinstance(data["dates"], list) else [data["dates"]]
+        dates = [_parse_day(d) for d in raw]
+        if None in dates:
+            return None, "Format de date invalide (YYYY-MM-DD)."
+        dates = sorted(set(dates))
+    else:
+        start = _parse_day(data.get("date_from") or "")
+        end = _parse_day(data.get("date_to") or data.get("date_from") or "")
+        if start is None or end is None:
+            return None, "'dates' ou 'date_from' / 'date_to' (YYYY-MM-DD) requis."
+        if end < start:
+            return None, "'date_to' doit être postérieure ou égale à 'date_from'."
+        dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    if len(dates) > AVAILABILITY_BULK_MAX_DAYS:
+        return None, f"{AVAILABILITY_BULK_MAX_DAYS} dates maximum par requête."
+    return dates, None
+
+
 class PublicReadMixin:
     def get_permissions(self):
-        if self.action in ["create", "update", "partial_update", "destroy", "publish", "unpublish"]:
+        if self.action in ["create", "update", "partial_update", "destroy", "publish", "unpublish", "bulk",
+                           "activate", "deactivate", "bulk_toggle", "import_dishes"]:
             return [permissions.IsAuthenticated(), IsRestaurateur()]
         return [permissions.AllowAny()]
 
-class AllergenViewSet(PublicReadMixin, viewsets.ModelViewSet):
+class AllergenViewSet(ConditionalGetMixin, PublicReadMixin, viewsets.ModelViewSet):
     queryset = Allergen.objects.all()
     serializer_class = AllergenSerializer
 
-class ProductViewSet(PublicReadMixin, viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, PublicReadMixin, viewsets.ModelViewSet):
     queryset = Product.objects.prefetch_related("allergens").all()
     serializer_class = ProductSerializer
 
@@ -33,11 +80,11 @@ class ProductViewSet(PublicReadMixin, viewsets.ModelViewSet):
         if p.get("region"):
             qs = qs.filter(region__iexact=p["region"])
         if p.get("allergen"):
-            qs = qs.filter(allergens__code__in=p.get("allergen").split(",")).distinct()
+            qs = with_any_allergen(qs, p["allergen"].split(","))
         return qs
 
-class DishViewSet(PublicReadMixin, viewsets.ModelViewSet):
-    queryset = Dish.objects.prefetch_related("products__allergens", "extra_allergens").all()
+class DishViewSet(ConditionalGetMixin, PublicReadMixin, viewsets.ModelViewSet):
+    queryset = Dish.objects.prefetch_related("products", "extra_allergens", "allergens").all()
     serializer_class = DishSerializer
 
     def get_queryset(self):
@@ -49,25 +96,82 @@ class DishViewSet(PublicReadMixin, viewsets.ModelViewSet):
             qs = qs.filter(is_vegan=(p["is_vegan"] == "true"))
         if p.get("exclude_allergens"):
             excl = p["exclude_allergens"].split(",")
-            qs = qs.exclude(
-                Q(products__allergens__code__in=excl) | Q(extra_allergens__code__in=excl)
-            ).distinct()
+            qs = without_allergens(qs, excl)
         return qs
 
     @action(detail=True, methods=["patch"])
     def deactivate(self, request, pk=None):
         dish = self.get_object()
         dish.is_active = False
-        dish.save()
+        dish.save(update_fields=["is_active", "updated_at"])
         return Response({"status": "dish deactivated"})
 
     @action(detail=True, methods=["patch"])
     def activate(self, request, pk=None):
         dish = self.get_object()
         dish.is_active = True
-        dish.save()
+        dish.save(update_fields=["is_active", "updated_at"])
         return Response({"status": "dish activated"})
 
+    @action(detail=False, methods=["post"])
+    def bulk_toggle(self, request):
+        """
+        { "is_active": false, "ids": [..] | "product": [..] | "allergen": [codes] | "menu": id }
+        Sélecteurs combinés en ET. Un seul UPDATE (plats déjà dans l'état voulu ignorés)
+        et un seul `catalog_changed` pour le lot.
+        """
+        data = request.data
+        if not isinstance(data.get("is_active"), bool):
+            return Response({"detail": "'is_active' (booléen) requis."}, status=400)
+        ids = data.get("ids")
+        if ids and not (isinstance(ids, list) and all(isinstance(x, int) and not isinstance(x, bool) for x in ids)):
+            return Response({"detail": "'ids' doit être une liste d'IDs."}, status=400)
+        qs = Dish.objects.all()
+        try:
+            if ids:
+                qs = qs.filter(pk__in=ids)
+            if data.get("product"):
+                products = data["product"] if isinstance(data["product"], list) else [data["product"]]
+                qs = qs.filter(pk__in=Dish.products.through.objects.filter(
+                    product_id__in=[int(x) for x in products]).values("dish_id"))
+            if data.get("menu"):
+                qs = qs.filter(pk__in=MenuItem.objects.filter(menu_id=int(data["menu"])).values("dish_id"))
+        except (TypeError, ValueError):
+            return Response({"detail": "'ids', 'product' et 'menu' attendent des IDs."}, status=400)
+        if data.get("allergen"):
+            codes = data["allergen"] if isinstance(data["allergen"], list) else str(data["allergen"]).split(",")
+            qs = with_any_allergen(qs, codes)
+        if not any(data.get(key) for key in ("ids", "product", "allergen", "menu")):
+            return Response({"detail": "Au moins un sélecteur requis : ids, product, allergen ou menu."}, status=400)
+
+        updated = qs.exclude(is_active=data["is_active"]).update(
+            is_active=data["is_active"], updated_at=timezone.now(),
+        )
+        # update() n'émet pas post_save : menu du jour et catalogue des caisses invalidés une fois
+        if updated:
+            catalog_changed.send(sender=Dish, restaurant_ids=None)
+        return Response({"updated": updated, "is_active": data["is_active"]})
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_dishes(self, request):
+        """
+        JSON { "dishes": [{ name, description, price, is_vegan, is_active, products: [id|nom], extra_allergens: [codes] }] },
+        fichier CSV (`file`) ou corps text/csv (listes séparées par « | »). ?dry_run=true : validation seule.
+        Tout ou rien : 400 avec les erreurs par ligne si une ligne est invalide.
+        """
+        try:
+            rows = read_rows(request)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        if not rows:
+            return Response({"detail": "Aucun plat à importer."}, status=400)
+        if len(rows) > DISH_IMPORT_MAX:
+            return Response({"detail": f"{DISH_IMPORT_MAX} plats maximum par import."}, status=400)
+        result, failures = import_dishes(rows, dry_run=request.query_params.get("dry_run") == "true")
+        if failures:
+            return Response({"detail": "Import refusé : lignes invalides.", "rows": failures}, status=400)
+        return Response(result, status=status.HTTP_200_OK if not result["ids"] else status.HTTP_201_CREATED)
+
 class DishAvailabilityViewSet(PublicReadMixin, viewsets.ModelViewSet):
     queryset = DishAvailability.objects.select_related("dish", "restaurant").all()
     serializer_class = DishAvailabilitySerializer
@@ -81,9 +185,82 @@ class DishAvailabilityViewSet(PublicReadMixin, viewsets.ModelViewSet):
             qs = qs.filter(date=p["date"])
         return qs
 
-class MenuViewSet(PublicReadMixin, viewsets.ModelViewSet):
-    queryset = Menu.objects.prefetch_related("items__dish", "restaurants").all()
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Upsert d'une matrice plats × restaurants × dates en une requête.
+        - dates : `dates` [..] ou `date_from` / `date_to` (inclus, 31 jours max)
+        - `is_available` appliqué à chaque case, ou `copy_from` (date) : recopie
+          les disponibilités de ce jour (restreintes à `dishes` si fourni).
+        """
+        data = request.data
+
+        dates, error = _availability_dates(data)
+        if error:
+            return Response({"detail": error}, status=400)
+        try:
+            restaurant_ids = sorted({int(x) for x in data.get("restaurants") or []})
+            dish_ids = sorted({int(x) for x in data.get("dishes") or []})
+        except (TypeError, ValueError):
+            return Response({"detail": "'restaurants' et 'dishes' doivent être des listes d'IDs."}, status=400)
+        if not restaurant_ids:
+            return Response({"detail": "'restaurants' requis."}, status=400)
+
+        if Restaurant.objects.filter(pk__in=restaurant_ids, owner=request.user).count() != len(restaurant_ids):
+            return Response({"detail": "Restaurant introuvable ou non autorisé."}, status=403)
+
+        copy_from = data.get("copy_from")
+        if copy_from:
+            source_day = _parse_day(copy_from)
+            if source_day is None:
+                return Response({"detail": "Format de date invalide pour 'copy_from' (YYYY-MM-DD)."}, status=400)
+            source = DishAvailability.objects.filter(restaurant_id__in=restaurant_ids, date=source_day)
+            if dish_ids:
+                source = source.filter(dish_id__in=dish_ids)
+            cells = [
+                (dish_id, restaurant_id, day, is_available)
+                for dish_id, restaurant_id, is_available in source.values_list("dish_id", "restaurant_id", "is_available")
+                for day in dates if day != source_day
+            ]
+        else:
+            if not dish_ids:
+                return Response({"detail": "'dishes' requis (ou 'copy_from')."}, status=400)
+            if not isinstance(data.get("is_available"), bool):
+                return Response({"detail": "'is_available' (booléen) requis."}, status=400)
+            if Dish.objects.filter(pk__in=dish_ids).count() != len(dish_ids):
+                return Response({"detail": "Plat introuvable."}, status=400)
+            cells = [
+                (dish_id, restaurant_id, day, data["is_available"])
+                for dish_id in dish_ids for restaurant_id in restaurant_ids for day in dates
+            ]
+
+        if len(cells) > AVAILABILITY_BULK_MAX:
+            return Response({"detail": f"{AVAILABILITY_BULK_MAX} cases maximum par requête."}, status=400)
+
+        with transaction.atomic():
+            DishAvailability.objects.bulk_create(
+                [DishAvailability(dish_id=d, restaurant_id=r, date=day, is_available=a) for d, r, day, a in cells],
+                update_conflicts=True,
+                unique_fields=["dish", "restaurant", "date"],
+                update_fields=["is_available"],
+                batch_size=AVAILABILITY_BULK_BATCH,
+            )
+        # bulk_create n'émet pas post_save
+        if cells:
+            catalog_changed.send(sender=DishAvailability, restaurant_ids=restaurant_ids)
+        return Response({
+            "upserted": len(cells),
+            "restaurants": restaurant_ids,
+            "dates": [str(day) for day in dates],
+            "copied_from": str(copy_from) if copy_from else None,
+        })
+
+class MenuViewSet(ConditionalGetMixin, PublicReadMixin, viewsets.ModelViewSet):
+    queryset = Menu.objects.prefetch_related(
+        "items__dish__products", "items__dish__extra_allergens", "items__dish__allergens", "restaurants",
+    ).all()
     serializer_class = MenuSerializer
+    conditional_timestamps = ("updated_at", "items__dish__updated_at")
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -94,7 +271,7 @@ class MenuViewSet(PublicReadMixin, viewsets.ModelViewSet):
         if p.get("restaurant"):
             qs = qs.filter(restaurants__id=p["restaurant"])
         if p.get("date"):
-            d = parse_date(p["date"])
+            d = _parse_day(p["date"])
             if d:
                 qs = qs.filter(start_date__lte=d, end_date__gte=d)
         return qs.distinct()
@@ -114,3 +291,55 @@ class MenuViewSet(PublicReadMixin, viewsets.ModelViewSet):
         menu.is_published = False
         menu.save()
         return Response({"status": "menu unpublished"})
+
+
+@api_view(["GET"])
+@permission_classes([permissions.AllowAny])
+def menu_today_view(request):
+    """
+    ?restaurant=ID&date=YYYY-MM-DD (défaut : aujourd'hui)
+    Menus publiés du jour, plats indisponibles retirés, regroupés par type de plat.
+    """
+    try:
+        restaurant_id = int(request.query_params.get("restaurant", ""))
+    except ValueError:
+        return Response({"detail": "Paramètre 'restaurant' (ID) requis."}, status=400)
+    date_str = request.query_params.get("date")
+    day = _parse_day(date_str) if date_str else timezone.localdate()
+    if day is None:
+        return Response({"detail": "Format de date invalide (YYYY-MM-DD)."}, status=400)
+    payload = menu_today(restaurant_id, day)
+    if payload is None:
+        return Response({"detail": "Restaurant introuvable."}, status=404)
+    return Response(payload)
+
+
+SEARCH_TARGETS = {
+    "dishes": (
+        lambda: Dish.objects.filter(is_active=True).prefetch_related("products", "extra_allergens", "allergens"),
+        DishSerializer,
+    ),
+    "products": (lambda: Product.objects.prefetch_related("allergens"), ProductSerializer),
+    "offers": (
+        lambda: SupplierOffer.objects.filter(status="PUBLISHED")
+        .select_related("supplier").prefetch_related("allergens", "reviews"),
+        SupplierOfferSerializer,
+    ),
+}
+
+
+@api_view(["GET"])
+@permission_classes([permissions.AllowAny])
+def search_view(request):
+    """
+    ?q=texte&type=dishes|products|offers (défaut : dishes)
+    Résultats classés par pertinence (plein texte + tolérance aux fautes), paginés par curseur.
+    """
+    q = (request.query_params.get("q") or "").strip()
+    if len(q) < SEARCH_MIN_LENGTH:
+        return Response({"detail": f"Paramètre 'q' requis ({SEARCH_MIN_LENGTH} caractères minimum)."}, status=400)
+    kind = request.query_params.get("type", "dishes")
+    if kind not in SEARCH_TARGETS:
+        return Response({"detail": f"'type' doit valoir {', '.join(SEARCH_TARGETS)}."}, status=400)
+    queryset, serializer_class = SEARCH_TARGETS[kind]
+    return paginated_response(request, search(queryset(), q), serializer_class)
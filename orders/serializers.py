@@ -1,7 +1,9 @@
 from rest_framework import serializers
+
+from config.serializers import SparseFieldsetMixin
 from .models import DeliverySlot, Cart, CartItem, Order, OrderItem
 
-class DeliverySlotSerializer(serializers.ModelSerializer):
+class DeliverySlotSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = DeliverySlot
         fields = ["id", "start", "end"]
@@ -48,7 +50,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ["external_item_id", "name", "unit_price", "quantity", "line_total"]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
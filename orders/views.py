@@ -6,6 +6,8 @@ from django.shortcuts import get_object_or_404
 from rest_framework import permissions, status, views
 from rest_framework.response import Response
 
+from config.pagination import paginated_response
+
 from .models import DeliverySlot, Cart, CartItem, Order, OrderItem
 from .serializers import (
     DeliverySlotSerializer, CartSerializer, CartAddSerializer, CartRemoveSerializer,
@@ -39,7 +41,7 @@ class DeliverySlotsView(views.APIView):
 
     def get(self, request):
         qs = DeliverySlot.objects.order_by("start")
-        return Response(DeliverySlotSerializer(qs, many=True).data)
+        return paginated_response(request, qs, DeliverySlotSerializer, view=self)
 
 
 class CartView(views.APIView):
@@ -246,7 +248,7 @@ class MyOrdersView(views.APIView):
 
     def get(self, request):
         qs = Order.objects.filter(user=request.user).order_by("-created_at")
-        return Response(OrderSerializer(qs, many=True).data)
+        return paginated_response(request, qs, OrderSerializer, view=self)
 
 
 class OrderStatusView(views.APIView):
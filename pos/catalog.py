@@ -0,0 +1,135 @@
+"""
+Catalogue des caisses (hors ligne) : plats actifs des menus publiés du
+restaurant valides ce jour-là (comme `menu.today`), prix, codes allergènes et
+disponibilité du jour.
+
+Le catalogue est stocké tout construit (JSON gzip) avec son empreinte sha256,
+qui sert d'ETag. `menu.signals.catalog_changed` avance le compteur
+`CatalogGeneration` des restaurants concernés ; un instantané construit à une
+génération antérieure est reconstruit à la lecture suivante, et une nouvelle
+version n'est créée que si le contenu a réellement changé. La génération est
+lue avant la construction et l'instantané n'est déclaré à jour que par un
+compare-and-set sur cette valeur : une invalidation pendant la construction
+n'est jamais perdue. Les dernières versions sont conservées pour servir des
+deltas.
+"""
+import gzip
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from menu.models import Dish, DishAvailability
+from .models import CatalogGeneration, CatalogSnapshot
+
+CATALOG_HISTORY = 10     # versions conservées par (restaurant, jour) pour les deltas
+CATALOG_KEEP_DAYS = 7    # instantanés des jours antérieurs supprimés au-delà
+
+
+def build_catalog(restaurant_id, date_):
+    unavailable = set(
+        DishAvailability.objects.filter(restaurant_id=restaurant_id, date=date_, is_available=False)
+        .values_list("dish_id", flat=True)
+    )
+    dishes = (
+        Dish.objects
+        .filter(
+            is_active=True,
+            menu_items__menu__is_published=True,
+            menu_items__menu__restaurants=restaurant_id,
+            menu_items__menu__start_date__lte=date_,
+            menu_items__menu__end_date__gte=date_,
+        )
+        .distinct()
+        .prefetch_related("allergens")
+        .order_by("pk")
+    )
+    return {
+        "restaurant": restaurant_id,
+        "date": date_.isoformat(),
+        "dishes": [
+            {
+                "id": dish.pk,
+                "name": dish.name,
+                "price": str(dish.price),
+                "vegan": dish.is_vegan,
+                "allergens": sorted(a.code for a in dish.allergens.all()),
+                "available": dish.pk not in unavailable,
+            }
+            for dish in dishes
+        ],
+    }
+
+
+def encode(catalog):
+    """(gzip, sha256) ; JSON canonique pour que l'empreinte ne dépende que du contenu."""
+    raw = json.dumps(catalog, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode()
+    # mtime fixe : même contenu, mêmes octets
+    return gzip.compress(raw, mtime=0), hashlib.sha256(raw).hexdigest()
+
+
+def decode(snapshot):
+    return json.loads(gzip.decompress(bytes(snapshot.payload)))
+
+
+def current_generation(restaurant_id):
+    generation, _ = CatalogGeneration.objects.get_or_create(restaurant_id=restaurant_id)
+    return generation.generation
+
+
+def current_snapshot(restaurant_id, date_):
+    """Dernier instantané à jour, reconstruit s'il est absent ou périmé."""
+    generation = current_generation(restaurant_id)
+    latest = CatalogSnapshot.objects.filter(restaurant_id=restaurant_id, date=date_).first()
+    if latest is not None and latest.generation >= generation:
+        return latest
+    payload, content_hash = encode(build_catalog(restaurant_id, date_))
+    if latest is not None and latest.content_hash == content_hash:
+        # compare-and-set : jamais de retour en arrière si un autre worker est passé
+        CatalogSnapshot.objects.filter(pk=latest.pk, generation__lt=generation).update(generation=generation)
+        latest.generation = generation
+        return latest
+    try:
+        with transaction.atomic():
+            snapshot = CatalogSnapshot.objects.create(
+                restaurant_id=restaurant_id, date=date_, content_hash=content_hash, payload=payload,
+                version=(latest.version + 1) if latest else 1, generation=generation,
+            )
+    except IntegrityError:
+        # construit en parallèle par un autre worker
+        return CatalogSnapshot.objects.filter(restaurant_id=restaurant_id, date=date_).first()
+    _prune(restaurant_id, date_)
+    return snapshot
+
+
+def _prune(restaurant_id, date_):
+    snapshots = CatalogSnapshot.objects.filter(restaurant_id=restaurant_id)
+    old = snapshots.filter(date=date_).values_list("pk", flat=True)[CATALOG_HISTORY:]
+    snapshots.filter(pk__in=list(old)).delete()
+    snapshots.filter(date__lt=date_ - timedelta(days=CATALOG_KEEP_DAYS)).delete()
+
+
+def catalog_delta(base, target):
+    """Plats ajoutés ou modifiés (`upserts`) et IDs retirés (`removed`) de `base` à `target`."""
+    before = {dish["id"]: dish for dish in decode(base)["dishes"]}
+    after = {dish["id"]: dish for dish in decode(target)["dishes"]}
+    return {
+        "from": base.content_hash,
+        "to": target.content_hash,
+        "version": target.version,
+        "upserts": [dish for dish_id, dish in after.items() if before.get(dish_id) != dish],
+        "removed": sorted(set(before) - set(after)),
+    }
+
+
+def mark_stale(restaurant_ids=None):
+    """
+    Avance la génération (`restaurant_ids` None : tous les restaurants). Un
+    restaurant sans compteur n'a encore rien construit : rien à invalider.
+    """
+    generations = CatalogGeneration.objects.all()
+    if restaurant_ids is not None:
+        generations = generations.filter(restaurant_id__in=restaurant_ids)
+    generations.update(generation=F("generation") + 1)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from pos.catalog import current_snapshot
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = "Construit à l'avance le catalogue des caisses de chaque restaurant (à lancer avant l'ouverture)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="YYYY-MM-DD (défaut : aujourd'hui)")
+
+    def handle(self, *args, **opts):
+        try:
+            day = parse_date(opts["date"]) if opts.get("date") else timezone.localdate()
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError("Format de date invalide (YYYY-MM-DD).")
+        for restaurant_id in Restaurant.objects.values_list("pk", flat=True):
+            snapshot = current_snapshot(restaurant_id, day)
+            self.stdout.write(
+                f"Restaurant {restaurant_id} : v{snapshot.version} ({len(snapshot.payload)} octets, {snapshot.content_hash[:12]})"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Catalogues du {day} à jour."))
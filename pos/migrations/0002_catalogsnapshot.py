@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0001_initial'),
+        ('restaurants', '0022_restaurant_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('version', models.PositiveIntegerField()),
+                ('content_hash', models.CharField(max_length=64)),
+                ('payload', models.BinaryField()),
+                ('stale', models.BooleanField(default=False)),
+                ('built_at', models.DateTimeField(auto_now_add=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalog_snapshots', to='restaurants.restaurant')),
+            ],
+            options={
+                'ordering': ['-version'],
+                'unique_together': {('restaurant', 'date', 'version')},
+            },
+        ),
+    ]
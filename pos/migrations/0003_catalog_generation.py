@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def drop_stale_snapshots(apps, schema_editor):
+    # l'ancien drapeau disparaît : les instantanés périmés seront reconstruits
+    CatalogSnapshot = apps.get_model("pos", "CatalogSnapshot")
+    CatalogSnapshot.objects.filter(stale=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0002_catalogsnapshot'),
+        ('restaurants', '0022_restaurant_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogGeneration',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='catalog_generation', serialize=False, to='restaurants.restaurant')),
+                ('generation', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(drop_stale_snapshots, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='catalogsnapshot',
+            name='stale',
+        ),
+        migrations.AddField(
+            model_name='catalogsnapshot',
+            name='generation',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -106,3 +106,36 @@ class Payment(models.Model):
 
     def __str__(self):
         return f"{self.method} {self.amount}€ pour Order #{self.order_id}"
+
+
+class CatalogSnapshot(models.Model):
+    """
+    Catalogue compact d'un restaurant pour un jour (caisses hors ligne) :
+    JSON gzip, identifié par son empreinte sha256 (ETag). Voir pos.catalog.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name="catalog_snapshots")
+    date = models.DateField()
+    version = models.PositiveIntegerField()
+    content_hash = models.CharField(max_length=64)
+    payload = models.BinaryField()
+    # `CatalogGeneration.generation` lue avant la construction : inférieure à
+    # la génération courante = périmé, reconstruire à la prochaine lecture
+    generation = models.PositiveBigIntegerField(default=0)
+    built_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-version"]
+        unique_together = ("restaurant", "date", "version")
+
+    def __str__(self):
+        return f"Catalogue {self.restaurant_id} {self.date} v{self.version}"
+
+
+class CatalogGeneration(models.Model):
+    """Compteur d'invalidations du catalogue d'un restaurant (voir pos.catalog)."""
+    restaurant = models.OneToOneField(
+        Restaurant, on_delete=models.CASCADE, primary_key=True, related_name="catalog_generation")
+    generation = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalogue {self.restaurant_id} g{self.generation}"
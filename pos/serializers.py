@@ -1,5 +1,7 @@
 from decimal import Decimal
 from rest_framework import serializers
+
+from config.serializers import SparseFieldsetMixin
 from .models import Order, OrderItem, Payment
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -9,7 +11,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = ["id", "dish", "dish_name", "custom_name", "unit_price", "quantity"]
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     restaurant_name = serializers.CharField(source="restaurant.name", read_only=True)
 
@@ -28,7 +30,7 @@ class OrderSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("discount_percent doit être entre 0 et 100.")
         return data
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = ["id","order","method","amount","received_at","note"]
@@ -0,0 +1,9 @@
+from django.dispatch import receiver
+
+from menu.signals import catalog_changed
+from .catalog import mark_stale
+
+
+@receiver(catalog_changed)
+def expire_catalog_snapshots(sender, restaurant_ids=None, **kwargs):
+    mark_stale(restaurant_ids)
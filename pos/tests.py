@@ -1,3 +1,64 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from menu.models import Dish, Menu, MenuItem
+from restaurants.models import Restaurant
+from . import catalog
+from .catalog import current_snapshot, decode
+
+User = get_user_model()
+DAY = date(2026, 10, 20)
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@x.fr", "pw", role="RESTAURATEUR")
+        self.restaurant = Restaurant.objects.create(
+            name="R", address="a", city="Paris", postal_code="75000", capacity=100, owner=self.owner)
+        self.menu = Menu.objects.create(title="Midi", start_date=DAY, end_date=DAY, is_published=True)
+        self.menu.restaurants.add(self.restaurant)
+        self.dish = Dish.objects.create(name="Curry", price=Decimal("12"))
+        MenuItem.objects.create(menu=self.menu, dish=self.dish, course_type="PLAT")
+
+    def dish_ids(self, day=DAY):
+        return [d["id"] for d in decode(current_snapshot(self.restaurant.pk, day))["dishes"]]
+
+    def test_only_published_menus_of_the_day(self):
+        Dish.objects.create(name="Hors menu", price=Decimal("5"))
+        draft = Menu.objects.create(title="Brouillon", start_date=DAY, end_date=DAY)
+        draft.restaurants.add(self.restaurant)
+        MenuItem.objects.create(menu=draft, dish=Dish.objects.create(name="Caché", price=Decimal("5")),
+                                course_type="PLAT")
+        self.assertEqual(self.dish_ids(), [self.dish.pk])
+        self.assertEqual(self.dish_ids(DAY + timedelta(days=1)), [])
+
+    def test_invalidation_during_build_is_kept(self):
+        first = current_snapshot(self.restaurant.pk, DAY)
+        self.dish.price = Decimal("13")
+        self.dish.save()
+
+        build = catalog.build_catalog
+
+        def build_then_change(*args):
+            result = build(*args)
+            self.dish.price = Decimal("14")
+            self.dish.save()  # catalog_changed pendant la construction
+            return result
+
+        with mock.patch.object(catalog, "build_catalog", build_then_change):
+            second = current_snapshot(self.restaurant.pk, DAY)
+        self.assertEqual(second.version, first.version + 1)
+        third = current_snapshot(self.restaurant.pk, DAY)
+        self.assertEqual(third.version, second.version + 1)
+        self.assertEqual(decode(third)["dishes"][0]["price"], "14.00")
 
-# Create your tests here.
+    def test_impossible_date(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.get("/api/pos/catalog/", {"restaurant": self.restaurant.pk, "date": "2025-13-45"})
+        self.assertEqual(response.status_code, 400)
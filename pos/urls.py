@@ -1,8 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet
+from .views import OrderViewSet, catalog_view
 
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet, basename='pos-orders')
 
-urlpatterns = [path('', include(router.urls))]
+urlpatterns = [
+    path('catalog/', catalog_view, name='pos-catalog'),
+    path('', include(router.urls)),
+]
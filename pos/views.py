@@ -3,20 +3,24 @@ from decimal import Decimal
 from django.db import transaction
 from django.utils.dateparse import parse_date
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 
 from rest_framework.decorators import action
 
 
+from restaurants.models import Restaurant
 from restaurants.permissions import IsRestaurateur, IsAdminVegNBio
-from .models import Order, OrderItem, Payment
+from .catalog import catalog_delta, current_snapshot
+from .models import CatalogSnapshot, Order, OrderItem, Payment
 from .serializers import OrderSerializer, OrderItemSerializer, PaymentSerializer
 
+import gzip
 import io
 from decimal import Decimal, ROUND_HALF_UP
 from django.http import HttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
 
 # ReportLab
 from reportlab.lib.pagesizes import A4
@@ -262,7 +266,10 @@ class OrderViewSet(viewsets.ModelViewSet):
         if p.get("restaurant"):
             qs = qs.filter(restaurant_id=p["restaurant"])
         if p.get("date"):
-            d = parse_date(p["date"])
+            try:
+                d = parse_date(p["date"])
+            except ValueError:
+                d = None
             if d:
                 qs = qs.filter(opened_at__date=d)
         return qs
@@ -441,3 +448,60 @@ class OrderViewSet(viewsets.ModelViewSet):
         total = sum((o.total_due for o in qs if o.status in ["PAID","REFUNDED"]), Decimal("0.00"))
         count = qs.count()
         return Response({"count": count, "turnover": str(total)})
+
+
+# ------- Catalogue des caisses -------
+def _catalog_headers(response, snapshot):
+    response["ETag"] = f'"{snapshot.content_hash}"'
+    response["X-Catalog-Version"] = str(snapshot.version)
+    response["Cache-Control"] = "no-cache"
+    patch_vary_headers(response, ("Accept-Encoding", "Authorization"))
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated, IsRestaurateur | IsAdminVegNBio])
+def catalog_view(request):
+    """
+    /api/pos/catalog/?restaurant=1[&date=2025-10-10][&since=<etag>]
+    Catalogue compact (JSON gzip) ; If-None-Match à jour → 304 ;
+    `since` = ETag d'une version récente → delta JSON, sinon catalogue complet.
+    """
+    try:
+        restaurant_id = int(request.query_params.get("restaurant", ""))
+    except ValueError:
+        return Response({"detail": "Paramètre 'restaurant' (ID) requis."}, status=400)
+    restaurant = Restaurant.objects.filter(pk=restaurant_id).first()
+    if restaurant is None:
+        return Response({"detail": "Restaurant introuvable."}, status=404)
+    user = request.user
+    if restaurant.owner_id != user.pk and getattr(user, "role", None) != "ADMIN":
+        return Response({"detail": "Accès interdit."}, status=403)
+    date_str = request.query_params.get("date")
+    try:
+        day = parse_date(date_str) if date_str else timezone.localdate()
+    except ValueError:
+        day = None
+    if day is None:
+        return Response({"detail": "Format de date invalide (YYYY-MM-DD)."}, status=400)
+
+    snapshot = current_snapshot(restaurant.pk, day)
+    not_modified = get_conditional_response(request, etag=f'"{snapshot.content_hash}"')
+    if not_modified is not None:
+        return _catalog_headers(not_modified, snapshot)
+
+    since = (request.query_params.get("since") or "").strip('"')
+    if since:
+        base = CatalogSnapshot.objects.filter(restaurant=restaurant, date=day, content_hash=since).first()
+        if base is not None:
+            response = Response(catalog_delta(base, snapshot))
+            response["X-Catalog-Delta"] = "1"
+            return _catalog_headers(response, snapshot)
+
+    payload = bytes(snapshot.payload)
+    if "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", ""):
+        response = HttpResponse(payload, content_type="application/json; charset=utf-8")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(gzip.decompress(payload), content_type="application/json; charset=utf-8")
+    return _catalog_headers(response, snapshot)
@@ -3,6 +3,8 @@ from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
 
+from config.serializers import SparseFieldsetMixin
+
 from .models import SupplierOrder, SupplierOrderItem
 from market.models import SupplierOffer
 
@@ -55,7 +57,7 @@ class SupplierOrderItemReadSerializer(serializers.ModelSerializer):
         fields = ["id", "offer", "product_name", "unit", "qty_requested", "qty_confirmed", "unit_price"]
 
 
-class SupplierOrderReadSerializer(serializers.ModelSerializer):
+class SupplierOrderReadSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = SupplierOrderItemReadSerializer(many=True, read_only=True)
 
     class Meta:
@@ -133,7 +135,7 @@ class SupplierOrderSupplierReviewSerializer(serializers.Serializer):
                     # décrémentation du stock
                     offer = item.offer
                     offer.stock_qty = offer.stock_qty - qty_conf
-                    offer.save(update_fields=["stock_qty"])
+                    offer.save(update_fields=["stock_qty", "updated_at"])
 
             # statut + horodatage confirmation
             if all_zero:
@@ -52,13 +52,15 @@ class SupplierOrderViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=["get"], url_path="my_restaurant", permission_classes=[permissions.IsAuthenticated, IsRestaurateur])
     def my_restaurant_orders(self, request):
         qs = self.get_queryset().filter(restaurateur=request.user).order_by("-created_at")
-        return Response(SupplierOrderReadSerializer(qs, many=True).data)
+        page = self.paginate_queryset(qs)
+        return self.get_paginated_response(SupplierOrderReadSerializer(page, many=True, context={"request": request}).data)
 
     # ---------- FOURNISSEUR : boîte de réception ----------
     @action(detail=False, methods=["get"], url_path="supplier_inbox", permission_classes=[permissions.IsAuthenticated, IsSupplier])
     def supplier_inbox(self, request):
         qs = self.get_queryset().filter(supplier=request.user, status__in=["PENDING_SUPPLIER"]).order_by("-created_at")
-        return Response(SupplierOrderReadSerializer(qs, many=True).data)
+        page = self.paginate_queryset(qs)
+        return self.get_paginated_response(SupplierOrderReadSerializer(page, many=True, context={"request": request}).data)
 
     # ---------- FOURNISSEUR : review / validation ----------
     @action(detail=True, methods=["post"], url_path="review", permission_classes=[permissions.IsAuthenticated, IsSupplier])
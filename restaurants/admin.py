@@ -5,8 +5,9 @@ from django.utils import timezone
 from .models import (
     Restaurant, Room, Reservation,
     Evenement, EvenementRegistration, EventInvite,
-    RestaurantClosure,
+    RestaurantClosure, EmailOutbox,
 )
+from .registrations import delete_registrations
 
 # ---------- INLINES ----------
 
@@ -125,7 +126,7 @@ class EvenementAdmin(admin.ModelAdmin):
     list_display = (
         "id", "title", "restaurant", "room", "type",
         "date", "start_time", "end_time",
-        "status", "is_public", "is_blocking", "capacity",
+        "status", "is_public", "is_blocking", "capacity", "registrations_count",
         "published_at", "full_at", "cancelled_at",
     )
     list_filter = (
@@ -232,6 +233,19 @@ class EvenementRegistrationAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
     list_select_related = ("event", "user")
 
+    # pas d'ajout ni de modification : les inscriptions passent par restaurants.registrations
+    # (compteur, statut FULL). La suppression reste possible (elle bloquerait sinon celle
+    # des utilisateurs) : le post_delete de restaurants.signals recompte les inscrits,
+    # une suppression groupée passe par delete_registrations.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_queryset(self, request, queryset):
+        delete_registrations(queryset)
+
 
 # ---------- FERMETURES ----------
 
@@ -242,3 +256,20 @@ class RestaurantClosureAdmin(admin.ModelAdmin):
     search_fields = ("restaurant__name", "reason")
     autocomplete_fields = ("restaurant",)
     date_hierarchy = "date"
+
+
+# ---------- EMAILS (OUTBOX) ----------
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "category", "to_email", "subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "category")
+    search_fields = ("to_email", "subject")
+    date_hierarchy = "created_at"
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    actions = ("action_retry",)
+
+    @admin.action(description="Replanifier l'envoi maintenant")
+    def action_retry(self, request, queryset):
+        updated = queryset.exclude(status="SENT").update(status="PENDING", next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} email(s) replanifié(s).")
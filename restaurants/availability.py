@@ -0,0 +1,467 @@
+"""
+Moteur de disponibilité des salles (une journée, un restaurant).
+
+On charge une seule fois les réservations, les évènements bloquants et la
+fermeture éventuelle du jour, puis toutes les questions du type
+« la salle X est-elle libre sur [début, fin) ? » ou « quelles salles peuvent
+accueillir N couverts ? » sont résolues en mémoire.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import timedelta
+from heapq import merge
+from itertools import accumulate
+from math import ceil
+
+from django.core.cache import cache
+
+from config.cache import versioned_key
+
+from .models import Reservation, Evenement, EvenementOccurrence, RestaurantClosure
+from .opening import DAY_MINUTES, to_minutes, minutes_label
+from .recurrence import ensure_occurrences, occurrences_beyond_limit
+
+BLOCKING_EVENT_STATUSES = ["PUBLISHED", "FULL"]
+
+
+class IntervalIndex:
+    """
+    Intervalles semi-ouverts [start, end) triés par début.
+
+    On garde le max des fins en préfixe : un chevauchement avec [s, e) existe
+    ssi, parmi les intervalles qui commencent avant e, la plus grande fin est > s.
+    Recherche en O(log n).
+    """
+
+    def __init__(self, intervals=()):
+        self._items = sorted(intervals, key=lambda it: (it[0], it[1]))
+        self._rebuild()
+
+    def _rebuild(self):
+        self._starts = [s for s, _, _ in self._items]
+        self._max_ends = list(accumulate((e for _, e, _ in self._items), max))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, start, end, payload=None):
+        insort(self._items, (start, end, payload), key=lambda it: (it[0], it[1]))
+        self._rebuild()
+
+    def overlaps(self, start, end):
+        i = bisect_left(self._starts, end)
+        return i > 0 and self._max_ends[i - 1] > start
+
+    def overlapping(self, start, end):
+        i = bisect_left(self._starts, end)
+        if i == 0 or self._max_ends[i - 1] <= start:
+            return []
+        return [it for it in self._items[:i] if it[1] > start]
+
+
+class DayAvailability:
+    """
+    Photographie en mémoire d'une journée pour un restaurant.
+
+    - `reservations` : tuples (room_id, full_restaurant, start, end)
+    - `events` : tuples (room_id, start, end) des évènements bloquants
+    - `closed` : jour de fermeture exceptionnelle
+    - `closed_dates` : fermetures du jour et de la veille (débordement de nuit)
+    """
+
+    def __init__(self, restaurant, date_, reservations=(), events=(), closed=False, rooms=None,
+                 closed_dates=None):
+        self.restaurant = restaurant
+        self.date = date_
+        self.closed = closed
+        self.closed_dates = closed_dates if closed_dates is not None else ({date_} if closed else set())
+        self._rooms = None
+        if rooms is not None:
+            self._set_rooms(rooms)
+
+        per_room = defaultdict(list)
+        full, any_room = [], []
+        for room_id, is_full, start, end in reservations:
+            if is_full:
+                full.append((start, end, None))
+            elif room_id is not None:
+                per_room[room_id].append((start, end, room_id))
+                any_room.append((start, end, room_id))
+        self._room_index = {rid: IntervalIndex(items) for rid, items in per_room.items()}
+        self._full_index = IntervalIndex(full)
+        self._any_room_index = IntervalIndex(any_room)
+        self._event_index = IntervalIndex((start, end, room_id) for room_id, start, end in events)
+
+    # ---- chargement ----
+    @classmethod
+    def load(cls, restaurant, date_, exclude_reservation=None, exclude_event=None):
+        return cls.load_many(
+            [(restaurant, date_)],
+            exclude_reservation=exclude_reservation,
+            exclude_event=exclude_event,
+        )[(restaurant.pk, date_)]
+
+    @classmethod
+    def load_many(cls, pairs, exclude_reservation=None, exclude_event=None, rooms=None):
+        """
+        Charge plusieurs couples (restaurant, date) en trois requêtes au total.
+        `rooms` (optionnel) : salles déjà chargées, pour éviter une requête par jour.
+        Retourne un dict {(restaurant_id, date): DayAvailability}.
+        """
+        pairs = list(pairs)
+        restaurants = {r.pk: r for r, _ in pairs}
+        dates = {d for _, d in pairs}
+        pairs_set = {(r.pk, d) for r, d in pairs}
+        if not pairs:
+            return {}
+
+        res_qs = (
+            Reservation.objects
+            .filter(restaurant_id__in=restaurants, date__in=dates)
+            .exclude(status='CANCELLED')
+        )
+        if exclude_reservation is not None:
+            res_qs = res_qs.exclude(pk=exclude_reservation)
+        reservations = defaultdict(list)
+        for rid, d, room_id, is_full, start, end in res_qs.values_list(
+            'restaurant_id', 'date', 'room_id', 'full_restaurant', 'start_time', 'end_time'
+        ):
+            reservations[(rid, d)].append((room_id, is_full, start, end))
+
+        # évènements bloquants + occurrences de ceux qui sont récurrents, en une requête
+        ensure_occurrences(max(dates))
+        ev_qs = Evenement.objects.filter(
+            restaurant_id__in=restaurants, date__in=dates,
+            is_blocking=True, status__in=BLOCKING_EVENT_STATUSES,
+        )
+        occ_qs = EvenementOccurrence.objects.filter(
+            event__restaurant_id__in=restaurants, date__in=dates,
+            event__is_blocking=True, event__status__in=BLOCKING_EVENT_STATUSES,
+        )
+        if exclude_event is not None:
+            ev_qs = ev_qs.exclude(pk=exclude_event)
+            occ_qs = occ_qs.exclude(event_id=exclude_event)
+        events = defaultdict(list)
+        for rid, d, room_id, start, end in ev_qs.order_by().values_list(
+            'restaurant_id', 'date', 'room_id', 'start_time', 'end_time'
+        ).union(occ_qs.order_by().values_list(
+            'event__restaurant_id', 'date', 'event__room_id', 'start_time', 'end_time'
+        ), all=True):
+            events[(rid, d)].append((room_id, start, end))
+        # dates au-delà de l'horizon matérialisé : règles déroulées en mémoire
+        blocking = Evenement.objects.filter(
+            restaurant_id__in=restaurants, is_blocking=True, status__in=BLOCKING_EVENT_STATUSES,
+        )
+        if exclude_event is not None:
+            blocking = blocking.exclude(pk=exclude_event)
+        for event, d in occurrences_beyond_limit(blocking, dates):
+            if (event.restaurant_id, d) in pairs_set:
+                events[(event.restaurant_id, d)].append((event.room_id, event.start_time, event.end_time))
+
+        rooms_by_restaurant = None
+        if rooms is not None:
+            rooms_by_restaurant = defaultdict(list)
+            for room in rooms:
+                rooms_by_restaurant[room.restaurant_id].append(room)
+
+        # la veille aussi : sa fermeture supprime le débordement après minuit
+        closed = set(
+            RestaurantClosure.objects
+            .filter(restaurant_id__in=restaurants,
+                    date__in=dates | {d - timedelta(days=1) for d in dates})
+            .values_list('restaurant_id', 'date')
+        )
+
+        return {
+            (r.pk, d): cls(
+                r, d,
+                reservations=reservations.get((r.pk, d), ()),
+                events=events.get((r.pk, d), ()),
+                closed=(r.pk, d) in closed,
+                closed_dates={day for day in (d, d - timedelta(days=1)) if (r.pk, day) in closed},
+                rooms=rooms_by_restaurant.get(r.pk, []) if rooms_by_restaurant is not None else None,
+            )
+            for r, d in pairs
+        }
+
+    # ---- salles ----
+    def _set_rooms(self, rooms):
+        self._rooms = sorted(rooms, key=lambda r: (r.capacity, r.pk))
+        self._capacities = [r.capacity for r in self._rooms]
+
+    @property
+    def rooms(self):
+        if self._rooms is None:
+            self._set_rooms(self.restaurant.rooms.all())
+        return self._rooms
+
+    def room(self, room_id):
+        try:
+            room_id = int(room_id)
+        except (TypeError, ValueError):
+            return None
+        return next((r for r in self.rooms if r.pk == room_id), None)
+
+    # ---- requêtes ----
+    def opening_windows(self):
+        return self.restaurant.opening_calendar().windows_for(self.date, self.closed_dates)
+
+    def within_opening(self, start, end):
+        return self.restaurant.is_time_range_within_opening(self.date, start, end, self.closed_dates)
+
+    def blocking_event(self, start, end, room=None):
+        """
+        Évènement bloquant chevauchant le créneau.
+        Si `room` est fourni, seuls les évènements de cette salle ou de tout
+        le restaurant (room=None) comptent.
+        """
+        hits = self._event_index.overlapping(start, end)
+        if room is None:
+            return bool(hits)
+        room_id = getattr(room, 'pk', room)
+        return any(ev_room is None or ev_room == room_id for _, _, ev_room in hits)
+
+    def full_restaurant_conflict(self, start, end):
+        return self._full_index.overlaps(start, end)
+
+    def room_conflict(self, room_id, start, end):
+        index = self._room_index.get(room_id)
+        return bool(index) and index.overlaps(start, end)
+
+    def any_room_conflict(self, start, end):
+        return self._any_room_index.overlaps(start, end)
+
+    def is_room_free(self, room_id, start, end):
+        room_id = getattr(room_id, 'pk', room_id)
+        return not (
+            self.closed
+            or self.blocking_event(start, end, room=room_id)
+            or self.full_restaurant_conflict(start, end)
+            or self.room_conflict(room_id, start, end)
+        )
+
+    def can_book_full_restaurant(self, start, end):
+        return not (
+            self.closed
+            or self.blocking_event(start, end)
+            or self.full_restaurant_conflict(start, end)
+            or self.any_room_conflict(start, end)
+        )
+
+    def rooms_for(self, party_size, start, end):
+        """Salles libres pouvant accueillir `party_size`, de la plus petite à la plus grande."""
+        rooms = self.rooms
+        i = bisect_left(self._capacities, party_size)
+        if self.closed or self.full_restaurant_conflict(start, end):
+            return []
+        return [r for r in rooms[i:] if self.is_room_free(r.pk, start, end)]
+
+    def free_windows(self, room_id):
+        """
+        Plages libres de la salle en minutes (balayage) : ouverture du jour
+        moins réservations de la salle, réservations « tout le restaurant »
+        et évènements bloquants (qui refusent toute réservation du créneau).
+        """
+        if self.closed:
+            return []
+        index = self._room_index.get(room_id)
+        busy = merge(
+            index or (), self._full_index, self._event_index,
+            key=lambda it: it[0],
+        )
+        free = []
+        windows = self.opening_windows()
+        busy_iter = ((to_minutes(s), to_minutes(e)) for s, e, _ in busy)
+        current = next(busy_iter, None)
+        for w_start, w_end in windows:
+            cursor = w_start
+            while current is not None and current[0] < w_end:
+                b_start, b_end = current
+                if b_end > cursor:
+                    if b_start > cursor:
+                        free.append((cursor, b_start))
+                    cursor = max(cursor, b_end)
+                if b_end > w_end:
+                    break
+                current = next(busy_iter, None)
+            if cursor < w_end:
+                free.append((cursor, w_end))
+        return free
+
+    # ---- mise à jour en mémoire (affectations successives) ----
+    def reserve(self, start, end, room_id=None, full_restaurant=False):
+        if full_restaurant:
+            self._full_index.add(start, end)
+            return
+        self._room_index.setdefault(room_id, IntervalIndex()).add(start, end, room_id)
+        self._any_room_index.add(start, end, room_id)
+
+
+def allocate_rooms(reservations, availabilities):
+    """
+    Affectation gloutonne « best-fit » des réservations aux salles.
+
+    Les réservations sont traitées par heure de début (partitionnement
+    d'intervalles), les plus grands groupes d'abord à heure égale ; chacune
+    prend la plus petite salle libre assez grande. `availabilities` est le
+    dict retourné par `DayAvailability.load_many`, mis à jour au fil de l'eau.
+
+    Retourne (affectées [(reservation, room)], refusées [(reservation, motif)]).
+    """
+    assigned, rejected = [], []
+    ordered = sorted(reservations, key=lambda r: (r.date, r.start_time, -r.party_size, r.pk))
+    for reservation in ordered:
+        availability = availabilities[(reservation.restaurant_id, reservation.date)]
+        start, end = reservation.start_time, reservation.end_time
+        if availability.closed:
+            rejected.append((reservation, "Le restaurant est fermé à cette date."))
+            continue
+        if availability.blocking_event(start, end):
+            rejected.append((reservation, "Créneau indisponible (événement bloquant)."))
+            continue
+        candidates = availability.rooms_for(reservation.party_size, start, end)
+        if not candidates:
+            rejected.append((reservation, "Aucune salle libre de capacité suffisante."))
+            continue
+        room = candidates[0]
+        availability.reserve(start, end, room_id=room.pk)
+        assigned.append((reservation, room))
+    return assigned, rejected
+
+
+# ---- grille d'occupation (dashboard) ----
+SLOT_MINUTES = 15
+
+
+def slot_starts(windows, slot=SLOT_MINUTES):
+    starts = []
+    for w_start, w_end in windows:
+        m = int(w_start // slot * slot)
+        while m < w_end:
+            if not starts or m > starts[-1]:
+                starts.append(m)
+            m += slot
+    return starts
+
+
+def occupancy_grid(rooms, reservations, events, closed, windows, slot=SLOT_MINUTES):
+    """
+    Grille créneaux de `slot` minutes × salles.
+
+    - `reservations` : objets Reservation du jour (hors annulées)
+    - `events` : évènements bloquants du jour
+    Pour chaque salle : couverts occupés et places restantes par créneau ;
+    une réservation « tout le restaurant », un évènement bloquant (salle ou
+    restaurant entier) ou une fermeture ramènent les places restantes à 0.
+    """
+    starts = slot_starts(windows, slot)
+    n = len(starts)
+
+    def slot_range(start_t, end_t):
+        s, e = to_minutes(start_t), to_minutes(end_t)
+        lo = bisect_right(starts, s - slot)
+        hi = bisect_left(starts, e)
+        return range(lo, hi)
+
+    used = {room.pk: [0] * n for room in rooms}
+    blocked = {room.pk: [closed] * n for room in rooms}
+
+    for res in reservations:
+        if res.full_restaurant:
+            for i in slot_range(res.start_time, res.end_time):
+                for room in rooms:
+                    blocked[room.pk][i] = True
+        elif res.room_id in used:
+            for i in slot_range(res.start_time, res.end_time):
+                used[res.room_id][i] += res.party_size
+
+    for ev in events:
+        targets = [ev.room_id] if ev.room_id in used else [room.pk for room in rooms]
+        for i in slot_range(ev.start_time, ev.end_time):
+            for room_id in targets:
+                blocked[room_id][i] = True
+
+    return {
+        "slot_minutes": slot,
+        "slots": [minutes_label(m) for m in starts],
+        "rooms": [
+            {
+                "room_id": room.pk,
+                "room": room.name,
+                "capacity": room.capacity,
+                "seats_used": used[room.pk],
+                "seats_remaining": [
+                    0 if blocked[room.pk][i] else max(room.capacity - used[room.pk][i], 0)
+                    for i in range(n)
+                ],
+            }
+            for room in rooms
+        ],
+    }
+
+
+# ---- calendrier d'ouverture (plage de dates) ----
+OPENING_CALENDAR_CACHE = "opening-calendar"
+OPENING_CALENDAR_TTL = 24 * 3600
+
+
+def opening_calendar_namespace(restaurant_id):
+    return f"{OPENING_CALENDAR_CACHE}:{restaurant_id}"
+
+
+def opening_calendar_days(restaurant, date_from, date_to):
+    """
+    Calendrier compilé + fermetures sur [date_from, date_to], mis en cache ;
+    invalidé quand les horaires ou les fermetures du restaurant changent.
+    """
+    key = versioned_key(opening_calendar_namespace(restaurant.pk), date_from, date_to)
+    days = cache.get(key)
+    if days is None:
+        closures = dict(
+            RestaurantClosure.objects
+            .filter(restaurant=restaurant, date__range=(date_from - timedelta(days=1), date_to))
+            .values_list('date', 'reason')
+        )
+        days = restaurant.opening_calendar().days(date_from, date_to, closures)
+        cache.set(key, days, OPENING_CALENDAR_TTL)
+    return days
+
+
+# ---- recherche de créneaux ----
+def search_slots(availabilities, party_size, duration, limit, slot=SLOT_MINUTES, not_before=None):
+    """
+    Prochains départs possibles pour `party_size` couverts pendant `duration`
+    minutes. `availabilities` : DayAvailability dans l'ordre des jours.
+    Une heure de départ est retenue si au moins une salle assez grande est
+    libre sur tout le créneau ; `not_before` (datetime) écarte les heures passées.
+
+    Retourne [{date, start_time, end_time, rooms[ids]}] (au plus `limit`).
+    """
+    results = []
+    for availability in availabilities:
+        rooms = [r for r in availability.rooms if r.capacity >= party_size]
+        starts = defaultdict(list)
+        floor = 0
+        if not_before is not None and availability.date == not_before.date():
+            floor = to_minutes(not_before.time())
+        for room in rooms:
+            for f_start, f_end in availability.free_windows(room.pk):
+                # l'heure de fin doit rester dans la journée (23:59 au plus tard)
+                f_end = min(f_end, DAY_MINUTES - 1)
+                m = ceil(max(f_start, floor) / slot) * slot
+                while m + duration <= f_end:
+                    starts[m].append(room.pk)
+                    m += slot
+        for m in sorted(starts):
+            results.append({
+                "date": str(availability.date),
+                "start_time": minutes_label(m),
+                "end_time": minutes_label(m + duration),
+                "rooms": starts[m],
+            })
+            if len(results) >= limit:
+                return results
+    return results
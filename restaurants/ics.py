@@ -0,0 +1,217 @@
+"""
+Flux iCalendar (RFC 5545) d'un restaurant : évènements, réservations
+confirmées et fermetures exceptionnelles.
+
+Les évènements récurrents sont exportés avec leur RRULE/EXDATE d'origine,
+le client calendrier déroule lui-même les occurrences. Le flux est produit
+ligne à ligne (StreamingHttpResponse) ; l'ETag est calculé avant toute
+sérialisation à partir de `count` / `max(updated_at)`. Pas de Last-Modified :
+une suppression ne fait pas avancer max(updated_at).
+
+Les heures sont écrites en heure locale (`TZID` = `settings.TIME_ZONE`) avec
+le VTIMEZONE correspondant, pour que les RRULE suivent les changements
+d'heure.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import Evenement, Reservation, RestaurantClosure
+from .recurrence import WEEKDAYS
+
+ICS_PAST_DAYS = 90
+ICS_PRODID = "-//Veg'N Bio//Restaurants//FR"
+
+
+def escape_text(value):
+    return (
+        str(value or "")
+        .replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def fold(line):
+    """Coupe à 75 octets (UTF-8) ; les lignes de continuation commencent par une espace."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, limit = [], 75
+    while raw:
+        cut = min(limit, len(raw))
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:  # pas au milieu d'un caractère
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw, limit = raw[cut:], 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _utc(dt):
+    return dt.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _local(date_, time_):
+    return datetime.combine(date_, time_).strftime("%Y%m%dT%H%M%S")
+
+
+def _offset(delta):
+    minutes = int(delta.total_seconds()) // 60
+    sign = "-" if minutes < 0 else "+"
+    return f"{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}"
+
+
+@lru_cache(maxsize=8)
+def vtimezone_lines(tzid, year):
+    """
+    VTIMEZONE de `tzid` : une composante STANDARD / DAYLIGHT par changement
+    d'heure de `year`, répétée chaque année (RRULE YEARLY, n-ième ou dernier
+    jour de la semaine du mois). Fuseau sans changement : une seule STANDARD.
+    """
+    tz = ZoneInfo(tzid)
+    start = datetime(year, 1, 1, tzinfo=dt_timezone.utc)
+    before = start.astimezone(tz)
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{tzid}"]
+    transitions = 0
+    for hours in range(1, 367 * 24):
+        after = (start + timedelta(hours=hours)).astimezone(tz)
+        if after.utcoffset() != before.utcoffset():
+            transitions += 1
+            # DTSTART : heure locale de la bascule, dans l'ancien décalage
+            local = (after.replace(tzinfo=None) - after.utcoffset() + before.utcoffset())
+            last = (local + timedelta(days=7)).month != local.month
+            rank = -1 if last else (local.day - 1) // 7 + 1
+            kind = "DAYLIGHT" if after.dst() else "STANDARD"
+            lines += [
+                f"BEGIN:{kind}",
+                f"DTSTART:{local.strftime('%Y%m%dT%H%M%S')}",
+                f"RRULE:FREQ=YEARLY;BYMONTH={local.month};BYDAY={rank}{WEEKDAYS[local.weekday()]}",
+                f"TZOFFSETFROM:{_offset(before.utcoffset())}",
+                f"TZOFFSETTO:{_offset(after.utcoffset())}",
+                f"TZNAME:{after.tzname()}",
+                f"END:{kind}",
+            ]
+        before = after
+    if not transitions:
+        lines += [
+            "BEGIN:STANDARD",
+            "DTSTART:19700101T000000",
+            f"TZOFFSETFROM:{_offset(before.utcoffset())}",
+            f"TZOFFSETTO:{_offset(before.utcoffset())}",
+            f"TZNAME:{before.tzname()}",
+            "END:STANDARD",
+        ]
+    lines.append("END:VTIMEZONE")
+    return tuple(lines)
+
+
+def feed_querysets(restaurant, private):
+    """
+    Contenu du flux. Public : évènements publics publiés (ou annulés) et fermetures ;
+    `private` (propriétaire / ADMIN) : tous les évènements hors brouillon et les
+    réservations confirmées en plus.
+    """
+    since = timezone.localdate() - timedelta(days=ICS_PAST_DAYS)
+    recurring = Q(rrule__isnull=False) & ~Q(rrule="")
+    events = Evenement.objects.filter(restaurant=restaurant).filter(Q(date__gte=since) | recurring)
+    events = events.exclude(status="DRAFT")
+    if not private:
+        events = events.filter(is_public=True)
+    closures = RestaurantClosure.objects.filter(restaurant=restaurant, date__gte=since)
+    reservations = (
+        Reservation.objects.filter(restaurant=restaurant, status="CONFIRMED", date__gte=since)
+        if private else Reservation.objects.none()
+    )
+    return {"events": events, "reservations": reservations, "closures": closures}
+
+
+def feed_etag(querysets, private):
+    """ETag sans charger une seule ligne : un agrégat par type."""
+    stamps = []
+    for name, qs in querysets.items():
+        agg = qs.order_by().aggregate(count=Count("pk"), last=Max("updated_at"))
+        stamps.append(f"{name}:{agg['count']}:{agg['last'].isoformat() if agg['last'] else '-'}")
+    stamps.append(f"private:{int(private)}:{timezone.localdate() - timedelta(days=ICS_PAST_DAYS)}")
+    return '"%s"' % hashlib.sha1("|".join(stamps).encode()).hexdigest()
+
+
+def _event_lines(event, host, tzid):
+    yield "BEGIN:VEVENT"
+    yield f"UID:evenement-{event.pk}@{host}"
+    yield f"DTSTAMP:{_utc(event.updated_at)}"
+    yield f"LAST-MODIFIED:{_utc(event.updated_at)}"
+    yield f"DTSTART;TZID={tzid}:{_local(event.date, event.start_time)}"
+    yield f"DTEND;TZID={tzid}:{_local(event.date, event.end_time)}"
+    yield f"SUMMARY:{escape_text(event.title)}"
+    if event.description:
+        yield f"DESCRIPTION:{escape_text(event.description)}"
+    yield f"CATEGORIES:{escape_text(event.get_type_display())}"
+    yield f"STATUS:{'CANCELLED' if event.status == 'CANCELLED' else 'CONFIRMED'}"
+    yield f"CLASS:{'PUBLIC' if event.is_public else 'PRIVATE'}"
+    if event.room_id:
+        yield f"LOCATION:{escape_text(event.room.name)}"
+    if event.rrule:
+        rule = event.rrule.strip()
+        yield rule if rule.upper().startswith("RRULE:") else f"RRULE:{rule}"
+        exdates = sorted(str(d) for d in event.rrule_exdates or [])
+        if exdates:
+            yield f"EXDATE;TZID={tzid}:" + ",".join(
+                d.replace("-", "") + event.start_time.strftime("T%H%M%S") for d in exdates
+            )
+    yield "END:VEVENT"
+
+
+def _reservation_lines(reservation, host, tzid):
+    where = "Tout le restaurant" if reservation.full_restaurant else (
+        reservation.room.name if reservation.room_id else "Salle à affecter")
+    yield "BEGIN:VEVENT"
+    yield f"UID:reservation-{reservation.pk}@{host}"
+    yield f"DTSTAMP:{_utc(reservation.updated_at)}"
+    yield f"LAST-MODIFIED:{_utc(reservation.updated_at)}"
+    yield f"DTSTART;TZID={tzid}:{_local(reservation.date, reservation.start_time)}"
+    yield f"DTEND;TZID={tzid}:{_local(reservation.date, reservation.end_time)}"
+    yield f"SUMMARY:{escape_text(f'Réservation – {reservation.party_size} couverts')}"
+    yield f"DESCRIPTION:{escape_text(f'Client : {reservation.customer.email}')}"
+    yield f"LOCATION:{escape_text(where)}"
+    yield "STATUS:CONFIRMED"
+    yield "CLASS:PRIVATE"
+    yield "END:VEVENT"
+
+
+def _closure_lines(closure, host):
+    yield "BEGIN:VEVENT"
+    yield f"UID:fermeture-{closure.pk}@{host}"
+    yield f"DTSTAMP:{_utc(closure.updated_at)}"
+    yield f"LAST-MODIFIED:{_utc(closure.updated_at)}"
+    yield f"DTSTART;VALUE=DATE:{closure.date.strftime('%Y%m%d')}"
+    yield f"DTEND;VALUE=DATE:{(closure.date + timedelta(days=1)).strftime('%Y%m%d')}"
+    yield f"SUMMARY:{escape_text('Fermeture' + (f' : {closure.reason}' if closure.reason else ''))}"
+    yield "TRANSP:OPAQUE"
+    yield "END:VEVENT"
+
+
+def iter_feed(restaurant, querysets, host):
+    """Lignes du VCALENDAR, pliées et terminées par CRLF, lues par paquets de 500."""
+    tzid = settings.TIME_ZONE
+    header = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{ICS_PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(restaurant.name)}",
+        f"X-WR-TIMEZONE:{tzid}",
+        *vtimezone_lines(tzid, timezone.localdate().year),
+    ]
+    yield "".join(fold(line) for line in header)
+    for event in querysets["events"].select_related("room").iterator(chunk_size=500):
+        yield "".join(fold(line) for line in _event_lines(event, host, tzid))
+    for reservation in querysets["reservations"].select_related("room", "customer").iterator(chunk_size=500):
+        yield "".join(fold(line) for line in _reservation_lines(reservation, host, tzid))
+    for closure in querysets["closures"].iterator(chunk_size=500):
+        yield "".join(fold(line) for line in _closure_lines(closure, host))
+    yield fold("END:VCALENDAR")
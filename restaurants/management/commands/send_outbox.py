@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from restaurants.outbox import send_pending, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Envoie les emails en attente (EmailOutbox), par lots sur une seule connexion SMTP."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--loop", action="store_true", help="Tourne en continu (worker).")
+        parser.add_argument("--sleep", type=float, default=5.0, help="Pause entre deux lots vides (secondes).")
+
+    def handle(self, *args, **opts):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_pending(batch_size=opts["batch_size"])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Lot traité : {sent} envoyé(s), {failed} en échec.")
+                continue
+            if not opts["loop"]:
+                break
+            time.sleep(opts["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox vidée : {total_sent} envoyé(s), {total_failed} en échec."
+        ))
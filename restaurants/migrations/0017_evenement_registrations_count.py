@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:52
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_registrations_count(apps, schema_editor):
+    Evenement = apps.get_model("restaurants", "Evenement")
+    EvenementRegistration = apps.get_model("restaurants", "EvenementRegistration")
+    counts = (
+        EvenementRegistration.objects.filter(event=OuterRef("pk"))
+        .order_by().values("event").annotate(n=Count("pk")).values("n")
+    )
+    Evenement.objects.update(registrations_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0016_eventinvite_invited_user_alter_eventinvite_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evenement',
+            name='registrations_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Compteur d'inscrits, maintenu par les UPDATE conditionnels de restaurants.registrations"),
+        ),
+        migrations.RunPython(backfill_registrations_count, migrations.RunPython.noop),
+    ]
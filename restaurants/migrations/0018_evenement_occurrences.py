@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0017_evenement_registrations_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evenement',
+            name='occurrences_until',
+            field=models.DateField(blank=True, editable=False, help_text="Occurrences matérialisées jusqu'à cette date", null=True),
+        ),
+        migrations.AddField(
+            model_name='evenement',
+            name='rrule_exdates',
+            field=models.JSONField(blank=True, default=list, help_text='Dates exclues de la récurrence (YYYY-MM-DD)'),
+        ),
+        migrations.CreateModel(
+            name='EvenementOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='restaurants.evenement')),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+                'indexes': [models.Index(fields=['date'], name='restaurants_date_343433_idx')],
+                'unique_together': {('event', 'date')},
+            },
+        ),
+    ]
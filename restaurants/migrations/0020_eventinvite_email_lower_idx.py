@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:01
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0019_emailoutbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventinvite',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='eventinvite_email_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0021_reservation_closure_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
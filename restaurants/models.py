@@ -2,10 +2,13 @@ import secrets
 from datetime import time, timedelta, datetime as ddatetime, time as dtime
 
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from .opening import OpeningCalendar
+
 User = settings.AUTH_USER_MODEL
 
 
@@ -45,6 +48,7 @@ class Restaurant(models.Model):
         related_name='restaurants',
         limit_choices_to={'role': 'RESTAURATEUR'}
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} - {self.city}"
@@ -63,27 +67,21 @@ class Restaurant(models.Model):
             return (self.opening_time_saturday, self.closing_time_saturday)
         return (self.opening_time_sunday, self.closing_time_sunday)
 
-    def is_time_range_within_opening(self, date_, start_t: time, end_t: time) -> bool:
-        wd = date_.weekday()
-        open_t, close_t = self.opening_times_for_weekday(wd)
-
-        def in_range_same_day(open_t, close_t, st, et):
-            if close_t > open_t:
-                return (st >= open_t) and (et <= close_t)
-            # overnight (ex: 09:00 → 01:00 le lendemain)
-            return (st >= open_t) and (et <= time(23, 59, 59))
+    def opening_calendar(self):
+        """Calendrier hebdomadaire compilé, recalculé seulement si les horaires changent."""
+        hours = tuple(self.opening_times_for_weekday(wd) for wd in range(7))
+        cached = getattr(self, '_opening_calendar', None)
+        if cached is None or cached[0] != hours:
+            cached = (hours, OpeningCalendar(hours))
+            self._opening_calendar = cached
+        return cached[1]
 
-        ok_today = in_range_same_day(open_t, close_t, start_t, end_t)
-
-        from datetime import time as ttime
-        prev_open, prev_close = self.opening_times_for_weekday((wd - 1) % 7)
-        is_prev_overnight = prev_close <= prev_open
-        ok_prev_spill = False
-        if is_prev_overnight:
-            if (start_t >= ttime(0, 0, 0)) and (end_t <= prev_close):
-                ok_prev_spill = True
-
-        return ok_today or ok_prev_spill
+    def is_time_range_within_opening(self, date_, start_t: time, end_t: time, closed_dates=()) -> bool:
+        """
+        `closed_dates` : fermetures exceptionnelles connues autour de `date_`
+        (la fermeture de la veille supprime aussi son débordement après minuit).
+        """
+        return self.opening_calendar().is_open(date_, start_t, end_t, closed_dates)
 
 
 class Room(models.Model):
@@ -122,6 +120,7 @@ class Reservation(models.Model):
 
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def clean(self):
         if self.start_time >= self.end_time:
@@ -135,6 +134,19 @@ class Reservation(models.Model):
         ordering = ['-date', 'start_time']
 
 
+class SubtractDays(models.Func):
+    """`date - n jours` en SQL (colonne entière), résultat de type date."""
+    arity = 2
+    output_field = models.DateField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template="(%(expressions)s)", arg_joiner=" - ", **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template="date(%(expressions)s || ' days')",
+                              arg_joiner=", '-' || ", **extra_context)
+
+
 class Evenement(models.Model):
     TYPE_CHOICES = [
         ("ANNIVERSAIRE", "Anniversaire"),
@@ -160,6 +172,10 @@ class Evenement(models.Model):
     end_time = models.TimeField()
 
     capacity = models.PositiveIntegerField(null=True, blank=True, help_text="Nombre de places (optionnel)")
+    registrations_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text="Compteur d'inscrits, maintenu par les UPDATE conditionnels de restaurants.registrations"
+    )
     is_public = models.BooleanField(default=True, help_text="Public ou sur invitation")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="DRAFT")
 
@@ -169,6 +185,10 @@ class Evenement(models.Model):
 
     rrule = models.CharField(max_length=255, blank=True, null=True,
                              help_text="RRULE iCal ex: FREQ=WEEKLY;BYDAY=TU")
+    rrule_exdates = models.JSONField(default=list, blank=True,
+                                     help_text="Dates exclues de la récurrence (YYYY-MM-DD)")
+    occurrences_until = models.DateField(null=True, blank=True, editable=False,
+                                         help_text="Occurrences matérialisées jusqu'à cette date")
 
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
 
@@ -199,12 +219,12 @@ class Evenement(models.Model):
         """
         if not self.date or not self.requires_supplier_confirmation:
             return None
-        limit_date = self.date - timedelta(days=int(self.supplier_deadline_days or 0))
-        naive = ddatetime.combine(limit_date, dtime(23, 59, 59))
-        tz = timezone.get_current_timezone()
-        if timezone.is_naive(naive):
-            return naive.replace(tzinfo=tz)
-        return naive.astimezone(tz)
+        return self.deadline_end_of_day(self.date - timedelta(days=int(self.supplier_deadline_days or 0)))
+
+    @staticmethod
+    def deadline_end_of_day(limit_date):
+        """Jour limite → 23:59:59 dans le fuseau courant (aussi pour la date annotée en SQL)."""
+        return ddatetime.combine(limit_date, dtime(23, 59, 59)).replace(tzinfo=timezone.get_current_timezone())
 
     def __str__(self):
         return f"{self.title} ({self.date} - {self.restaurant.name})"
@@ -217,6 +237,24 @@ class Evenement(models.Model):
         ]
 
 
+class EvenementOccurrence(models.Model):
+    """Occurrence matérialisée d'un évènement récurrent (hors date de l'évènement lui-même)."""
+    event = models.ForeignKey(Evenement, on_delete=models.CASCADE, related_name='occurrences')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        unique_together = ('event', 'date')
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.event.title} ({self.date})"
+
+
 class EvenementRegistration(models.Model):
     event = models.ForeignKey(Evenement, on_delete=models.CASCADE, related_name='registrations')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -255,13 +293,20 @@ class EventInvite(models.Model):
             models.Index(fields=['token']),
             models.Index(fields=['event', 'status']),
             models.Index(fields=['invited_user', 'status']),
+            models.Index(Lower('email'), name='eventinvite_email_lower_idx'),
         ]
 
+    VALIDITY = timedelta(days=14)
+
+    @staticmethod
+    def new_token():
+        return secrets.token_urlsafe(32)[:64]
+
     def save(self, *args, **kwargs):
         if not self.token:
-            self.token = secrets.token_urlsafe(32)[:64]
+            self.token = self.new_token()
         if self.expires_at is None:
-            self.expires_at = timezone.now() + timedelta(days=14)
+            self.expires_at = timezone.now() + self.VALIDITY
         super().save(*args, **kwargs)
 
     def supplier_deadline_at(self):
@@ -288,6 +333,7 @@ class RestaurantClosure(models.Model):
     date = models.DateField()
     reason = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('restaurant', 'date')
@@ -295,3 +341,37 @@ class RestaurantClosure(models.Model):
 
     def __str__(self):
         return f"Fermeture {self.restaurant.name} le {self.date} ({self.reason or '—'})"
+
+
+class EmailOutbox(models.Model):
+    """
+    File d'envoi des emails : les vues enregistrent un message par destinataire,
+    la commande `send_outbox` les envoie par lots (cf. restaurants/outbox.py).
+    """
+    STATUS_CHOICES = [
+        ("PENDING", "En attente"),
+        ("SENT", "Envoyé"),
+        ("FAILED", "Échec définitif"),
+    ]
+
+    category = models.CharField(max_length=50, blank=True, help_text="Origine (ex: event_cancelled)")
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    to_email = models.EmailField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {self.to_email} ({self.status})"
@@ -0,0 +1,97 @@
+"""
+Calendrier d'ouverture compilé d'un restaurant.
+
+Les horaires hebdomadaires sont ramenés une fois pour toutes en intervalles
+de minutes [début, fin) par jour calendaire : le débordement après minuit du
+service de la veille (ex. vendredi 09:00 → 01:00) est rattaché au jour
+suivant. Une fermeture exceptionnelle le jour J supprime le service de J,
+y compris sa partie après minuit sur J+1.
+"""
+from datetime import timedelta
+
+DAY_MINUTES = 24 * 60
+
+
+def to_minutes(t):
+    return t.hour * 60 + t.minute + t.second / 60
+
+
+def minutes_label(m):
+    return f"{int(m) // 60:02d}:{int(m) % 60:02d}"
+
+
+def merge_windows(windows):
+    merged = []
+    for start, end in sorted(w for w in windows if w[1] > w[0]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class OpeningCalendar:
+    """
+    `weekly_hours` : 7 couples (ouverture, fermeture) du lundi au dimanche.
+    Une fermeture ≤ ouverture signifie que le service se termine le lendemain.
+    """
+
+    def __init__(self, weekly_hours):
+        self.own = []    # service du jour, coupé à minuit
+        self.spill = []  # partie après minuit, portée sur le jour suivant
+        for open_t, close_t in weekly_hours:
+            start, end = to_minutes(open_t), to_minutes(close_t)
+            if end > start:
+                self.own.append((start, end))
+                self.spill.append(None)
+            else:
+                self.own.append((start, DAY_MINUTES))
+                self.spill.append((0, end) if end > 0 else None)
+        self.weekly = [self._merge(wd, own=True, spill=True) for wd in range(7)]
+
+    def _merge(self, weekday, own, spill):
+        windows = []
+        previous = self.spill[(weekday - 1) % 7]
+        if spill and previous:
+            windows.append(previous)
+        if own:
+            windows.append(self.own[weekday])
+        return merge_windows(windows)
+
+    def windows_for(self, date_, closed_dates=()):
+        """Plages ouvertes du jour, fermetures exceptionnelles déduites."""
+        weekday = date_.weekday()
+        if not closed_dates:
+            return self.weekly[weekday]
+        return self._merge(
+            weekday,
+            own=date_ not in closed_dates,
+            spill=(date_ - timedelta(days=1)) not in closed_dates,
+        )
+
+    def is_open(self, date_, start_t, end_t, closed_dates=()):
+        """Le créneau [start_t, end_t] tient-il dans une seule plage ouverte ?"""
+        start, end = to_minutes(start_t), to_minutes(end_t)
+        return any(w_start <= start and end <= w_end
+                   for w_start, w_end in self.windows_for(date_, closed_dates))
+
+    def days(self, date_from, date_to, closures=None):
+        """
+        Calendrier jour par jour. `closures` : {date: motif} couvrant au moins
+        [date_from - 1 jour, date_to].
+        """
+        closures = closures or {}
+        days = []
+        day = date_from
+        while day <= date_to:
+            days.append({
+                "date": str(day),
+                "closed": day in closures,
+                "closure_reason": closures.get(day),
+                "windows": [
+                    {"start": minutes_label(start), "end": minutes_label(end)}
+                    for start, end in self.windows_for(day, closures)
+                ],
+            })
+            day += timedelta(days=1)
+        return days
@@ -0,0 +1,120 @@
+"""
+Envoi différé des emails (outbox en base).
+
+`queue_email` n'écrit que des lignes EmailOutbox (une par destinataire) : la
+requête HTTP ne touche jamais SMTP. `send_pending` prend un lot de lignes
+dues, ouvre une seule connexion (`get_connection()`) pour tout le lot et
+replanifie les échecs avec un délai exponentiel.
+
+Aucune transaction n'est tenue pendant l'envoi : le lot est réservé dans une
+transaction courte (`next_attempt_at` repoussé de `LEASE_SECONDS`), envoyé,
+puis les résultats sont enregistrés dans une seconde transaction courte. Si
+le worker meurt entre les deux, le lot redevient dû à la fin du bail (envoi
+au moins une fois).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+LEASE_SECONDS = 600
+
+
+def queue_email(subject, body, recipients, from_email=None, category=""):
+    """Met en file un message par destinataire distinct ; retourne le nombre de lignes créées."""
+    seen, rows = set(), []
+    for email in recipients:
+        email = (email or "").strip()
+        if not email or email.lower() in seen:
+            continue
+        seen.add(email.lower())
+        rows.append(EmailOutbox(
+            category=category, subject=subject[:255], body=body,
+            from_email=from_email or "", to_email=email,
+        ))
+    EmailOutbox.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_batch(batch_size=BATCH_SIZE):
+    """Réserve un lot de messages dus (SKIP LOCKED : plusieurs workers peuvent tourner)."""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(status="PENDING", next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        EmailOutbox.objects.filter(pk__in=[row.pk for row in batch]).update(
+            next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+        )
+    return batch
+
+
+def send_pending(batch_size=BATCH_SIZE, connection=None):
+    """Envoie un lot de messages dus, hors transaction. Retourne (envoyés, en échec)."""
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    now = timezone.now()
+    sent = failed = 0
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # serveur injoignable : tout le lot est replanifié
+        for row in batch:
+            _mark_failed(row, exc, now)
+        _record(batch)
+        return 0, len(batch)
+
+    try:
+        for row in batch:
+            message = EmailMessage(
+                row.subject, row.body,
+                row.from_email or settings.DEFAULT_FROM_EMAIL,
+                [row.to_email], connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as exc:
+                _mark_failed(row, exc, now)
+                failed += 1
+            else:
+                row.status, row.sent_at, row.last_error = "SENT", now, ""
+                row.attempts += 1
+                sent += 1
+    finally:
+        connection.close()
+        _record(batch)
+    return sent, failed
+
+
+def _record(batch):
+    with transaction.atomic():
+        EmailOutbox.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+
+
+def _mark_failed(row, exc, now):
+    row.attempts += 1
+    row.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+    if row.attempts >= MAX_ATTEMPTS:
+        row.status = "FAILED"
+    else:
+        row.next_attempt_at = now + retry_delay(row.attempts)
@@ -0,0 +1,319 @@
+"""
+Récurrence des évènements (`Evenement.rrule`).
+
+Sous-ensemble de RFC 5545 suffisant pour les animations et séminaires :
+FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL, COUNT, UNTIL, BYDAY
+(avec rang en mensuel/annuel : 1TU, -1FR ; en annuel sans BYMONTH le rang
+est compté sur l'année), BYMONTHDAY, BYMONTH.
+
+Les occurrences sont matérialisées dans `EvenementOccurrence` jusqu'à un
+horizon (`Evenement.occurrences_until`) et prolongées à la demande : les
+listes, contrôles de chevauchement et tableaux de bord interrogent la table
+au lieu de dérouler les règles à chaque requête. La date de l'évènement
+lui-même (DTSTART) n'est pas recopiée dans la table.
+
+Rien n'est écrit au-delà de `occurrence_limit()` (aujourd'hui + 366 jours) :
+pour une date plus lointaine, `occurrences_beyond_limit` déroule les règles en
+mémoire, sur les seules dates demandées.
+"""
+import calendar
+from datetime import date, datetime, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from config.cache import versioned_key
+from .models import Evenement, EvenementOccurrence
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+FREQUENCIES = ["DAILY", "WEEKLY", "MONTHLY", "YEARLY"]
+
+OCCURRENCES_CACHE = "evenement-occurrences"
+OCCURRENCE_HORIZON_DAYS = 366
+
+
+class RRule:
+    def __init__(self, freq, interval=1, count=None, until=None, byday=(), bymonthday=(), bymonth=()):
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday = list(byday)          # [(rang ou None, jour 0..6)]
+        self.bymonthday = list(bymonthday)
+        self.bymonth = list(bymonth)
+
+
+def _int_list(value, name, low, high):
+    try:
+        items = [int(v) for v in value.split(",")]
+    except ValueError:
+        raise ValueError(f"RRULE : {name} invalide.")
+    if any(not (low <= abs(i) <= high) for i in items):
+        raise ValueError(f"RRULE : {name} hors bornes.")
+    return items
+
+
+def parse_rrule(text):
+    """'FREQ=WEEKLY;BYDAY=TU' → RRule ; ValueError si la règle n'est pas prise en charge."""
+    text = (text or "").strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    parts = {}
+    for chunk in filter(None, text.split(";")):
+        key, sep, value = chunk.partition("=")
+        if not sep or not value:
+            raise ValueError(f"RRULE : segment invalide « {chunk} ».")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError("RRULE : FREQ doit valoir DAILY, WEEKLY, MONTHLY ou YEARLY.")
+    rule = RRule(freq)
+    parts.pop("WKST", None)  # semaines du lundi
+
+    if "INTERVAL" in parts:
+        rule.interval = _int_list(parts.pop("INTERVAL"), "INTERVAL", 1, 1000)[0]
+    if "COUNT" in parts:
+        rule.count = _int_list(parts.pop("COUNT"), "COUNT", 1, 10000)[0]
+    if "UNTIL" in parts:
+        try:
+            rule.until = datetime.strptime(parts.pop("UNTIL")[:8], "%Y%m%d").date()
+        except ValueError:
+            raise ValueError("RRULE : UNTIL doit être au format AAAAMMJJ.")
+    if "BYDAY" in parts:
+        for token in parts.pop("BYDAY").split(","):
+            day, rank = token[-2:], token[:-2]
+            if day not in WEEKDAYS:
+                raise ValueError(f"RRULE : jour « {token} » invalide.")
+            if rank and freq not in ("MONTHLY", "YEARLY"):
+                raise ValueError("RRULE : rang dans BYDAY réservé à MONTHLY/YEARLY.")
+            rule.byday.append((_int_list(rank, "BYDAY", 1, 53)[0] if rank else None, WEEKDAYS.index(day)))
+    if "BYMONTHDAY" in parts:
+        rule.bymonthday = _int_list(parts.pop("BYMONTHDAY"), "BYMONTHDAY", 1, 31)
+    if "BYMONTH" in parts:
+        rule.bymonth = _int_list(parts.pop("BYMONTH"), "BYMONTH", 1, 12)
+    if parts:
+        raise ValueError(f"RRULE : {', '.join(sorted(parts))} non pris en charge.")
+    if rule.count and rule.until:
+        raise ValueError("RRULE : COUNT et UNTIL sont exclusifs.")
+    if rule.bymonth and rule.bymonthday:
+        longest = max(calendar.monthrange(2000, m)[1] for m in rule.bymonth)
+        if all(abs(d) > longest for d in rule.bymonthday):
+            raise ValueError("RRULE : aucun jour de BYMONTHDAY n'existe dans les mois de BYMONTH.")
+    return rule
+
+
+def _month_candidates(rule, year, month, default_day):
+    last = calendar.monthrange(year, month)[1]
+    if rule.bymonthday:
+        days = {d if d > 0 else last + d + 1 for d in rule.bymonthday}
+        days = [date(year, month, d) for d in sorted(days) if 1 <= d <= last]
+        if rule.byday:
+            weekdays = {wd for _, wd in rule.byday}
+            days = [d for d in days if d.weekday() in weekdays]
+        return days
+    if rule.byday:
+        days = set()
+        first_wd = date(year, month, 1).weekday()
+        for rank, wd in rule.byday:
+            matches = list(range(1 + (wd - first_wd) % 7, last + 1, 7))
+            if rank is None:
+                days.update(matches)
+            elif rank > 0 and rank <= len(matches):
+                days.add(matches[rank - 1])
+            elif rank < 0 and -rank <= len(matches):
+                days.add(matches[rank])
+        return [date(year, month, d) for d in sorted(days)]
+    return [date(year, month, default_day)] if default_day <= last else []
+
+
+def _year_candidates(rule, year):
+    """YEARLY + BYDAY sans BYMONTH ni BYMONTHDAY : rangs comptés sur l'année (20MO = 20e lundi)."""
+    first = date(year, 1, 1)
+    length = 366 if calendar.isleap(year) else 365
+    days = set()
+    for rank, wd in rule.byday:
+        matches = list(range((wd - first.weekday()) % 7, length, 7))
+        if rank is None:
+            days.update(matches)
+        elif rank > 0 and rank <= len(matches):
+            days.add(matches[rank - 1])
+        elif rank < 0 and -rank <= len(matches):
+            days.add(matches[rank])
+    return [first + timedelta(days=d) for d in sorted(days)]
+
+
+def _periods(rule, dtstart, skip_to=None):
+    """
+    (début de période, dates candidates), période par période (jour, semaine,
+    mois, année), jusqu'à `date.max`. `skip_to` : commence à la période qui
+    contient cette date, en restant aligné sur INTERVAL.
+    """
+    step = rule.interval
+    try:
+        if rule.freq == "DAILY":
+            d = dtstart
+            if skip_to and skip_to > d:
+                d += timedelta(days=(skip_to - d).days // step * step)
+            while True:
+                yield d, [d]
+                d += timedelta(days=step)
+        elif rule.freq == "WEEKLY":
+            weekdays = sorted({wd for _, wd in rule.byday}) or [dtstart.weekday()]
+            week = dtstart - timedelta(days=dtstart.weekday())
+            if skip_to and skip_to > week:
+                week += timedelta(weeks=(skip_to - week).days // 7 // step * step)
+            while True:
+                yield week, [week + timedelta(days=wd) for wd in weekdays if wd <= (date.max - week).days]
+                week += timedelta(weeks=step)
+        elif rule.freq == "MONTHLY":
+            year, month = dtstart.year, dtstart.month
+            if skip_to and skip_to > dtstart:
+                month += ((skip_to.year - year) * 12 + skip_to.month - month) // step * step
+                year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+            while year <= date.max.year:
+                yield date(year, month, 1), _month_candidates(rule, year, month, dtstart.day)
+                month += step
+                year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+        else:
+            year = dtstart.year
+            if skip_to and skip_to > dtstart:
+                year += (skip_to.year - year) // step * step
+            # RFC 5545 : sans BYMONTH, BYMONTHDAY vaut pour chaque mois et BYDAY pour l'année
+            months = rule.bymonth or (list(range(1, 13)) if rule.bymonthday else [dtstart.month])
+            whole_year = rule.byday and not (rule.bymonth or rule.bymonthday)
+            while year <= date.max.year:
+                yield date(year, 1, 1), (_year_candidates(rule, year) if whole_year else
+                                         [d for m in sorted(months) for d in _month_candidates(rule, year, m, dtstart.day)])
+                year += step
+    except OverflowError:
+        return  # au-delà de date.max
+
+
+def expand(rule, dtstart, window_start, window_end, exdates=()):
+    """
+    Dates d'occurrence dans [window_start, window_end], DTSTART inclus.
+    COUNT est compté depuis DTSTART ; les `exdates` consomment leur rang.
+    Sans COUNT, le déroulé commence directement à la période de `window_start`.
+    """
+    last = window_end if rule.until is None else min(window_end, rule.until)
+    daily_filter = rule.freq == "DAILY"
+    weekdays = {wd for _, wd in rule.byday}
+    emitted = 0
+    for period_start, candidates in _periods(rule, dtstart, None if rule.count else window_start):
+        # une période peut être vide (ex. 31 février) : on s'arrête sur son début
+        if period_start > last:
+            return
+        for d in candidates:
+            if d < dtstart:
+                continue
+            if rule.bymonth and d.month not in rule.bymonth:
+                continue
+            if daily_filter and ((weekdays and d.weekday() not in weekdays) or (
+                    rule.bymonthday and d.day not in rule.bymonthday)):
+                continue
+            if d > last:
+                return
+            emitted += 1
+            if rule.count and emitted > rule.count:
+                return
+            if d >= window_start and d not in exdates:
+                yield d
+
+
+# ---- matérialisation ----
+def _exdates(event):
+    result = set()
+    for value in event.rrule_exdates or []:
+        try:
+            result.add(date.fromisoformat(value))
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+def extend_occurrences(event, until):
+    """Complète les occurrences de `event` jusqu'à `until` (incrémental)."""
+    if not event.rrule or (event.occurrences_until and event.occurrences_until >= until):
+        return 0
+    start = max(event.occurrences_until + timedelta(days=1) if event.occurrences_until else event.date,
+                event.date + timedelta(days=1))
+    try:
+        rule = parse_rrule(event.rrule)
+    except ValueError:
+        dates = []
+    else:
+        dates = list(expand(rule, event.date, start, until, _exdates(event)))
+    with transaction.atomic():
+        EvenementOccurrence.objects.bulk_create(
+            [EvenementOccurrence(event=event, date=d, start_time=event.start_time, end_time=event.end_time)
+             for d in dates],
+            batch_size=500, ignore_conflicts=True,
+        )
+        Evenement.objects.filter(pk=event.pk).update(occurrences_until=until)
+    event.occurrences_until = until
+    return len(dates)
+
+
+def rebuild_occurrences(event):
+    """Après modification de la règle, de la date, des horaires ou des exceptions."""
+    EvenementOccurrence.objects.filter(event=event).delete()
+    Evenement.objects.filter(pk=event.pk).update(occurrences_until=None)
+    event.occurrences_until = None
+    if event.rrule:
+        extend_occurrences(event, occurrence_limit())
+
+
+def _horizon_key():
+    return versioned_key(OCCURRENCES_CACHE, "horizon")
+
+
+def occurrence_limit():
+    """Dernier jour matérialisé en table ; au-delà, voir `occurrences_beyond_limit`."""
+    return timezone.localdate() + timedelta(days=OCCURRENCE_HORIZON_DAYS)
+
+
+def ensure_occurrences(until):
+    """
+    Garantit que toutes les occurrences jusqu'à `until`, borné à
+    `occurrence_limit()`, sont en table. Une seule lecture de cache tant que
+    l'horizon matérialisé couvre `until`.
+    """
+    limit = occurrence_limit()
+    until = min(until, limit)
+    horizon = cache.get(_horizon_key())
+    if horizon and horizon >= until:
+        return
+    stale = (
+        Evenement.objects
+        .exclude(Q(rrule__isnull=True) | Q(rrule=''))
+        .filter(Q(occurrences_until__isnull=True) | Q(occurrences_until__lt=limit))
+    )
+    for event in stale:
+        extend_occurrences(event, limit)
+    cache.set(_horizon_key(), limit, None)
+
+
+def occurrences_beyond_limit(events, dates):
+    """
+    [(évènement, date)] des `dates` postérieures à `occurrence_limit()`,
+    calculées en mémoire sans rien écrire. `events` : évènements candidats
+    (filtrés par l'appelant) ; seuls les récurrents sont déroulés.
+    """
+    dates = sorted(d for d in set(dates) if d > occurrence_limit())
+    if not dates:
+        return []
+    result = []
+    recurring = events.exclude(Q(rrule__isnull=True) | Q(rrule='')).filter(date__lt=dates[-1])
+    for event in recurring:
+        try:
+            rule = parse_rrule(event.rrule)
+        except ValueError:
+            continue
+        exdates = _exdates(event)
+        for d in dates:
+            if d > event.date:
+                result += [(event, occ) for occ in expand(rule, event.date, d, d, exdates)]
+    return result
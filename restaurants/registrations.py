@@ -0,0 +1,99 @@
+"""
+Inscriptions aux évènements sans survente.
+
+`Evenement.registrations_count` est tenu à jour par un UPDATE conditionnel
+(`... WHERE registrations_count < capacity`) : la base sérialise les
+inscriptions concurrentes sur la ligne de l'évènement, la dernière place ne
+peut donc être prise qu'une fois. Le même UPDATE passe l'évènement en FULL.
+
+Toute suppression d'inscription recompte les inscrits depuis la table
+(`recount_registrations`), une fois par évènement touché : les suppressions
+groupées passent par `delete_registrations`, la cascade d'un utilisateur est
+recomptée par `restaurants.signals` après coup. Quand l'évènement lui-même est
+supprimé, il n'y a rien à recompter.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from .models import Evenement, EvenementRegistration
+
+REGISTERED = "registered"
+ALREADY_REGISTERED = "already_registered"
+EVENT_FULL = "full"
+
+
+def register_user(event, user):
+    """
+    Inscrit `user` à `event`. Retourne REGISTERED, ALREADY_REGISTERED ou EVENT_FULL ;
+    `event` est rafraîchi (compteur, statut, full_at) après une inscription.
+    """
+    now = timezone.now()
+    becomes_full = Q(capacity__isnull=False, registrations_count__gte=F('capacity') - 1)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                EvenementRegistration.objects.create(event=event, user=user)
+        except IntegrityError:
+            return ALREADY_REGISTERED
+
+        updated = (
+            Evenement.objects
+            .filter(Q(capacity__isnull=True) | Q(registrations_count__lt=F('capacity')), pk=event.pk)
+            .update(
+                registrations_count=F('registrations_count') + 1,
+                status=Case(When(becomes_full, then=Value('FULL')), default=F('status')),
+                full_at=Case(When(becomes_full, then=Value(now)), default=F('full_at')),
+                updated_at=now,
+            )
+        )
+        if not updated:
+            transaction.set_rollback(True)
+            return EVENT_FULL
+
+    event.refresh_from_db(fields=['registrations_count', 'status', 'full_at', 'updated_at'])
+    return REGISTERED
+
+
+def unregister_user(event, user):
+    """Désinscrit `user` ; un évènement FULL repasse en PUBLISHED. Retourne False si pas inscrit."""
+    deleted = delete_registrations(EvenementRegistration.objects.filter(event=event, user=user))
+    if not deleted:
+        return False
+    event.refresh_from_db(fields=['registrations_count', 'status', 'updated_at'])
+    return True
+
+
+def delete_registrations(queryset):
+    """Supprime les inscriptions de `queryset` puis recompte chaque évènement touché une seule fois."""
+    with transaction.atomic():
+        event_ids = set(queryset.values_list('event_id', flat=True))
+        deleted, _ = queryset.delete()
+        if deleted:
+            recount_registrations(event_ids)
+    return deleted
+
+
+def recount_registrations(event_ids):
+    """
+    Recalcule `registrations_count` depuis la table des inscriptions ; un
+    évènement FULL qui a de nouveau des places repasse en PUBLISHED.
+    Les lignes d'évènement sont verrouillées avant le comptage pour ne pas
+    manquer une inscription concurrente.
+    """
+    with transaction.atomic():
+        locked = list(Evenement.objects.select_for_update().filter(pk__in=event_ids).values_list('pk', 'capacity'))
+        counts = dict(
+            EvenementRegistration.objects.filter(event_id__in=[pk for pk, _ in locked])
+            .values_list('event_id').annotate(n=Count('pk')).order_by()
+        )
+        now = timezone.now()
+        for pk, capacity in locked:
+            count = counts.get(pk, 0)
+            has_room = capacity is None or count < capacity
+            Evenement.objects.filter(pk=pk).update(
+                registrations_count=count,
+                status=Case(When(status='FULL', then=Value('PUBLISHED' if has_room else 'FULL')),
+                            default=F('status')),
+                updated_at=now,
+            )
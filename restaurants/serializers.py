@@ -1,19 +1,22 @@
 from datetime import datetime
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.db.models import Q
 from rest_framework import serializers
 
+from config.serializers import SparseFieldsetMixin
+
 from .models import (
     Restaurant, Room, Reservation, Evenement,
     EvenementRegistration, EventInvite, RestaurantClosure
 )
+from .availability import DayAvailability
+from .recurrence import parse_rrule
 
 User = get_user_model()
 
 
 # --- ROOMS ---
-class RoomReadSerializer(serializers.ModelSerializer):
+class RoomReadSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Room
         fields = ['id', 'name', 'capacity']
@@ -28,7 +31,7 @@ class RoomWriteSerializer(serializers.ModelSerializer):
 
 
 # --- RESTAURANT ---
-class RestaurantSerializer(serializers.ModelSerializer):
+class RestaurantSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     rooms = RoomReadSerializer(many=True, read_only=True)
 
     class Meta:
@@ -62,7 +65,32 @@ class RestaurantUpdateSerializer(serializers.ModelSerializer):
 
 
 # --- RESERVATION ---
-class ReservationSerializer(serializers.ModelSerializer):
+def reservation_timing_error(date_, start, end):
+    today = timezone.localdate()
+    now_t = timezone.localtime().time()
+    if date_ < today:
+        return "Impossible de réserver dans le passé."
+    if date_ == today and end <= now_t:
+        return "Le créneau est déjà passé aujourd'hui."
+    if start >= end:
+        return "L'heure de début doit être avant l'heure de fin."
+    return None
+
+
+def reservation_slot_error(availability, start, end):
+    """Règles de créneau d'une réservation, vérifiées sur un DayAvailability déjà chargé."""
+    if availability.closed:
+        return "Le restaurant est fermé à cette date."
+    if not availability.within_opening(start, end):
+        return "Créneau hors horaires d'ouverture du restaurant."
+    if availability.blocking_event(start, end):
+        return "Créneau indisponible (événement bloquant)."
+    if availability.full_restaurant_conflict(start, end):
+        return "Le restaurant est déjà réservé en entier sur ce créneau."
+    return None
+
+
+class ReservationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     customer = serializers.HiddenField(default=serializers.CurrentUserDefault())
     customer_email = serializers.EmailField(write_only=True, required=False)
 
@@ -110,39 +138,17 @@ class ReservationSerializer(serializers.ModelSerializer):
         if not party_size or party_size <= 0:
             raise serializers.ValidationError("party_size (nombre de places) doit être > 0.")
 
-        today = timezone.localdate()
-        now_t = timezone.localtime().time()
-        if date_ < today:
-            raise serializers.ValidationError("Impossible de réserver dans le passé.")
-        if date_ == today and end <= now_t:
-            raise serializers.ValidationError("Le créneau est déjà passé aujourd'hui.")
-        if start >= end:
-            raise serializers.ValidationError("L'heure de début doit être avant l'heure de fin.")
-
-        if not restaurant.is_time_range_within_opening(date_, start, end):
-            raise serializers.ValidationError("Créneau hors horaires d'ouverture du restaurant.")
+        error = reservation_timing_error(date_, start, end)
+        if error:
+            raise serializers.ValidationError(error)
 
-        ev_qs = Evenement.objects.filter(
-            restaurant=restaurant,
-            date=date_,
-            is_blocking=True,
-            status__in=["PUBLISHED", "FULL"],
-            start_time__lt=end,
-            end_time__gt=start
-        )
-        if ev_qs.exists():
-            raise serializers.ValidationError("Créneau indisponible (événement bloquant).")
-
-        from .models import Reservation as Res
-        conflicts_full = Res.objects.filter(
-            restaurant=restaurant, date=date_,
-            start_time__lt=end, end_time__gt=start,
-            full_restaurant=True
+        availability = DayAvailability.load(
+            restaurant, date_,
+            exclude_reservation=self.instance.pk if self.instance else None,
         )
-        if self.instance:
-            conflicts_full = conflicts_full.exclude(pk=self.instance.pk)
-        if conflicts_full.exists():
-            raise serializers.ValidationError("Le restaurant est déjà réservé en entier sur ce créneau.")
+        error = reservation_slot_error(availability, start, end)
+        if error:
+            raise serializers.ValidationError(error)
 
         return data
 
@@ -164,10 +170,22 @@ class ReservationSerializer(serializers.ModelSerializer):
         return super().create(validated)
 
 
+class ReservationBulkRowSerializer(serializers.Serializer):
+    """Une ligne d'import en lot : contrôles de format seulement, sans requête."""
+    restaurant = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    party_size = serializers.IntegerField(min_value=1)
+    customer_email = serializers.EmailField(required=False, allow_blank=True)
+
+
 # --- EVENEMENTS ---
-class EvenementSerializer(serializers.ModelSerializer):
+class EvenementSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
-    current_registrations = serializers.IntegerField(source='registrations.count', read_only=True)
+    current_registrations = serializers.IntegerField(source='registrations_count', read_only=True)
+    remaining_capacity = serializers.SerializerMethodField()
+    occurrence_date = serializers.SerializerMethodField()
     published_at = serializers.DateTimeField(read_only=True)
     full_at = serializers.DateTimeField(read_only=True)
     cancelled_at = serializers.DateTimeField(read_only=True)
@@ -177,20 +195,48 @@ class EvenementSerializer(serializers.ModelSerializer):
         fields = [
             'id','restaurant','restaurant_name',
             'title','description','type',
-            'date','start_time','end_time',
-            'capacity','current_registrations',
+            'date','occurrence_date','start_time','end_time',
+            'capacity','current_registrations','remaining_capacity',
             'is_public','status',
-            'is_blocking','room','rrule',
+            'is_blocking','room','rrule','rrule_exdates',
             'published_at','full_at','cancelled_at',
             'created_at','updated_at',
             'requires_supplier_confirmation','supplier_deadline_days'
         ]
         read_only_fields = [
-            'status','current_registrations',
+            'status','current_registrations','remaining_capacity',
             'published_at','full_at','cancelled_at',
             'created_at','updated_at'
         ]
 
+    def get_remaining_capacity(self, obj):
+        if obj.capacity is None:
+            return None
+        return max(obj.capacity - obj.registrations_count, 0)
+
+    def get_occurrence_date(self, obj):
+        # renseigné par le filtre ?date= (occurrence d'un évènement récurrent)
+        return getattr(obj, 'occurrence_date', None) or obj.date
+
+    def validate_rrule(self, value):
+        if value:
+            try:
+                parse_rrule(value)
+            except ValueError as exc:
+                raise serializers.ValidationError(str(exc))
+        return value or None
+
+    def validate_rrule_exdates(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Liste de dates YYYY-MM-DD attendue.")
+        dates = []
+        for item in value:
+            try:
+                dates.append(datetime.strptime(str(item), '%Y-%m-%d').date())
+            except ValueError:
+                raise serializers.ValidationError(f"Date invalide : {item}.")
+        return [str(d) for d in sorted(set(dates))]
+
     def validate(self, data):
         instance = getattr(self, 'instance', None)
         restaurant = data.get('restaurant') or (instance.restaurant if instance else None)
@@ -213,27 +259,20 @@ class EvenementSerializer(serializers.ModelSerializer):
         if date_ == today and end <= now_t:
             raise serializers.ValidationError("L’horaire est déjà passé pour aujourd’hui.")
 
-        if not restaurant.is_time_range_within_opening(date_, start, end):
+        # même chemin que les réservations : horaires et fermetures exceptionnelles
+        availability = DayAvailability.load(
+            restaurant, date_,
+            exclude_event=instance.pk if instance else None,
+        )
+        if not availability.within_opening(start, end):
             raise serializers.ValidationError("Créneau hors horaires d'ouverture du restaurant.")
 
         if instance and ('capacity' in data) and (data['capacity'] is not None):
-            if data['capacity'] < instance.registrations.count():
+            if data['capacity'] < instance.registrations_count:
                 raise serializers.ValidationError("La capacité ne peut pas être inférieure au nombre d’inscrits actuel.")
 
         if is_blocking:
-            ev_qs = Evenement.objects.filter(
-                restaurant=restaurant,
-                date=date_,
-                is_blocking=True,
-                status__in=["PUBLISHED", "FULL"],
-                start_time__lt=end,
-                end_time__gt=start,
-            )
-            if room:
-                ev_qs = ev_qs.filter(Q(room__isnull=True) | Q(room=room))
-            if instance:
-                ev_qs = ev_qs.exclude(pk=instance.pk)
-            if ev_qs.exists():
+            if availability.blocking_event(start, end, room=room):
                 raise serializers.ValidationError("Chevauchement avec un évènement bloquant existant.")
 
         return data
@@ -266,7 +305,7 @@ class EventLiteSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'date', 'start_time', 'end_time', 'status']
 
 
-class EventInviteListSerializer(serializers.ModelSerializer):
+class EventInviteListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     event = EventLiteSerializer(read_only=True)
     supplier_deadline_at = serializers.SerializerMethodField()
 
@@ -279,7 +318,11 @@ class EventInviteListSerializer(serializers.ModelSerializer):
         ]
 
     def get_supplier_deadline_at(self, obj):
-        dt = obj.supplier_deadline_at()
+        if hasattr(obj, 'supplier_deadline'):  # annoté en SQL (`mine`)
+            day = obj.supplier_deadline
+            dt = Evenement.deadline_end_of_day(day) if day else None
+        else:
+            dt = obj.supplier_deadline_at()
         return dt.isoformat() if dt else None
 
 
@@ -295,7 +338,7 @@ class EventInviteCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Fournis 'invited_user' ou 'email' ou 'phone'.")
         return attrs
 
-class RestaurantClosureSerializer(serializers.ModelSerializer):
+class RestaurantClosureSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = RestaurantClosure
         fields = ['id', 'restaurant', 'date', 'reason', 'created_at']
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from config.cache import bump_cache_version
+from .availability import opening_calendar_namespace
+from .models import Reservation, Room, Restaurant, RestaurantClosure, Evenement, EvenementRegistration
+from .recurrence import rebuild_occurrences
+from .registrations import recount_registrations
+
+RESERVATION_STATS_CACHE = "reservations-stats"
+
+
+@receiver([post_save, post_delete], sender=Reservation)
+@receiver([post_save, post_delete], sender=Room)
+def invalidate_reservation_stats(sender, **kwargs):
+    bump_cache_version(RESERVATION_STATS_CACHE)
+
+
+@receiver([post_save, post_delete], sender=Room)
+def touch_restaurant(sender, instance, **kwargs):
+    """Les salles sont sérialisées avec le restaurant : son ETag doit changer."""
+    Restaurant.objects.filter(pk=instance.restaurant_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+@receiver([post_save, post_delete], sender=RestaurantClosure)
+def invalidate_opening_calendar(sender, instance, **kwargs):
+    restaurant_id = instance.pk if sender is Restaurant else instance.restaurant_id
+    bump_cache_version(opening_calendar_namespace(restaurant_id))
+
+
+RECURRENCE_FIELDS = {'rrule', 'rrule_exdates', 'date', 'start_time', 'end_time'}
+
+
+@receiver(post_save, sender=Evenement)
+def refresh_occurrences(sender, instance, created, update_fields=None, **kwargs):
+    if not (instance.rrule or instance.occurrences_until):
+        return
+    if created or update_fields is None or RECURRENCE_FIELDS & set(update_fields):
+        rebuild_occurrences(instance)
+
+
+@receiver(post_delete, sender=EvenementRegistration)
+def sync_registrations_count(sender, instance, origin=None, **kwargs):
+    """
+    Suppression d'une seule inscription (admin, `instance.delete()`) : compteur
+    et statut FULL recalculés. Les suppressions groupées (`delete_registrations`)
+    et les cascades (utilisateur ci-dessous, évènement supprimé) ne recomptent
+    pas ligne à ligne.
+    """
+    if origin is instance:
+        recount_registrations([instance.event_id])
+
+
+@receiver(pre_delete, sender=get_user_model())
+def remember_registered_events(sender, instance, **kwargs):
+    instance._registered_event_ids = set(
+        EvenementRegistration.objects.filter(user=instance).values_list('event_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=get_user_model())
+def recount_after_user_delete(sender, instance, **kwargs):
+    """Cascade des inscriptions d'un utilisateur : un seul recomptage par évènement."""
+    event_ids = getattr(instance, '_registered_event_ids', None)
+    if event_ids:
+        recount_registrations(event_ids)
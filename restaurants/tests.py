@@ -1,3 +1,205 @@
-from django.test import TestCase
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .ics import vtimezone_lines
+from .models import (
+    EmailOutbox, EventInvite, Evenement, EvenementOccurrence, EvenementRegistration, Restaurant, RestaurantClosure,
+)
+from .outbox import queue_email, send_pending
+from .recurrence import expand, occurrence_limit, parse_rrule
+from .registrations import EVENT_FULL, REGISTERED, register_user, unregister_user
+
+User = get_user_model()
+
+
+def make_event(capacity):
+    restaurant = Restaurant.objects.create(
+        name="R", address="a", city="Paris", postal_code="75000", capacity=100)
+    return Evenement.objects.create(
+        restaurant=restaurant, title="Atelier", description="", type="ANIMATION",
+        date=date.today() + timedelta(days=7), start_time=time(18), end_time=time(20),
+        capacity=capacity, status="PUBLISHED",
+    )
+
+
+class RegistrationCounterTests(TestCase):
+    def test_register_until_full(self):
+        event = make_event(capacity=2)
+        users = [User.objects.create_user(f"u{i}@x.fr", "pw") for i in range(3)]
+        self.assertEqual(register_user(event, users[0]), REGISTERED)
+        self.assertEqual(register_user(event, users[1]), REGISTERED)
+        self.assertEqual(register_user(event, users[2]), EVENT_FULL)
+        self.assertEqual((event.registrations_count, event.status), (2, "FULL"))
+
+        self.assertTrue(unregister_user(event, users[0]))
+        self.assertEqual((event.registrations_count, event.status), (1, "PUBLISHED"))
+
+    def test_cascade_delete_recounts(self):
+        event = make_event(capacity=2)
+        users = [User.objects.create_user(f"u{i}@x.fr", "pw") for i in range(2)]
+        for user in users:
+            register_user(event, user)
+        users[0].delete()
+        event.refresh_from_db()
+        self.assertEqual((event.registrations_count, event.status), (1, "PUBLISHED"))
+
+    def test_cascade_recounts_once_per_event(self):
+        events = [make_event(capacity=None) for _ in range(2)]
+        user = User.objects.create_user("u@x.fr", "pw")
+        for event in events:
+            register_user(event, user)
+        with CaptureQueriesContext(connection) as queries:
+            user.delete()
+        updates = [q for q in queries if 'SET "registrations_count"' in q["sql"]]
+        self.assertEqual(len(updates), 2)
+        for event in events:
+            event.refresh_from_db()
+            self.assertEqual(event.registrations_count, 0)
+
+    def test_event_delete_skips_recount(self):
+        event = make_event(capacity=None)
+        for i in range(3):
+            register_user(event, User.objects.create_user(f"u{i}@x.fr", "pw"))
+        with CaptureQueriesContext(connection) as queries:
+            event.delete()
+        self.assertFalse([q for q in queries if 'SET "registrations_count"' in q["sql"]])
+
+
+class RecurrenceHorizonTests(TestCase):
+    def test_far_date_expanded_in_memory(self):
+        event = make_event(capacity=10)
+        event.is_public = True
+        event.rrule = "FREQ=DAILY"
+        event.save()
+        far = date(9999, 12, 30)
+        response = APIClient().get("/api/restaurants/evenements/", {"date": far.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        results = results.get("results", results) if isinstance(results, dict) else results
+        self.assertEqual([e["id"] for e in results], [event.pk])
+        self.assertFalse(EvenementOccurrence.objects.filter(date__gt=occurrence_limit()).exists())
+
+    def test_invalid_date(self):
+        response = APIClient().get("/api/restaurants/evenements/", {"date": "2025-13-45"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_expand_stops_at_date_max(self):
+        for text in ("FREQ=DAILY", "FREQ=WEEKLY;BYDAY=FR", "FREQ=MONTHLY;BYMONTHDAY=31", "FREQ=YEARLY"):
+            dates = list(expand(parse_rrule(text), date(9999, 1, 1), date(9999, 1, 1), date.max))
+            self.assertTrue(dates and dates[-1] <= date.max, text)
+
+    def test_yearly_byday_over_the_whole_year(self):
+        rule = parse_rrule("FREQ=YEARLY;BYDAY=20MO;COUNT=2")
+        self.assertEqual(list(expand(rule, date(2026, 1, 1), date(2026, 1, 1), date(2028, 1, 1))),
+                         [date(2026, 5, 18), date(2027, 5, 17)])
+        rule = parse_rrule("FREQ=YEARLY;BYDAY=-1FR;COUNT=1")
+        self.assertEqual(list(expand(rule, date(2026, 1, 1), date(2026, 1, 1), date(2027, 1, 1))),
+                         [date(2026, 12, 25)])
+
+    def test_yearly_bymonthday_every_month(self):
+        rule = parse_rrule("FREQ=YEARLY;BYMONTHDAY=15;COUNT=3")
+        self.assertEqual(list(expand(rule, date(2026, 1, 15), date(2026, 1, 1), date(2027, 1, 1))),
+                         [date(2026, 1, 15), date(2026, 2, 15), date(2026, 3, 15)])
+
+    def test_impossible_rule_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_rrule("FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30;COUNT=3")
+
+
+class OutsideTransactionBackend(EmailBackend):
+    def send_messages(self, messages):
+        assert not transaction.get_connection().in_atomic_block, "SMTP dans une transaction"
+        return super().send_messages(messages)
+
+
+class OutboxTests(TransactionTestCase):
+    def test_send_outside_transaction(self):
+        queue_email("Sujet", "Corps", ["a@x.fr", "b@x.fr"])
+        self.assertEqual(send_pending(connection=OutsideTransactionBackend()), (2, 0))
+        self.assertEqual(EmailOutbox.objects.filter(status="SENT").count(), 2)
+        self.assertEqual(send_pending(), (0, 0))
+
+
+class VTimezoneTests(TestCase):
+    def test_daylight_saving_rules(self):
+        lines = vtimezone_lines("Europe/Paris", 2026)
+        self.assertIn("DTSTART:20260329T020000", lines)
+        self.assertIn("RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU", lines)
+        self.assertIn("RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU", lines)
+        self.assertIn("TZOFFSETTO:+0100", lines)
+
+    def test_fixed_offset(self):
+        self.assertIn("TZOFFSETTO:+0000", vtimezone_lines("UTC", 2026))
+
+
+class SupplierInviteTests(TestCase):
+    def test_mine_deadline_from_sql(self):
+        supplier = User.objects.create_user("sup@x.fr", "pw", role="FOURNISSEUR")
+        event = make_event(capacity=10)
+        event.requires_supplier_confirmation, event.supplier_deadline_days = True, 3
+        event.save()
+        EventInvite.objects.create(event=event, email="SUP@x.fr")
+        api = APIClient()
+        api.force_authenticate(supplier)
+        results = api.get("/api/restaurants/evenements/invites/mine/").json()["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["supplier_deadline_at"], event.supplier_deadline_at().isoformat())
+
+
+class EventOpeningTests(TestCase):
+    def test_event_on_closure_day_rejected(self):
+        owner = User.objects.create_user("owner@x.fr", "pw", role="RESTAURATEUR")
+        restaurant = Restaurant.objects.create(
+            name="R", address="a", city="Paris", postal_code="75000", capacity=100, owner=owner)
+        closed = date.today() + timedelta(days=10)
+        RestaurantClosure.objects.create(restaurant=restaurant, date=closed, reason="Travaux")
+        api = APIClient()
+        api.force_authenticate(owner)
+
+        def create(day):
+            return api.post("/api/restaurants/evenements/", {
+                "restaurant": restaurant.pk, "title": "Atelier", "description": "Cuisine", "type": "ANIMATION",
+                "date": day.isoformat(), "start_time": "14:00", "end_time": "16:00",
+            }, format="json")
+
+        response = create(closed)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ouverture", str(response.json()))
+        self.assertEqual(create(closed + timedelta(days=1)).status_code, 201)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "verrous de ligne PostgreSQL requis")
+class RegistrationConcurrencyTests(TransactionTestCase):
+    REGISTRATIONS = 200
+    CAPACITY = 50
+    WORKERS = 50  # connexions simultanées, sous le max_connections par défaut (100)
+
+    def test_no_oversell(self):
+        event = make_event(capacity=self.CAPACITY)
+        user_ids = [
+            User.objects.create_user(f"stress{i}@x.fr", "pw").pk for i in range(self.REGISTRATIONS)
+        ]
+
+        def register(user_id):
+            try:
+                return register_user(Evenement.objects.get(pk=event.pk), User.objects.get(pk=user_id))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(register, user_ids))
+
+        event.refresh_from_db()
+        self.assertEqual(results.count(REGISTERED), self.CAPACITY)
+        self.assertEqual(results.count(EVENT_FULL), self.REGISTRATIONS - self.CAPACITY)
+        self.assertEqual(EvenementRegistration.objects.filter(event=event).count(), self.CAPACITY)
+        self.assertEqual(event.registrations_count, self.CAPACITY)
+        self.assertEqual(event.status, "FULL")
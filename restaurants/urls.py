@@ -18,9 +18,10 @@ router.register(r'closures', RestaurantClosureViewSet, basename='closures')
 router.register(r'evenements/invites', EventInviteViewSet, basename='event-invites')
 
 urlpatterns = [
+    # avant le router : sinon 'reservations/<pk>/' capture 'all' et 'statistics'
+    path('reservations/all/', all_reservations_view, name='all-reservations'),
+    path('reservations/statistics/', reservations_stats_view, name='reservation-statistics'),
     path('', include(router.urls)),
     path('restaurants/<int:restaurant_id>/reservations/', restaurant_reservations_view, name='restaurant-reservations'),
     path('restaurants/<int:restaurant_id>/dashboard/', availability_dashboard, name='availability-dashboard'),
-    path('reservations/all/', all_reservations_view, name='all-reservations'),
-    path('reservations/statistics/', reservations_stats_view, name='reservation-statistics'),
 ]
@@ -1,5 +1,4 @@
-from django.core.mail import send_mail
-from django.conf import settings
+from .outbox import queue_email
 
 def _fmt_deadline(event):
     dl = event.supplier_deadline_at()
@@ -23,7 +22,7 @@ def send_invite_email(invite, base_url):
         f"À bientôt."
     )
     if invite.email:
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [invite.email], fail_silently=True)
+        queue_email(subject, message, [invite.email], category="event_invite")
 
 def notify_event_published(event):
     # à compléter si besoin
@@ -35,11 +34,9 @@ def notify_event_cancelled(event):
         f"L'évènement '{event.title}' du {event.date} est annulé.\n"
         f"Nous vous prions de nous excuser pour la gêne occasionnée."
     )
-    recipients = list(
-        event.registrations.select_related('user').values_list('user__email', flat=True)
-    )
-    if recipients:
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, recipients, fail_silently=True)
+    # un message par inscrit, envoyé par le worker `send_outbox`
+    recipients = event.registrations.values_list('user__email', flat=True)
+    queue_email(subject, message, recipients, category="event_cancelled")
 
 def notify_event_full(event):
     # à compléter (notification organisateur) si besoin
@@ -1,6 +1,16 @@
-from datetime import datetime
+import csv
+import io
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.dateparse import parse_date
+from django.db.models import Q, Count, Sum, Prefetch, Value, DateField, Case, When
+from django.db.models.functions import Coalesce, Lower
 from django.db import transaction
 from django.contrib.auth import get_user_model
 
@@ -12,30 +22,59 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import status as drf_status
 from rest_framework.exceptions import PermissionDenied
 
+from config.cache import versioned_key, bump_cache_version
+from config.conditional import ConditionalGetMixin
+from config.pagination import paginated_response
+
 from .models import (
-    Restaurant, Room, Reservation, Evenement,
-    EvenementRegistration, EventInvite, RestaurantClosure
+    Restaurant, Room, Reservation, Evenement, EvenementOccurrence,
+    EventInvite, RestaurantClosure, SubtractDays,
+)
+from .availability import (
+    DayAvailability, allocate_rooms, occupancy_grid, opening_calendar_days, search_slots,
+    BLOCKING_EVENT_STATUSES,
 )
+from .registrations import (
+    register_user, unregister_user, REGISTERED, ALREADY_REGISTERED, EVENT_FULL,
+)
+from . import ics
+from .recurrence import ensure_occurrences, occurrences_beyond_limit
 from .permissions import IsClient, IsRestaurateur, IsAdminVegNBio, IsSupplier
 from .serializers import (
     RestaurantSerializer, RestaurantUpdateSerializer,
     RoomReadSerializer, RoomWriteSerializer,
-    ReservationSerializer, EvenementSerializer,
+    ReservationSerializer, ReservationBulkRowSerializer, EvenementSerializer,
     EventInviteListSerializer, EventInviteCreateSerializer,
-    EvenementRegistrationListSerializer, RestaurantClosureSerializer
+    EvenementRegistrationListSerializer, RestaurantClosureSerializer,
+    reservation_timing_error, reservation_slot_error,
 )
+from .signals import RESERVATION_STATS_CACHE
 from .utils import notify_event_full, send_invite_email, notify_event_cancelled
 
 User = get_user_model()
 
 
+def _filled_by(result, event):
+    """Vrai si c'est cette inscription qui a pris la dernière place."""
+    return (
+        result == REGISTERED
+        and event.capacity is not None
+        and event.registrations_count >= event.capacity
+    )
+
+
 # -------- RESTAURANT --------
-class RestaurantViewSet(viewsets.ModelViewSet):
+OPENING_CALENDAR_MAX_DAYS = 92
+SLOT_SEARCH_MAX_DAYS = 31
+SLOT_SEARCH_MAX_RESULTS = 50
+
+
+class RestaurantViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Restaurant.objects.all().prefetch_related('rooms')
     serializer_class = RestaurantSerializer
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'evenements']:
+        if self.action in ['list', 'retrieve', 'evenements', 'opening_calendar', 'calendar_feed']:
             return [permissions.AllowAny()]
         if self.action in ['update', 'partial_update']:
             return [IsAuthenticated()]
@@ -63,9 +102,112 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], url_path='evenements',
             permission_classes=[permissions.AllowAny])
     def evenements(self, request, pk=None):
-        qs = Evenement.objects.filter(restaurant_id=pk).order_by('date', 'start_time')
-        data = EvenementSerializer(qs, many=True).data
-        return Response(data)
+        qs = Evenement.objects.select_related('restaurant').filter(restaurant_id=pk).order_by('date', 'start_time')
+        return paginated_response(request, qs, EvenementSerializer, view=self)
+
+    @action(detail=True, methods=['get'], url_path='opening_calendar',
+            permission_classes=[permissions.AllowAny])
+    def opening_calendar(self, request, pk=None):
+        """
+        ?from=YYYY-MM-DD&to=YYYY-MM-DD (défaut : 7 jours à partir d'aujourd'hui)
+        Plages d'ouverture jour par jour (débordements de nuit inclus, fermetures déduites).
+        """
+        restaurant = get_object_or_404(Restaurant, pk=pk)
+        today = timezone.localdate()
+        try:
+            date_from = datetime.strptime(request.GET['from'], '%Y-%m-%d').date() if request.GET.get('from') else today
+            date_to = (datetime.strptime(request.GET['to'], '%Y-%m-%d').date() if request.GET.get('to')
+                       else date_from + timedelta(days=6))
+        except ValueError:
+            return Response({"error": "Format de date invalide."}, status=400)
+        if date_to < date_from:
+            return Response({"error": "'to' doit être ≥ 'from'."}, status=400)
+        if (date_to - date_from).days >= OPENING_CALENDAR_MAX_DAYS:
+            return Response({"error": f"Période limitée à {OPENING_CALENDAR_MAX_DAYS} jours."}, status=400)
+
+        return Response({
+            "restaurant": restaurant.id,
+            "from": str(date_from),
+            "to": str(date_to),
+            "days": opening_calendar_days(restaurant, date_from, date_to),
+        })
+
+    @action(detail=True, methods=['get'], url_path='calendar.ics',
+            permission_classes=[permissions.AllowAny])
+    def calendar_feed(self, request, pk=None):
+        """
+        Flux iCalendar du restaurant (évènements avec RRULE, fermetures ;
+        réservations confirmées pour le propriétaire / ADMIN).
+        ETag / Last-Modified : 304 tant que rien n'a changé.
+        """
+        restaurant = get_object_or_404(Restaurant, pk=pk)
+        user = request.user
+        private = user.is_authenticated and (
+            restaurant.owner_id == user.pk or getattr(user, 'role', None) == 'ADMIN'
+        )
+        querysets = ics.feed_querysets(restaurant, private)
+        etag = ics.feed_etag(querysets, private)
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is None:
+            response = StreamingHttpResponse(
+                ics.iter_feed(restaurant, querysets, request.get_host().split(':')[0]),
+                content_type='text/calendar; charset=utf-8',
+            )
+            response['Content-Disposition'] = f'inline; filename="restaurant-{restaurant.pk}.ics"'
+        else:
+            response = not_modified
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache' if private else 'public, no-cache'
+        response['Vary'] = 'Authorization'
+        return response
+
+    @action(detail=True, methods=['get'], url_path='availability/search')
+    def availability_search(self, request, pk=None):
+        """
+        ?party_size=4&date=YYYY-MM-DD&duration=90 (minutes)
+        Options : days (jours parcourus à partir de date, défaut 7), limit (défaut 10).
+        Prochaines heures de début où une salle assez grande est libre sur tout le créneau.
+        """
+        restaurant = get_object_or_404(Restaurant.objects.prefetch_related('rooms'), pk=pk)
+        today = timezone.localdate()
+        try:
+            party_size = int(request.GET.get('party_size', ''))
+            duration = int(request.GET.get('duration', 90))
+            days = int(request.GET.get('days', 7))
+            limit = int(request.GET.get('limit', 10))
+        except ValueError:
+            return Response({"error": "party_size, duration, days et limit doivent être des entiers."}, status=400)
+        try:
+            date_from = datetime.strptime(request.GET['date'], '%Y-%m-%d').date() if request.GET.get('date') else today
+        except ValueError:
+            return Response({"error": "Format de date invalide."}, status=400)
+        if party_size <= 0:
+            return Response({"error": "party_size (nombre de places) doit être > 0."}, status=400)
+        if not 15 <= duration <= 12 * 60:
+            return Response({"error": "duration doit être comprise entre 15 et 720 minutes."}, status=400)
+        if not 1 <= days <= SLOT_SEARCH_MAX_DAYS:
+            return Response({"error": f"days doit être compris entre 1 et {SLOT_SEARCH_MAX_DAYS}."}, status=400)
+        limit = min(max(limit, 1), SLOT_SEARCH_MAX_RESULTS)
+        date_from = max(date_from, today)
+
+        dates = [date_from + timedelta(days=i) for i in range(days)]
+        availabilities = DayAvailability.load_many(
+            [(restaurant, d) for d in dates], rooms=restaurant.rooms.all(),
+        )
+        slots = search_slots(
+            [availabilities[(restaurant.pk, d)] for d in dates],
+            party_size, duration, limit,
+            not_before=timezone.localtime().replace(tzinfo=None),
+        )
+        return Response({
+            "restaurant": restaurant.id,
+            "party_size": party_size,
+            "duration": duration,
+            "from": str(dates[0]),
+            "to": str(dates[-1]),
+            "slots": slots,
+        })
 
 
 # -------- ROOMS --------
@@ -105,12 +247,47 @@ class RoomViewSet(viewsets.ModelViewSet):
 
 
 # -------- RESERVATIONS --------
+BULK_RESERVATIONS_MAX = 1000
+BULK_CSV_COLUMNS = ['restaurant', 'date', 'start_time', 'end_time', 'party_size', 'customer_email']
+
+
+def _read_bulk_rows(request):
+    """Lignes d'un import en lot (JSON, fichier CSV ou corps text/csv) + option dry_run."""
+    if request.content_type.startswith('text/csv'):
+        content, dry_run = request.body, request.query_params.get('dry_run')
+    elif 'file' in request.FILES:
+        content, dry_run = request.FILES['file'].read(), request.data.get('dry_run')
+    else:
+        data = request.data
+        rows = data if isinstance(data, list) else data.get('reservations')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("'reservations' doit être une liste d'objets.")
+        dry_run = None if isinstance(data, list) else data.get('dry_run')
+        return rows, dry_run in [True, 'true', '1', 1]
+
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValueError("Le fichier CSV doit être encodé en UTF-8.")
+    reader = csv.DictReader(io.StringIO(text))
+    missing = set(BULK_CSV_COLUMNS[:-1]) - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"Colonnes CSV manquantes : {', '.join(sorted(missing))}.")
+    rows = [
+        {key: (row.get(key) or '').strip() for key in BULK_CSV_COLUMNS if row.get(key)}
+        for row in reader
+    ]
+    return rows, dry_run in [True, 'true', '1', 1]
+
+
 class ReservationViewSet(viewsets.ModelViewSet):
     serializer_class = ReservationSerializer
 
     def get_permissions(self):
         if self.action in ['assign', 'moderate']:
             return [IsAuthenticated(), IsRestaurateur()]
+        if self.action == 'auto_assign':
+            return [IsAuthenticated(), (IsRestaurateur | IsAdminVegNBio)()]
         return [IsAuthenticated()]
 
     def get_queryset(self):
@@ -136,8 +313,9 @@ class ReservationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsClient])
     def my_reservations(self, request):
         reservations = self.get_queryset()
-        serializer = self.get_serializer(reservations, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(reservations)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'], permission_classes=[IsRestaurateur])
     def assign(self, request, pk=None):
@@ -154,73 +332,203 @@ class ReservationViewSet(viewsets.ModelViewSet):
         if want_full not in [None, False, True]:
             return Response({"detail": "full_restaurant doit être un booléen."}, status=400)
 
-        date_ = reservation.date
         start = reservation.start_time
         end = reservation.end_time
-        restaurant = reservation.restaurant
-
-        ev_qs = Evenement.objects.filter(
-            restaurant=restaurant, date=date_,
-            is_blocking=True, status__in=["PUBLISHED", "FULL"],
-            start_time__lt=end, end_time__gt=start
+        availability = DayAvailability.load(
+            reservation.restaurant, reservation.date, exclude_reservation=reservation.pk
         )
-        if ev_qs.exists():
+
+        if availability.closed:
+            return Response({"detail": "Le restaurant est fermé à cette date."}, status=400)
+        if availability.blocking_event(start, end):
             return Response({"detail": "Créneau indisponible (événement bloquant)."}, status=400)
 
         if want_full is True:
-            room_conflicts = Reservation.objects.filter(
-                restaurant=restaurant, date=date_,
-                start_time__lt=end, end_time__gt=start,
-                full_restaurant=False, room__isnull=False
-            ).exclude(pk=reservation.pk)
-            if room_conflicts.exists():
+            if availability.any_room_conflict(start, end):
                 return Response({"detail": "Des salles sont déjà réservées sur ce créneau."}, status=400)
-            full_conflicts = Reservation.objects.filter(
-                restaurant=restaurant, date=date_,
-                start_time__lt=end, end_time__gt=start,
-                full_restaurant=True
-            ).exclude(pk=reservation.pk)
-            if full_conflicts.exists():
+            if availability.full_restaurant_conflict(start, end):
                 return Response({"detail": "Le restaurant est déjà réservé en entier sur ce créneau."}, status=400)
 
             reservation.full_restaurant = True
             reservation.room = None
             reservation.status = 'CONFIRMED'
-            reservation.save(update_fields=['full_restaurant', 'room', 'status'])
+            reservation.save(update_fields=['full_restaurant', 'room', 'status', 'updated_at'])
             return Response(ReservationSerializer(reservation).data, status=200)
 
         if room_id is None:
             return Response({"detail": "Fournir soit 'full_restaurant': true, soit 'room': <id>."}, status=400)
 
-        try:
-            room = Room.objects.get(pk=room_id, restaurant=restaurant)
-        except Room.DoesNotExist:
+        room = availability.room(room_id)
+        if room is None:
             return Response({"detail": "Salle introuvable dans ce restaurant."}, status=404)
 
         if room.capacity < reservation.party_size:
             return Response({"detail": f"Capacité insuffisante (capacité {room.capacity} < {reservation.party_size})."}, status=400)
 
-        room_conflicts = Reservation.objects.filter(
-            room=room, date=date_,
-            start_time__lt=end, end_time__gt=start
-        ).exclude(pk=reservation.pk)
-        if room_conflicts.exists():
+        if availability.room_conflict(room.pk, start, end):
             return Response({"detail": "Cette salle est déjà réservée sur ce créneau."}, status=400)
 
-        full_conflicts = Reservation.objects.filter(
-            restaurant=restaurant, date=date_,
-            start_time__lt=end, end_time__gt=start,
-            full_restaurant=True
-        ).exclude(pk=reservation.pk)
-        if full_conflicts.exists():
+        if availability.full_restaurant_conflict(start, end):
             return Response({"detail": "Le restaurant est réservé en entier sur ce créneau."}, status=400)
 
         reservation.room = room
         reservation.full_restaurant = False
         reservation.status = 'CONFIRMED'
-        reservation.save(update_fields=['room', 'full_restaurant', 'status'])
+        reservation.save(update_fields=['room', 'full_restaurant', 'status', 'updated_at'])
         return Response(ReservationSerializer(reservation).data, status=200)
 
+    @action(detail=False, methods=['post'], permission_classes=[IsRestaurateur | IsAdminVegNBio])
+    def auto_assign(self, request):
+        """
+        Affecte automatiquement les réservations PENDING d'un restaurant.
+        Body : { "restaurant": 12, "date": "YYYY-MM-DD" } ou
+               { "restaurant": 12, "reservations": [1, 2, 3] }
+        Option : "dry_run": true pour simuler sans enregistrer.
+        """
+        restaurant = get_object_or_404(Restaurant, id=request.data.get('restaurant'))
+        if restaurant.owner != request.user and getattr(request.user, 'role', None) != 'ADMIN':
+            return Response({"detail": "Accès interdit."}, status=403)
+
+        ids = request.data.get('reservations')
+        date_str = request.data.get('date')
+        if not ids and not date_str:
+            return Response({"detail": "Fournir 'date' ou 'reservations'."}, status=400)
+
+        dry_run = request.data.get('dry_run') in [True, 'true', '1', 1]
+
+        with transaction.atomic():
+            qs = Reservation.objects.select_for_update().filter(
+                restaurant=restaurant, status='PENDING',
+                room__isnull=True, full_restaurant=False,
+            )
+            if date_str:
+                try:
+                    qs = qs.filter(date=datetime.strptime(date_str, '%Y-%m-%d').date())
+                except (TypeError, ValueError):
+                    return Response({"detail": "Format de date invalide."}, status=400)
+            if ids:
+                if not isinstance(ids, list):
+                    return Response({"detail": "'reservations' doit être une liste d'ids."}, status=400)
+                qs = qs.filter(pk__in=ids)
+            pending = list(qs)
+
+            availabilities = DayAvailability.load_many(
+                {(restaurant, r.date) for r in pending},
+                rooms=restaurant.rooms.all(),
+            )
+            assigned, rejected = allocate_rooms(pending, availabilities)
+
+            if not dry_run and assigned:
+                now = timezone.now()
+                for reservation, room in assigned:
+                    reservation.room = room
+                    reservation.status = 'CONFIRMED'
+                    reservation.updated_at = now
+                Reservation.objects.bulk_update(
+                    [reservation for reservation, _ in assigned], ['room', 'status', 'updated_at']
+                )
+                # bulk_update n'émet pas post_save
+                bump_cache_version(RESERVATION_STATS_CACHE)
+
+        return Response({
+            "dry_run": dry_run,
+            "assigned": [
+                {"reservation": r.id, "room": room.id, "room_name": room.name,
+                 "date": str(r.date), "start_time": r.start_time, "end_time": r.end_time}
+                for r, room in assigned
+            ],
+            "unassigned": [
+                {"reservation": r.id, "reason": reason} for r, reason in rejected
+            ],
+        })
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Import en lot (plateformes partenaires, groupes).
+        Body JSON : { "reservations": [ {restaurant, date, start_time, end_time, party_size, customer_email?}, ... ] }
+        ou fichier CSV (multipart `file`, ou corps text/csv) avec ces colonnes.
+        Option : "dry_run": true pour valider sans enregistrer.
+        Les lignes valides sont créées en une transaction ; les autres sont renvoyées avec leurs erreurs.
+        """
+        try:
+            rows, dry_run = _read_bulk_rows(request)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        if not rows:
+            return Response({"detail": "Aucune réservation fournie."}, status=400)
+        if len(rows) > BULK_RESERVATIONS_MAX:
+            return Response({"detail": f"{BULK_RESERVATIONS_MAX} réservations maximum par lot."}, status=400)
+
+        user = request.user
+        # comme pour la création unitaire : seul le restaurateur réserve au nom d'un client
+        on_behalf = getattr(user, 'role', None) == 'RESTAURATEUR'
+        errors, parsed = [], []
+        for index, row in enumerate(rows, start=1):
+            ser = ReservationBulkRowSerializer(data=row)
+            if ser.is_valid():
+                parsed.append((index, ser.validated_data))
+            else:
+                errors.append({"row": index, "errors": ser.errors})
+
+        # une requête par référentiel, puis un seul instantané pour tout le lot
+        restaurants = Restaurant.objects.in_bulk({data['restaurant'] for _, data in parsed})
+        emails = {data['customer_email'].lower() for _, data in parsed if on_behalf and data.get('customer_email')}
+        customers = {
+            u.email.lower(): u
+            for u in User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)
+        } if emails else {}
+        availabilities = DayAvailability.load_many(
+            {(restaurants[data['restaurant']], data['date'])
+             for _, data in parsed if data['restaurant'] in restaurants}
+        )
+
+        to_create = []
+        for index, data in parsed:
+            restaurant = restaurants.get(data['restaurant'])
+            email = (data.get('customer_email') or '').lower()
+            if restaurant is None:
+                error = "Restaurant introuvable."
+            elif on_behalf and restaurant.owner_id != user.pk:
+                error = "Accès interdit: restaurant non possédé."
+            elif on_behalf and not email:
+                error = "customer_email est requis (création par restaurateur)."
+            elif on_behalf and email not in customers:
+                error = "Client introuvable pour ce customer_email."
+            else:
+                start, end = data['start_time'], data['end_time']
+                error = reservation_timing_error(data['date'], start, end) or reservation_slot_error(
+                    availabilities[(restaurant.pk, data['date'])], start, end
+                )
+            if error:
+                errors.append({"row": index, "errors": {"non_field_errors": [error]}})
+                continue
+            to_create.append(Reservation(
+                customer=customers[email] if on_behalf else user,
+                restaurant=restaurant,
+                date=data['date'],
+                start_time=data['start_time'],
+                end_time=data['end_time'],
+                party_size=data['party_size'],
+            ))
+
+        if not dry_run and to_create:
+            with transaction.atomic():
+                to_create = Reservation.objects.bulk_create(to_create, batch_size=500)
+            # bulk_create n'émet pas post_save
+            bump_cache_version(RESERVATION_STATS_CACHE)
+
+        return Response({
+            "dry_run": dry_run,
+            "received": len(rows),
+            "created": 0 if dry_run else len(to_create),
+            "valid": len(to_create),
+            "errors": sorted(errors, key=lambda e: e["row"]),
+            "reservations": [] if dry_run else ReservationSerializer(
+                to_create, many=True, context={'request': request}
+            ).data,
+        }, status=status.HTTP_200_OK if dry_run or not to_create else status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'], permission_classes=[IsRestaurateur])
     def moderate(self, request, pk=None):
         reservation = self.get_object()
@@ -233,7 +541,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
             return Response({'error': "Accès interdit."}, status=403)
 
         reservation.status = new_status
-        reservation.save(update_fields=['status'])
+        reservation.save(update_fields=['status', 'updated_at'])
         return Response({'status': f"Réservation {reservation.id} mise à jour avec succès."})
 
     def update(self, request, *args, **kwargs):
@@ -282,7 +590,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'Accès interdit.'}, status=403)
 
         reservation.status = 'CANCELLED'
-        reservation.save(update_fields=['status'])
+        reservation.save(update_fields=['status', 'updated_at'])
         return Response({"status": "Réservation annulée avec succès."})
 
 
@@ -309,21 +617,29 @@ class EventInviteViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='mine')
     def mine(self, request):
+        """
+        Invitations en attente du fournisseur, en une requête paginée.
+        La date limite fournisseur (évènement − supplier_deadline_days, incluse)
+        est calculée en SQL.
+        """
         user = request.user
-        now = timezone.now()
-        qs = EventInvite.objects.select_related('event').filter(
-            Q(invited_user=user) | Q(email__iexact=user.email)
-        ).filter(status='PENDING').filter(
-            Q(expires_at__isnull=True) | Q(expires_at__gte=now)
+        qs = (
+            EventInvite.objects.select_related('event')
+            .alias(email_lower=Lower('email'))
+            # jour limite (null sans confirmation fournisseur), relu par le serializer
+            .annotate(supplier_deadline=Case(
+                When(event__requires_supplier_confirmation=True,
+                     then=SubtractDays('event__date', 'event__supplier_deadline_days')),
+                default=None, output_field=DateField(),
+            ))
+            .filter(Q(invited_user=user) | Q(email_lower=(user.email or '').lower()))
+            .filter(status='PENDING')
+            .filter(Q(expires_at__isnull=True) | Q(expires_at__gte=timezone.now()))
+            # Si l’événement a une deadline fournisseur, la respecter ici aussi
+            .exclude(supplier_deadline__lt=timezone.localdate())
+            .order_by('-created_at')
         )
-        # Si l’événement a une deadline fournisseur, la respecter ici aussi
-        result = []
-        for inv in qs:
-            if inv.supplier_deadline_at() and now > inv.supplier_deadline_at():
-                continue
-            result.append(inv)
-        ser = EventInviteListSerializer(result, many=True)
-        return Response(ser.data)
+        return paginated_response(request, qs, EventInviteListSerializer, view=self)
 
     @action(detail=True, methods=['post'])
     def accept(self, request, pk=None):
@@ -334,29 +650,20 @@ class EventInviteViewSet(viewsets.ModelViewSet):
         if not invite.is_valid():
             return Response({"detail": "Invitation expirée ou invalide."}, status=400)
 
-        # Enregistrer l'inscription fournisseur s'il y a une capacité
+        # Inscription fournisseur (compteur atomique, passe l'évènement en FULL si besoin)
         event = invite.event
-        if event.capacity is not None and event.registrations.count() >= event.capacity:
-            event.status = 'FULL'
-            event.full_at = timezone.now()
-            event.save(update_fields=['status', 'full_at', 'updated_at'])
+        result = register_user(event, request.user)
+        if result == EVENT_FULL:
             return Response({"detail": "Évènement complet."}, status=400)
 
         # Lier l'utilisateur si pas déjà lié (cas envoi par email = même compte)
         if invite.invited_user is None:
             invite.invited_user = request.user
 
-        # Créer l'inscription si besoin
-        EvenementRegistration.objects.get_or_create(event=event, user=request.user)
-
         invite.status = 'ACCEPTED'
         invite.save(update_fields=['status', 'invited_user', 'updated_at'] if hasattr(invite, 'updated_at') else ['status', 'invited_user'])
 
-        # Repasser l'évènement en FULL si la capacité est atteinte après acceptation
-        if event.capacity is not None and event.registrations.count() >= event.capacity:
-            event.status = 'FULL'
-            event.full_at = timezone.now()
-            event.save(update_fields=['status', 'full_at', 'updated_at'])
+        if _filled_by(result, event):
             notify_event_full(event)
 
         return Response({"status": "Invitation acceptée."}, status=201)
@@ -375,6 +682,47 @@ class EventInviteViewSet(viewsets.ModelViewSet):
         return Response({"status": "Invitation refusée."}, status=200)
 
 
+INVITE_BULK_MAX = 5000
+INVITE_BULK_BATCH = 500
+
+
+def _read_invite_emails(request):
+    """Adresses d'une invitation en masse : JSON `emails`, fichier CSV ou corps text/csv."""
+    if request.content_type.startswith('text/csv'):
+        content = request.body
+    elif 'file' in request.FILES:
+        content = request.FILES['file'].read()
+    else:
+        emails = request.data.get('emails', [])
+        if not isinstance(emails, list):
+            raise ValueError("'emails' doit être une liste.")
+        return emails
+
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValueError("Le fichier CSV doit être encodé en UTF-8.")
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    # colonne `email` si l'en-tête existe, sinon première colonne
+    column = 0
+    if rows and 'email' in [cell.strip().lower() for cell in rows[0]]:
+        column = [cell.strip().lower() for cell in rows[0]].index('email')
+        rows = rows[1:]
+    return [row[column] if column < len(row) else '' for row in rows]
+
+
+def _invite_csv_lines(invites):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['id', 'email', 'token', 'expires_at'])
+    for inv in invites:
+        writer.writerow([inv.pk, inv.email, inv.token, inv.expires_at.isoformat()])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+
 # -------- EVENEMENTS & FERMETURES --------
 class EvenementViewSet(viewsets.ModelViewSet):
     queryset = Evenement.objects.select_related('restaurant').all()
@@ -394,26 +742,14 @@ class EvenementViewSet(viewsets.ModelViewSet):
         if event.date < today or (event.date == today and event.end_time <= now_t):
             return Response({"detail": "Évènement passé."}, status=400)
 
-        # Déjà inscrit ?
-        exists = event.registrations.filter(user=request.user).exists()
-        if exists:
+        # Inscription + compteur en une transaction (pas de survente en concurrence)
+        result = register_user(event, request.user)
+        if result == ALREADY_REGISTERED:
             return Response({"detail": "Déjà inscrit."}, status=200)
-
-        # Capacité
-        if event.capacity is not None and event.registrations.count() >= event.capacity:
-            event.status = 'FULL'
-            event.full_at = timezone.now()
-            event.save(update_fields=['status', 'full_at', 'updated_at'])
+        if result == EVENT_FULL:
             return Response({"detail": "Évènement complet."}, status=400)
 
-        # Créer l'inscription
-        EvenementRegistration.objects.create(event=event, user=request.user)
-
-        # Si rempli après inscription → FULL
-        if event.capacity is not None and event.registrations.count() >= event.capacity:
-            event.status = 'FULL'
-            event.full_at = timezone.now()
-            event.save(update_fields=['status', 'full_at', 'updated_at'])
+        if _filled_by(result, event):
             notify_event_full(event)
 
         return Response({"status": "Inscription enregistrée."}, status=201)
@@ -428,16 +764,10 @@ class EvenementViewSet(viewsets.ModelViewSet):
         if event.date < today or (event.date == today and event.end_time <= now_t):
             return Response({"detail": "Évènement terminé."}, status=400)
 
-        deleted, _ = event.registrations.filter(user=request.user).delete()
-        if not deleted:
+        # Décrémente le compteur ; un évènement FULL repasse en PUBLISHED
+        if not unregister_user(event, request.user):
             return Response({"detail": "Vous n'êtes pas inscrit."}, status=400)
 
-        # Si l'évènement était FULL, on peut le repasser en PUBLISHED si on veut rouvrir
-        if event.status == 'FULL':
-            # Option : le repasser ouvert
-            event.status = 'PUBLISHED'
-            event.save(update_fields=['status', 'updated_at'])
-
         return Response({"status": "Désinscription effectuée."}, status=200)
 
     def get_permissions(self):
@@ -457,7 +787,19 @@ class EvenementViewSet(viewsets.ModelViewSet):
         if p.get('restaurant'):
             qs = qs.filter(restaurant_id=p['restaurant'])
         if p.get('date'):
-            qs = qs.filter(date=p['date'])
+            try:
+                day = parse_date(p['date'])
+            except ValueError:
+                day = None
+            if day is None:
+                return qs.none()
+            # évènements du jour + occurrences des évènements récurrents
+            ensure_occurrences(day)
+            beyond = [event.pk for event, _ in occurrences_beyond_limit(qs, [day])]
+            qs = qs.filter(
+                Q(date=day) | Q(pk__in=beyond)
+                | Q(pk__in=EvenementOccurrence.objects.filter(date=day).values('event_id'))
+            ).annotate(occurrence_date=Value(day, output_field=DateField()))
         if p.get('type'):
             qs = qs.filter(type=p['type'])
         if p.get('status'):
@@ -503,7 +845,7 @@ class EvenementViewSet(viewsets.ModelViewSet):
         if not (is_owner or is_admin):
             mine = event.registrations.select_related('user').filter(user=request.user).first()
             return Response({
-                "count": event.registrations.count(),
+                "count": event.registrations_count,
                 "me": {
                     "registered": bool(mine),
                     "registered_at": getattr(mine, 'created_at', None)
@@ -521,20 +863,71 @@ class EvenementViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def invite_bulk(self, request, pk=None):
+        """
+        Invitations en masse (sans e-mail) : liste JSON `emails` ou fichier CSV.
+        `?output=csv` renvoie les invitations créées en flux CSV (email, token, expires_at).
+        """
         event = self.get_object()
         if event.restaurant.owner != request.user and getattr(request.user, 'role', None) != 'ADMIN':
             return Response({"detail": "Accès interdit."}, status=403)
 
-        emails = request.data.get('emails', [])
-        created = []
-
-        # 👇 Boucle front possible, mais on garde aussi ce bulk sans email
+        try:
+            raw = _read_invite_emails(request)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+        if len(raw) > INVITE_BULK_MAX:
+            return Response({"detail": f"{INVITE_BULK_MAX} adresses maximum par lot."}, status=400)
+
+        emails, invalid, seen = [], [], set()
+        for value in raw:
+            email = value.strip().lower() if isinstance(value, str) else ''
+            try:
+                validate_email(email)
+            except DjangoValidationError:
+                invalid.append(value)
+                continue
+            if email not in seen:
+                seen.add(email)
+                emails.append(email)
+
+        existing = set(
+            EventInvite.objects
+            .filter(event=event, status__in=['PENDING', 'ACCEPTED'])
+            .annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=emails)
+            .values_list('email_lower', flat=True)
+        )
+        expires_at = timezone.now() + EventInvite.VALIDITY
+        invites = [
+            EventInvite(event=event, email=email, token=EventInvite.new_token(), expires_at=expires_at)
+            for email in emails if email not in existing
+        ]
         with transaction.atomic():
-            for email in emails:
-                inv = EventInvite.objects.create(event=event, email=email)
-                created.append(inv)
+            EventInvite.objects.bulk_create(invites, batch_size=INVITE_BULK_BATCH)
+
+        counts = {
+            "received": len(raw),
+            "created": len(invites),
+            "duplicates": len(raw) - len(invalid) - len(emails),
+            "already_invited": len(existing),
+            "invalid": invalid,
+        }
+        if request.query_params.get('output') == 'csv':
+            response = StreamingHttpResponse(_invite_csv_lines(invites), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="invitations-{event.pk}.csv"'
+            for key in ('received', 'created', 'duplicates', 'already_invited'):
+                response[f'X-Invites-{key.replace("_", "-").title()}'] = str(counts[key])
+            response['X-Invites-Invalid'] = str(len(invalid))
+            response.status_code = 201
+            return response
+        return Response({
+            **counts,
+            "invites": [
+                {"id": inv.pk, "email": inv.email, "status": inv.status, "expires_at": inv.expires_at}
+                for inv in invites
+            ],
+        }, status=201)
 
-        return Response(EventInviteListSerializer(created, many=True).data, status=201)
     @action(detail=True, methods=['post'])
     def accept_invite(self, request, pk=None):
         """
@@ -553,23 +946,18 @@ class EvenementViewSet(viewsets.ModelViewSet):
         if not invite.is_valid():
             return Response({"detail": "Invitation expirée ou invalide."}, status=400)
 
-        if event.capacity is not None and event.registrations.count() >= event.capacity:
-            event.status = 'FULL'
-            event.save()
+        result = register_user(event, request.user)
+        if result == EVENT_FULL:
             return Response({"detail": "Évènement complet."}, status=400)
 
         # si utilisateur connecté, lier l'invite
         if request.user.is_authenticated:
             invite.invited_user = request.user
 
-        reg, created = EvenementRegistration.objects.get_or_create(event=event, user=request.user)
         invite.status = "ACCEPTED"
         invite.save()
 
-        if event.capacity is not None and event.registrations.count() >= event.capacity:
-            event.status = 'FULL'
-            event.full_at = timezone.now()
-            event.save(update_fields=['status', 'full_at', 'updated_at'])
+        if _filled_by(result, event):
             notify_event_full(event)
 
         return Response({"status": "Invitation acceptée, inscription confirmée."}, status=201)
@@ -679,43 +1067,142 @@ def restaurant_reservations_view(request, restaurant_id):
     if status_filter:
         qs = qs.filter(status=status_filter.upper())
 
-    serializer = ReservationSerializer(qs, many=True, context={'request': request})
-    return Response(serializer.data)
+    return paginated_response(request, qs, ReservationSerializer)
+
+
+DASHBOARD_MAX_DAYS = 31
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsRestaurateur])
 def availability_dashboard(request, restaurant_id):
+    """
+    ?date=YYYY-MM-DD (vision jour) ou ?from=YYYY-MM-DD&to=YYYY-MM-DD (vision semaine…)
+    Grille d'occupation par créneaux de 15 minutes × salles.
+    """
     date_str = request.GET.get('date')
-    if not date_str:
+    from_str, to_str = request.GET.get('from'), request.GET.get('to')
+    if not date_str and not (from_str and to_str):
         return Response({"error": "Veuillez fournir une date au format YYYY-MM-DD."}, status=400)
     try:
-        date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        if date_str:
+            date_from = date_to = datetime.strptime(date_str, '%Y-%m-%d').date()
+        else:
+            date_from = datetime.strptime(from_str, '%Y-%m-%d').date()
+            date_to = datetime.strptime(to_str, '%Y-%m-%d').date()
     except ValueError:
         return Response({"error": "Format de date invalide."}, status=400)
-
-    restaurant = get_object_or_404(Restaurant, id=restaurant_id)
+    if date_to < date_from:
+        return Response({"error": "'to' doit être ≥ 'from'."}, status=400)
+    if (date_to - date_from).days >= DASHBOARD_MAX_DAYS:
+        return Response({"error": f"Période limitée à {DASHBOARD_MAX_DAYS} jours."}, status=400)
+
+    in_range = Q(reservations__date__range=(date_from, date_to)) & ~Q(reservations__status='CANCELLED')
+    ensure_occurrences(date_to)
+    restaurant = get_object_or_404(
+        Restaurant.objects.prefetch_related(
+            Prefetch('rooms', queryset=Room.objects.annotate(
+                reservations_count=Count('reservations', filter=in_range),
+                seats_booked=Coalesce(Sum('reservations__party_size', filter=in_range), 0),
+            ).order_by('name')),
+            Prefetch('reservations', to_attr='range_reservations', queryset=Reservation.objects.filter(
+                date__range=(date_from, date_to)
+            ).order_by('date', 'start_time')),
+            Prefetch('evenements', to_attr='range_evenements', queryset=Evenement.objects.filter(
+                date__range=(date_from, date_to)
+            ).order_by('date', 'start_time')),
+            Prefetch('evenements', to_attr='recurring_evenements', queryset=Evenement.objects.filter(
+                occurrences__date__range=(date_from, date_to)
+            ).distinct().prefetch_related(Prefetch(
+                'occurrences', to_attr='range_occurrences',
+                queryset=EvenementOccurrence.objects.filter(date__range=(date_from, date_to)),
+            ))),
+            # la veille aussi : sa fermeture supprime le débordement après minuit
+            Prefetch('closures', to_attr='range_closures', queryset=RestaurantClosure.objects.filter(
+                date__range=(date_from - timedelta(days=1), date_to)
+            )),
+        ),
+        id=restaurant_id,
+    )
     if restaurant.owner != request.user and getattr(request.user, 'role', None) != 'ADMIN':
         return Response({"detail": "Accès interdit."}, status=403)
 
-    rooms_payload = []
-    for room in restaurant.rooms.all():
-        reservations = room.reservations.filter(date=date).values('start_time', 'end_time', 'status')
-        rooms_payload.append({
-            "room": room.name,
-            "capacity": room.capacity,
-            "reservations": list(reservations)
+    rooms = list(restaurant.rooms.all())
+    by_day = defaultdict(list)
+    for res in restaurant.range_reservations:
+        by_day[res.date].append(res)
+    events_by_day = defaultdict(list)
+    for ev in restaurant.range_evenements:
+        events_by_day[ev.date].append(ev)
+    for ev in restaurant.recurring_evenements:
+        for occ in ev.range_occurrences:
+            events_by_day[occ.date].append(ev)
+    range_days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    for ev, day in occurrences_beyond_limit(restaurant.evenements.all(), range_days):
+        events_by_day[day].append(ev)
+    for day_events in events_by_day.values():
+        day_events.sort(key=lambda ev: ev.start_time)
+    closures = {c.date: c for c in restaurant.range_closures}
+    calendar = restaurant.opening_calendar()
+
+    days = []
+    day = date_from
+    while day <= date_to:
+        day_reservations = by_day.get(day, [])
+        active = [res for res in day_reservations if res.status != 'CANCELLED']
+        day_events = events_by_day.get(day, [])
+        closure = closures.get(day)
+        days.append({
+            "date": str(day),
+            "restaurant": restaurant.name,
+            "closed": closure is not None,
+            "closure_reason": closure.reason if closure else None,
+            "rooms": [
+                {
+                    "room": room.name,
+                    "capacity": room.capacity,
+                    "reservations": [
+                        {"start_time": res.start_time, "end_time": res.end_time,
+                         "status": res.status, "party_size": res.party_size}
+                        for res in day_reservations if res.room_id == room.pk
+                    ],
+                }
+                for room in rooms
+            ],
+            "full_restaurant_reservations": [
+                {"id": res.id, "start_time": res.start_time, "end_time": res.end_time,
+                 "status": res.status, "party_size": res.party_size}
+                for res in day_reservations if res.full_restaurant
+            ],
+            "evenements": [
+                {"id": ev.id, "title": ev.title, "type": ev.type,
+                 "start_time": ev.start_time, "end_time": ev.end_time,
+                 "status": ev.status, "is_public": ev.is_public, "capacity": ev.capacity}
+                for ev in day_events
+            ],
+            "grid": occupancy_grid(
+                rooms, active,
+                [ev for ev in day_events if ev.is_blocking and ev.status in BLOCKING_EVENT_STATUSES],
+                closure is not None,
+                # jour fermé : grille conservée, places à 0
+                calendar.windows_for(day, closures.keys() - {day}),
+            ),
         })
+        day += timedelta(days=1)
 
-    events_qs = restaurant.evenements.filter(date=date).values(
-        'id', 'title', 'type', 'start_time', 'end_time', 'status', 'is_public', 'capacity'
-    )
+    if date_str:
+        return Response(days[0])
 
     return Response({
-        "date": str(date),
         "restaurant": restaurant.name,
-        "rooms": rooms_payload,
-        "evenements": list(events_qs)
+        "from": str(date_from),
+        "to": str(date_to),
+        "rooms": [
+            {"room_id": room.pk, "room": room.name, "capacity": room.capacity,
+             "reservations_count": room.reservations_count, "seats_booked": room.seats_booked}
+            for room in rooms
+        ],
+        "days": days,
     })
 
 
@@ -723,47 +1210,73 @@ def availability_dashboard(request, restaurant_id):
 @permission_classes([IsAuthenticated, IsRestaurateur | IsAdminVegNBio])
 def all_reservations_view(request):
     reservations = Reservation.objects.select_related('room', 'customer', 'restaurant').all()
-    serializer = ReservationSerializer(reservations, many=True)
-    return Response(serializer.data)
+    return paginated_response(request, reservations, ReservationSerializer)
+
+
+RESERVATION_STATS_TTL = 300
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsRestaurateur | IsAdminVegNBio])
 def reservations_stats_view(request):
-    restaurants = Restaurant.objects.prefetch_related('rooms__reservations').all()
-    data = []
+    """
+    Stats par restaurant / salle (?from=YYYY-MM-DD&to=YYYY-MM-DD optionnels).
+    Une seule agrégation conditionnelle, mise en cache par (rôle, propriétaire, période).
+    """
+    try:
+        date_from = datetime.strptime(request.GET['from'], '%Y-%m-%d').date() if request.GET.get('from') else None
+        date_to = datetime.strptime(request.GET['to'], '%Y-%m-%d').date() if request.GET.get('to') else None
+    except ValueError:
+        return Response({"error": "Format de date invalide."}, status=400)
 
-    for restaurant in restaurants:
-        room_stats = []
-        total, confirmed, pending, cancelled = 0, 0, 0, 0
-
-        for room in restaurant.rooms.all():
-            room_reservations = room.reservations.all()
-            r_total = room_reservations.count()
-            r_confirmed = room_reservations.filter(status='CONFIRMED').count()
-            r_pending = room_reservations.filter(status='PENDING').count()
-            r_cancelled = room_reservations.filter(status='CANCELLED').count()
-
-            room_stats.append({
-                "room": room.name,
-                "total": r_total,
-                "confirmed": r_confirmed,
-                "pending": r_pending,
-                "cancelled": r_cancelled
-            })
+    role = getattr(request.user, 'role', None)
+    owner_id = None if role == 'ADMIN' else request.user.pk
+    key = versioned_key(RESERVATION_STATS_CACHE, role, owner_id or 'all', date_from or '', date_to or '')
+    data = cache.get(key)
+    if data is not None:
+        return Response(data)
 
-            total += r_total
-            confirmed += r_confirmed
-            pending += r_pending
-            cancelled += r_cancelled
+    restaurants = Restaurant.objects.all()
+    if owner_id is not None:
+        restaurants = restaurants.filter(owner_id=owner_id)
+
+    window = Q()
+    if date_from:
+        window &= Q(reservations__date__gte=date_from)
+    if date_to:
+        window &= Q(reservations__date__lte=date_to)
+
+    room_rows = (
+        Room.objects
+        .filter(restaurant__in=restaurants)
+        .values('restaurant_id', 'name')
+        .annotate(
+            total=Count('reservations', filter=window),
+            confirmed=Count('reservations', filter=window & Q(reservations__status='CONFIRMED')),
+            pending=Count('reservations', filter=window & Q(reservations__status='PENDING')),
+            cancelled=Count('reservations', filter=window & Q(reservations__status='CANCELLED')),
+        )
+        .order_by('restaurant_id', 'name')
+    )
+    rooms_by_restaurant = defaultdict(list)
+    for row in room_rows:
+        rooms_by_restaurant[row.pop('restaurant_id')].append(row)
 
+    data = []
+    for restaurant_id, name in restaurants.values_list('id', 'name'):
+        room_stats = [
+            {"room": row['name'], "total": row['total'], "confirmed": row['confirmed'],
+             "pending": row['pending'], "cancelled": row['cancelled']}
+            for row in rooms_by_restaurant.get(restaurant_id, [])
+        ]
         data.append({
-            "restaurant": restaurant.name,
-            "total_reservations": total,
-            "confirmed": confirmed,
-            "pending": pending,
-            "cancelled": cancelled,
+            "restaurant": name,
+            "total_reservations": sum(r["total"] for r in room_stats),
+            "confirmed": sum(r["confirmed"] for r in room_stats),
+            "pending": sum(r["pending"] for r in room_stats),
+            "cancelled": sum(r["cancelled"] for r in room_stats),
             "salles": room_stats
         })
 
+    cache.set(key, data, RESERVATION_STATS_TTL)
     return Response(data)
@@ -27,7 +27,7 @@ class Command(BaseCommand):
                 new_prev = min(old_prev + 0.03, 0.8)
                 if new_prev != old_prev:
                     disease.prevalence = new_prev
-                    disease.save(update_fields=["prevalence"])
+                    disease.save(update_fields=["prevalence", "updated_at"])
                     adjusted += 1
 
                 # poids symptômes observés
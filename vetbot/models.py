@@ -6,6 +6,7 @@ from django.utils import timezone
 class Species(models.Model):
     code = models.CharField(max_length=32, unique=True)      # ex: "dog", "cat"
     name = models.CharField(max_length=64)                   # ex: "Chien", "Chat"
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Species"
@@ -19,6 +20,7 @@ class Breed(models.Model):
     species = models.ForeignKey(Species, on_delete=models.CASCADE, related_name="breeds")
     name = models.CharField(max_length=96)
     aliases = models.JSONField(default=list, blank=True)     # ex: ["Labrador Retriever", "Lab"]
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("species", "name")
@@ -33,6 +35,7 @@ class Symptom(models.Model):
     label = models.CharField(max_length=128)                 # ex: "Vomissements", "Fièvre"
     snomed_id = models.CharField(max_length=32, blank=True)  # optionnel
     venom_code = models.CharField(max_length=32, blank=True) # optionnel
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [models.Index(fields=["code"])]
@@ -48,6 +51,7 @@ class Disease(models.Model):
     description = models.TextField(blank=True)
     references = models.JSONField(default=list, blank=True)
     prevalence = models.FloatField(default=0.0)  # petit bonus dans le scoring
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
@@ -14,6 +14,8 @@ from rest_framework import status, permissions
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from config.conditional import ConditionalGetMixin
+
 from .models import (
     Symptom, Species, Breed, Disease, DiseaseSymptom, Case, Feedback, ErrorLog
 )
@@ -288,42 +290,56 @@ class TriageView(APIView):
 
 # --------- Listes utilitaires ---------
 
-class SpeciesListView(APIView):
+class SpeciesListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.AllowAny]
 
+    def get_conditional_queryset(self):
+        return Species.objects.all()
+
     def get(self, request):
         data = list(Species.objects.values("code", "name").order_by("name"))
         return Response(SpeciesSerializer(data, many=True).data)
 
 
-class BreedListView(APIView):
+class BreedListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.AllowAny]
 
-    def get(self, request):
-        sp = request.query_params.get("species", "").strip().lower()
+    def get_conditional_queryset(self):
+        sp = self.request.query_params.get("species", "").strip().lower()
         qs = Breed.objects.all()
         if sp:
             qs = qs.filter(species__code=sp)
+        return qs
+
+    def get(self, request):
+        qs = self.get_conditional_queryset()
         data = list(qs.values("id", "name").order_by("name"))
         return Response(BreedSerializer(data, many=True).data)
 
 
-class SymptomListView(APIView):
+class SymptomListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.AllowAny]
 
+    def get_conditional_queryset(self):
+        return Symptom.objects.all()
+
     def get(self, request):
         data = list(Symptom.objects.values("code", "label").order_by("label"))
         return Response(SymptomSerializer(data, many=True).data)
 
 
-class DiseaseBySpeciesView(APIView):
+class DiseaseBySpeciesView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.AllowAny]
 
-    def get(self, request):
-        sp = request.query_params.get("species", "").strip().lower()
+    def get_conditional_queryset(self):
+        sp = self.request.query_params.get("species", "").strip().lower()
         qs = Disease.objects.all()
         if sp:
             qs = qs.filter(species__code=sp)
+        return qs
+
+    def get(self, request):
+        qs = self.get_conditional_queryset()
         data = list(qs.values("id", "name", "code", "prevalence").order_by("name"))
         return Response(DiseaseDebugSerializer(data, many=True).data)
 